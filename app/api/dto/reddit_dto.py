@@ -11,6 +11,8 @@ class Comment(BaseModel):
     start_time: float = Field(0, exclude=True)
     duration: Optional[float] = Field(0.0, exclude=True)
     is_title: Optional[bool] = Field(False, exclude=True)
+    audio_path: Optional[str] = Field(None, exclude=True)
+    audio_offset: Optional[float] = Field(None, exclude=True)  # Start of the clip in audio_path, None if it is all of it
     # position_x: int = 10  # X position (px from left)
     # position_y: int = 10  # Y position (px from top)
     # font_size: int = 24   # Font size
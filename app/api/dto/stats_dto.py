@@ -0,0 +1,54 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class CacheStatsResponse(BaseModel):
+    name: str
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    hit_rate: float = 0.0
+    bytes_written: int = 0
+    bytes_evicted: int = 0
+    size_bytes: int = 0
+    max_bytes: int = 0
+
+
+class LoopStatsResponse(BaseModel):
+    name: str
+    stalls: int = 0
+    stall_ms: int = 0
+    mean_stall_ms: float = 0.0
+    last_stall_ms: int = 0
+    last_stall_at: int = 0
+
+
+class WorkerStatsResponse(BaseModel):
+    worker_id: str
+    slots: int = 0
+    busy_slots: int = 0
+    ffmpeg_threads: int = 0
+    jobs_completed: int = 0
+    utilization: float = 0.0
+    uptime_seconds: int = 0
+    db_checked_out: int = 0
+    db_mean_wait_ms: float = 0.0
+
+
+class WorkersStatsResponse(BaseModel):
+    workers: List[WorkerStatsResponse]
+    slots: int = 0
+    busy_slots: int = 0
+
+
+class DbPoolStatsResponse(BaseModel):
+    pool_size: int = 0
+    max_overflow: int = 0
+    checked_out: int = 0
+    checked_in: int = 0
+    overflow: int = 0
+    checkouts: int = 0
+    timeouts: int = 0
+    mean_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
@@ -4,6 +4,7 @@ from typing import Optional, Any, List, Literal
 from pydantic import BaseModel, Field
 
 from app.api.dto.reddit_dto import Comment
+from app.enum.render import RenderEngine
 from app.enum.voice import Gender, Language
 
 
@@ -25,7 +26,19 @@ class CommentRequest(BaseModel):
         description="Target video length in seconds. Options: 90, 60, 30"
     )
     title: Optional[str] = Field(default=None, description="Title for the video")
-    ratio: Optional[str] = Field(default="16:9", description="Aspect ratio of the video. Options: 16:9, 9:16")
+    ratio: Optional[str] = Field(
+        default=None,
+        pattern=r"^\d+:\d+$",
+        description="Aspect ratio of the video, e.g. 16:9 or 9:16. Keeps the template aspect ratio if not set"
+    )
+    render_engine: Optional[RenderEngine] = Field(
+        default=None,
+        description="Engine used to render the video. Options: moviepy, ffmpeg. Uses the server default if not set"
+    )
+    encoding_profile: Optional[str] = Field(
+        default=None,
+        description="Encoding profile of the video, e.g. draft, standard, archive. Uses the server default if not set"
+    )
 
 
 class ResponseMessage(BaseModel):
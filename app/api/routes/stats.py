@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException
+
+from app.api.dto.stats_dto import (CacheStatsResponse, DbPoolStatsResponse, LoopStatsResponse, WorkerStatsResponse,
+                                   WorkersStatsResponse)
+from app.core.loop_monitor import get_loop_stats
+from app.db.session import pool_metrics
+from app.services.worker_stats import get_worker_stats
+from app.utils.cache_stats import get_cache_stats
+
+router = APIRouter(prefix="/stats", tags=["Stats Operations"])
+
+CACHE_NAMES = ["cards", "tts", "tts_shared", "translation", "renders"]
+LOOP_NAMES = ["api", "worker"]
+
+
+@router.get("/cache/{cache_name}", response_model=CacheStatsResponse)
+async def get_cache_statistics(cache_name: str) -> CacheStatsResponse:
+    """Get the hit, miss, eviction and byte counters of a cache, summed over every worker."""
+    if cache_name not in CACHE_NAMES:
+        raise HTTPException(status_code=404, detail=f"Unknown cache: {cache_name}")
+
+    stats = await get_cache_stats(cache_name)
+    lookups = stats.get("hits", 0) + stats.get("misses", 0)
+
+    return CacheStatsResponse(
+        name=cache_name,
+        hits=stats.get("hits", 0),
+        misses=stats.get("misses", 0),
+        evictions=stats.get("evictions", 0),
+        hit_rate=stats.get("hits", 0) / lookups if lookups else 0.0,
+        bytes_written=stats.get("bytes_written", 0),
+        bytes_evicted=stats.get("bytes_evicted", 0),
+        size_bytes=stats.get("size_bytes", 0),
+        max_bytes=stats.get("max_bytes", 0),
+    )
+
+
+@router.get("/loop/{loop_name}", response_model=LoopStatsResponse)
+async def get_loop_statistics(loop_name: str) -> LoopStatsResponse:
+    """Get the event loop stalls of the API or worker processes, summed over every process."""
+    if loop_name not in LOOP_NAMES:
+        raise HTTPException(status_code=404, detail=f"Unknown event loop: {loop_name}")
+
+    stats = await get_loop_stats(loop_name)
+    stalls = stats.get("stalls", 0)
+
+    return LoopStatsResponse(
+        name=loop_name,
+        stalls=stalls,
+        stall_ms=stats.get("stall_ms", 0),
+        mean_stall_ms=stats.get("stall_ms", 0) / stalls if stalls else 0.0,
+        last_stall_ms=stats.get("last_stall_ms", 0),
+        last_stall_at=stats.get("last_stall_at", 0),
+    )
+
+
+@router.get("/workers", response_model=WorkersStatsResponse)
+async def get_workers_statistics() -> WorkersStatsResponse:
+    """Get the job slots of every running worker and how busy they have been."""
+    workers = [WorkerStatsResponse(**stats) for stats in await get_worker_stats()]
+    return WorkersStatsResponse(
+        workers=workers,
+        slots=sum(worker.slots for worker in workers),
+        busy_slots=sum(worker.busy_slots for worker in workers),
+    )
+
+
+@router.get("/db", response_model=DbPoolStatsResponse)
+async def get_db_pool_statistics() -> DbPoolStatsResponse:
+    """Get the connection pool occupancy and checkout wait times of the API process serving the request."""
+    return DbPoolStatsResponse(**pool_metrics.snapshot())
@@ -6,6 +6,7 @@ from sqlalchemy import text
 from app.api.deps import get_video_service
 from app.api.dto.video_dto import CommentRequest, ResponseMessage, JobStatusResponse
 from app.core.config import settings
+from app.core.executor import run_blocking
 from app.db.session import get_db
 from app.services.video_service import VideoService
 
@@ -29,9 +30,12 @@ async def add_comments_to_video(
     video_path = os.path.join(settings.VIDEO_TEMPLATES_DIR, request.video_name)
 
     # Validate video path exists
-    if not os.path.exists(video_path):
+    if not await run_blocking(os.path.exists, video_path):
         raise HTTPException(status_code=404, detail="Video file not found")
 
+    if request.encoding_profile and request.encoding_profile not in settings.ENCODING_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown encoding profile: {request.encoding_profile}")
+
     return await video_service.create_add_comments_to_video_job(
         video_path=video_path,
         comments=request.comments,
@@ -40,7 +44,9 @@ async def add_comments_to_video(
         vid_len=request.vid_len,
         ratio=request.ratio,
         theme=request.theme,
-        title=request.title
+        title=request.title,
+        render_engine=request.render_engine,
+        encoding_profile=request.encoding_profile
     )
 
 
@@ -4,10 +4,26 @@ from pathlib import Path
 
 from pydantic_settings import BaseSettings
 
+from app.enum.render import RenderEngine
+
 
 def _default_cors_settings() -> list[str]:
     return ["*"]
 
+
+def _default_voices_without_marks() -> list[str]:
+    return ["Chirp", "Journey"]
+
+
+def _default_encoding_profiles() -> dict[str, dict]:
+    return {
+        # Fast previews, larger files
+        "draft": {"preset": "ultrafast", "crf": 28, "fps": 24},
+        "standard": {"preset": "medium", "crf": 23},
+        # Slow encode, smallest files at a higher quality
+        "archive": {"preset": "slow", "crf": 18},
+    }
+
 class Settings(BaseSettings):
     API_V1_STR: str = "/api"
     PROJECT_NAME: str = "Post 2 Video API"
@@ -25,15 +41,62 @@ class Settings(BaseSettings):
     GENERATED_DIR: Path = BASE_DIR / "generated"
     OUTPUT_DIR: Path = GENERATED_DIR / "output"
     CACHE_DIR: Path = GENERATED_DIR / "cache"
+    CARD_CACHE_DIR: Path = GENERATED_DIR / "card_cache"
 
     # Assets directory
     ASSETS_DIR: Path = BASE_DIR / "assets"
     FONTS_DIR: Path = ASSETS_DIR / "fonts"
     DEFAULT_AVATAR: Path = ASSETS_DIR / "defaults/default_avatar.png"
     VIDEO_TEMPLATES_DIR: Path = ASSETS_DIR / "video_templates"
+    VIDEO_MEZZANINE_DIR: Path = GENERATED_DIR / "mezzanine"
+
+    # Render settings
+    RENDER_ENGINE: RenderEngine = RenderEngine.MOVIEPY  # Default engine when a job does not pick one
+    OUTPUT_SHORT_SIDE: int = 720  # Short side in pixels of the rendered video
+    TEMPLATE_RANDOM_START: bool = False  # Start indexed templates at a random keyframe
+    MEZZANINE_GOP_SECONDS: float = 1.0
+    MEZZANINE_PRESET: str = "veryfast"
+    MEZZANINE_CRF: int = 16
+    RENDER_SEGMENTS: int = 1  # Parallel segments per moviepy job, 1 = off, 0 = one per CPU of the job slot
+    RENDER_MIN_SEGMENT_SECONDS: float = 10.0
+    ENCODING_PROFILES: dict[str, dict] = field(default_factory=_default_encoding_profiles)
+    DEFAULT_ENCODING_PROFILE: str = "standard"
+    AUDIO_SAMPLE_RATE: int = 44100
+    AUDIO_GAIN: float = 1.0
+    AUDIO_PEAK_LIMIT: float = 0.98  # The mix is scaled down when its peak is above this
+    AUDIO_BITRATE: str = "192k"
+    CARD_RENDER_WORKERS: int = 0  # Processes rendering comment cards, 0 = CPU count capped at 4
+    CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # Byte budget of CACHE_DIR
+    CACHE_TTL_SECONDS: int = 7 * 24 * 3600  # Entries unused for this long are evicted, 0 = no TTL
+    CACHE_TEMP_MAX_AGE_SECONDS: int = 6 * 3600  # Leftover temp files older than this are removed at startup
+    CARD_CACHE_ENABLED: bool = True
+    CARD_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    BLOCKING_EXECUTOR_WORKERS: int = 0  # Threads of the blocking calls of each process, 0 = Python default
+    LOOP_LAG_MONITOR_ENABLED: bool = True
+    LOOP_LAG_INTERVAL_SECONDS: float = 0.5
+    LOOP_LAG_THRESHOLD_SECONDS: float = 0.1  # Event loop stalls longer than this are logged and counted
 
     # Google Cloud settings
     GOOGLE_CLOUD_CREDENTIALS_PATH: Path = BASE_DIR / "keys/capable-shape-452021-u9-06c66c66092c.json"
+    TTS_CONCURRENCY: int = 8  # Concurrent TTS requests per worker
+    TTS_BACKEND: str = "google"  # google, local or tone, for voices without a "backend:" prefix
+    TTS_LOCAL_ENGINE: str = "espeak-ng"  # espeak-ng or piper
+    TTS_PIPER_MODEL: Path = BASE_DIR / "keys/piper/en_US-lessac-medium.onnx"
+    TTS_DEFAULT_CHARS_PER_SECOND: float = 15.0  # Duration prediction of voices with too few cached clips
+    DURATION_PREDICTOR_MIN_SAMPLES: int = 8
+    COMMENT_PACKING_SLACK: float = 2.0  # Seconds left unfilled before more comments are added
+    TTS_SSML_BATCH: bool = False  # Synthesize a whole job with one SSML request and marks
+    TTS_SSML_MAX_BYTES: int = 5000  # Request size limit of the API
+    # Voices synthesized one comment at a time
+    TTS_VOICES_WITHOUT_MARKS: list[str] = field(default_factory=_default_voices_without_marks)
+    TTS_SHARED_CACHE_ENABLED: bool = False  # Share TTS clips between workers through a bucket
+    TTS_SHARED_CACHE_BUCKET: str = ""  # Defaults to CLOUDFLARE_BUCKET_NAME
+    TTS_SHARED_CACHE_ENDPOINT_URL: str = ""  # S3-compatible endpoint instead of R2, e.g. a local stand-in
+    TTS_SHARED_CACHE_PREFIX: str = "tts/"
+    TTS_SHARED_CACHE_TIMEOUT_SECONDS: float = 2.0  # Longest wait for a clip from the bucket before synthesizing
+    TTS_SHARED_CACHE_BACKOFF_SECONDS: float = 30.0  # Bucket skipped for this long after a failed fetch
+    TRANSLATION_BATCH_SIZE: int = 128  # Texts per Translation API request, the API limit
+    TRANSLATION_CACHE_TTL_SECONDS: int = 30 * 24 * 3600  # Translations cached in Redis, 0 = forever
 
     # Reddit settings
     REDDIT_CLIENT_ID: str = "ZdHLafxpZo6OtKIIn0uPOA"
@@ -46,6 +109,13 @@ class Settings(BaseSettings):
     DB_HOST: str = "postgres"
     DB_PORT: str = "5432"
     DB_NAME: str = "app"
+    DB_POOL_ENABLED: bool = True  # Off for one connection per session, e.g. behind PgBouncer
+    DB_POOL_SIZE: int = 10  # Connections kept open by each process
+    DB_MAX_OVERFLOW: int = 10  # Extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Connections older than this are replaced
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # Prepared statements cached per connection, unused without the pool
 
     # Redis settings
     REDIS_HOST: str = "redis"
@@ -53,6 +123,22 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: str = ""  # No password set in docker-compose
     REDIS_DB: int = 0
 
+    # Worker settings
+    WORKER_ID: str = ""  # Defaults to host name and process id
+    JOB_LEASE_SECONDS: float = 60.0  # A job whose lease is not renewed for this long is requeued
+    JOB_HEARTBEAT_SECONDS: float = 15.0
+    JOB_REAP_INTERVAL_SECONDS: float = 30.0
+    JOB_CLAIM_TIMEOUT_SECONDS: float = 5.0
+    JOB_MAX_RETRIES: int = 3  # Requeues before a job goes to the dead letter list
+    JOB_FALLBACK_POLL_SECONDS: float = 5.0  # Polling of Postgres for pending jobs while Redis is unavailable
+    WORKER_SLOTS: int = 0  # Jobs rendered at once by a worker, 0 = derived from CPUs and memory
+    WORKER_CORES_PER_SLOT: int = 4
+    WORKER_MEMORY_PER_SLOT_MB: int = 1536
+    WORKER_MAX_JOBS_PER_PROCESS: int = 20  # Render processes are replaced after this many jobs, 0 = never
+    FFMPEG_THREADS: int = 0  # Encoder threads per job, 0 = CPUs divided between the slots
+    WORKER_PREPARE_CONCURRENCY: int = 0  # Jobs translated and synthesized at once, 0 = one per slot
+    WORKER_PREPARED_JOBS: int = 0  # Prepared jobs waiting for a render slot, 0 = one per slot
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -64,5 +150,7 @@ settings = Settings()
 # Ensure directories exist
 os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
 os.makedirs(settings.CACHE_DIR, exist_ok=True)
+os.makedirs(settings.CARD_CACHE_DIR, exist_ok=True)
 os.makedirs(settings.FONTS_DIR, exist_ok=True)
 os.makedirs(settings.VIDEO_TEMPLATES_DIR, exist_ok=True)
+os.makedirs(settings.VIDEO_MEZZANINE_DIR, exist_ok=True)
@@ -0,0 +1,111 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from app.core.config import settings
+
+_blocking_executor: Optional[ThreadPoolExecutor] = None
+_blocking_executor_lock = threading.Lock()
+_render_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """The thread pool of the blocking calls of this process, BLOCKING_EXECUTOR_WORKERS threads."""
+    global _blocking_executor
+    if _blocking_executor is None:
+        with _blocking_executor_lock:
+            if _blocking_executor is None:
+                _blocking_executor = ThreadPoolExecutor(max_workers=settings.BLOCKING_EXECUTOR_WORKERS or None,
+                                                        thread_name_prefix="blocking")
+    return _blocking_executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking or CPU-bound call in the blocking executor, so the event loop keeps serving
+
+    Usage:
+        exists = await run_blocking(os.path.exists, video_path)
+
+    Args:
+        func: The function to call
+        *args: Positional arguments of the call
+        **kwargs: Keyword arguments of the call
+
+    Returns:
+        The result of the call
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_blocking_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_blocking_executor():
+    """Wait for the running blocking calls and stop the executor."""
+    global _blocking_executor
+    with _blocking_executor_lock:
+        if _blocking_executor is not None:
+            _blocking_executor.shutdown(wait=True)
+            _blocking_executor = None
+
+
+def _init_render_process(ffmpeg_threads):
+    """Initializer of the render processes, which are spawned and start from the default settings."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    settings.FFMPEG_THREADS = ffmpeg_threads
+    # Cards of one job are rendered within its share of the CPUs
+    settings.CARD_RENDER_WORKERS = settings.CARD_RENDER_WORKERS or min(ffmpeg_threads, 4)
+
+
+def start_render_pool(processes, ffmpeg_threads) -> ProcessPoolExecutor:
+    """
+    Start the process pool of the CPU-bound renders of this process
+
+    Args:
+        processes (int): Number of render processes, one per job slot
+        ffmpeg_threads (int): Encoder threads of each render
+
+    Returns:
+        ProcessPoolExecutor: The pool
+    """
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_render_process,
+            initargs=(ffmpeg_threads,),
+            max_tasks_per_child=settings.WORKER_MAX_JOBS_PER_PROCESS or None,
+        )
+    return _render_pool
+
+
+async def run_cpu_bound(func, *args, **kwargs):
+    """
+    Run a CPU-bound call in the render pool, or in the blocking executor when no pool was started
+
+    The call and its arguments are pickled, so func must be importable.
+
+    Args:
+        func: The function to call
+        *args: Positional arguments of the call
+        **kwargs: Keyword arguments of the call
+
+    Returns:
+        The result of the call
+    """
+    if _render_pool is None:
+        return await run_blocking(func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_render_pool, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_render_pool():
+    """Wait for the running renders and stop the render processes."""
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=True)
+        _render_pool = None
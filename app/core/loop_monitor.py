@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+LOOP_STATS_KEY = "loop_stats:{name}"
+
+
+class LoopLagMonitor:
+    """
+    Measure how late the event loop wakes a sleeping task, to catch blocking calls on the loop
+
+    Every LOOP_LAG_INTERVAL_SECONDS the monitor sleeps and compares the time it
+    woke up with the time it asked for. A lag over LOOP_LAG_THRESHOLD_SECONDS is
+    logged with its duration and counted in Redis under the process name.
+    """
+
+    def __init__(self, name, interval=None, threshold=None):
+        self.name = name
+        self.interval = interval or settings.LOOP_LAG_INTERVAL_SECONDS
+        self.threshold = threshold or settings.LOOP_LAG_THRESHOLD_SECONDS
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start monitoring the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name=f"loop-lag-{self.name}")
+            logger.info(f"Monitoring {self.name} event loop lag over {self.threshold * 1000:.0f} ms")
+
+    async def stop(self):
+        """Stop monitoring."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - expected
+            if lag > self.threshold:
+                await self._report(lag)
+
+    async def _report(self, lag):
+        self.stalls += 1
+        self.max_lag = max(self.max_lag, lag)
+        logger.warning(f"{self.name} event loop stalled for {lag * 1000:.0f} ms")
+
+        lag_ms = int(lag * 1000)
+        try:
+            async with get_redis() as redis_client:
+                key = LOOP_STATS_KEY.format(name=self.name)
+                pipeline = redis_client.pipeline()
+                pipeline.hincrby(key, "stalls", 1)
+                pipeline.hincrby(key, "stall_ms", lag_ms)
+                pipeline.hset(key, mapping={"last_stall_ms": lag_ms, "last_stall_at": int(time.time())})
+                await pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Failed to record {self.name} event loop stall: {str(e)}")
+
+
+def start_loop_monitor(name) -> Optional[LoopLagMonitor]:
+    """Start a LoopLagMonitor on the running loop, None when LOOP_LAG_MONITOR_ENABLED is off."""
+    if not settings.LOOP_LAG_MONITOR_ENABLED:
+        return None
+    monitor = LoopLagMonitor(name)
+    monitor.start()
+    return monitor
+
+
+async def get_loop_stats(name) -> dict:
+    """
+    Get the stall counters of the event loops of a process type, summed over every process
+
+    Args:
+        name (str): Name given to the monitor (e.g., 'api')
+
+    Returns:
+        dict: Counter name to value
+    """
+    async with get_redis() as redis_client:
+        stats = await redis_client.hgetall(LOOP_STATS_KEY.format(name=name))
+    return {key: int(value) for key, value in stats.items()}
@@ -1,7 +1,10 @@
 import os
+import threading
+import time
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import NullPool
 
@@ -14,15 +17,78 @@ DB_HOST = settings.DB_HOST if hasattr(settings, "DB_HOST") else os.getenv("DB_HO
 DB_PORT = settings.DB_PORT if hasattr(settings, "DB_PORT") else os.getenv("DB_PORT", "5432")
 DB_NAME = settings.DB_NAME if hasattr(settings, "DB_NAME") else os.getenv("DB_NAME", "reddit_comments")
 
-DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# asyncpg prepares every statement; the cache keeps the hot queries prepared on each pooled connection.
+# A transaction-mode pooler hands each transaction a different server connection, on which the
+# statements prepared by the previous one do not exist, so both caches are off without the pool.
+STATEMENT_CACHE_SIZE = settings.DB_STATEMENT_CACHE_SIZE if settings.DB_POOL_ENABLED else 0
+
+DATABASE_URL = (f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+                f"?prepared_statement_cache_size={STATEMENT_CACHE_SIZE}")
 
 # Create async engine
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    future=True,
-    poolclass=NullPool,  # Using NullPool for FastAPI compatibility
-)
+if settings.DB_POOL_ENABLED:
+    engine = create_async_engine(
+        DATABASE_URL,
+        echo=False,
+        future=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+else:
+    # One connection per session, for a transaction-mode pooler such as PgBouncer in front of Postgres
+    engine = create_async_engine(
+        DATABASE_URL,
+        echo=False,
+        future=True,
+        poolclass=NullPool,
+        connect_args={"statement_cache_size": 0},
+    )
+
+
+class PoolMetrics:
+    """Checkout counters of the connection pool of this process."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, wait_seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        """Counters of the pool and its current occupancy."""
+        pool = engine.pool
+        stats = {
+            "pool_size": settings.DB_POOL_SIZE if settings.DB_POOL_ENABLED else 0,
+            "max_overflow": settings.DB_MAX_OVERFLOW if settings.DB_POOL_ENABLED else 0,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else 0,
+            "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else 0,
+            "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else 0,
+        }
+        with self._lock:
+            stats.update(
+                checkouts=self.checkouts,
+                timeouts=self.timeouts,
+                mean_wait_ms=self.wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0,
+                max_wait_ms=self.max_wait_seconds * 1000,
+            )
+        return stats
+
+
+pool_metrics = PoolMetrics()
 
 # Create a session maker
 async_session_maker = async_sessionmaker(
@@ -49,6 +115,14 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     session = async_session_maker()
     try:
+        # Check the connection out up front, so the time spent waiting for the pool is measured
+        started = time.perf_counter()
+        try:
+            await session.connection()
+        except PoolTimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        pool_metrics.record_checkout(time.perf_counter() - started)
         yield session
     finally:
         await session.close()
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class RenderEngine(str, Enum):
+    MOVIEPY = "moviepy"
+    FFMPEG = "ffmpeg"
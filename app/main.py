@@ -2,8 +2,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from app.api.routes import video, crawl, option
+from app.api.routes import video, crawl, option, stats
 from app.core.config import settings
+from app.core.executor import shutdown_blocking_executor
+from app.core.loop_monitor import start_loop_monitor
+from app.db.redis import close_redis_connections
+from app.db.session import close_db_connections
 
 app = FastAPI(title="Post 2 Video API")
 
@@ -20,12 +24,28 @@ app.add_middleware(
 app.include_router(video.router, prefix="/api")
 app.include_router(crawl.router, prefix="/api")
 app.include_router(option.router, prefix="/api")
+app.include_router(stats.router, prefix="/api")
 
 # Mount the static directory
 app.mount("/static/output", StaticFiles(directory="generated/output"), name="output")
 app.mount("/static/assets", StaticFiles(directory="assets"), name="assets")
 
 
+@app.on_event("startup")
+async def start_monitors():
+    # Stalls of the API loop delay every concurrent request
+    app.state.loop_monitor = start_loop_monitor("api")
+
+
+@app.on_event("shutdown")
+async def stop_monitors():
+    if app.state.loop_monitor:
+        await app.state.loop_monitor.stop()
+    shutdown_blocking_executor()
+    await close_db_connections()
+    await close_redis_connections()
+
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Post 2 Video API"}
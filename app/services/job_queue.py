@@ -0,0 +1,203 @@
+import logging
+import os
+import socket
+import time
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "video_processing_queue"
+PROCESSING_KEY = "video_processing_queue:processing:{worker_id}"
+DEAD_LETTER_KEY = "video_processing_queue:dead"
+RETRIES_KEY = "video_processing_queue:retries"
+LEASE_KEY = "video_job_lease:{job_code}"
+WORKER_KEY = "video_worker:{worker_id}"
+
+# Move a job out of a processing list, back to the head of the queue or to the dead letter list once it has
+# used its retries. Returns the retry count, 0 when dead-lettered, -1 when another reaper took it first.
+REQUEUE_SCRIPT = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 0 then
+    return -1
+end
+local retries = redis.call('HINCRBY', KEYS[4], ARGV[1], 1)
+if retries > tonumber(ARGV[2]) then
+    redis.call('HDEL', KEYS[4], ARGV[1])
+    redis.call('LPUSH', KEYS[3], ARGV[1])
+    return 0
+end
+redis.call('RPUSH', KEYS[2], ARGV[1])
+return retries
+"""
+
+# Extend a lease only while this worker still holds it
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def default_worker_id():
+    """Host name and process id, unique among the running workers."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ReliableJobQueue:
+    """
+    Redis job queue that survives worker crashes
+
+    Producers push job codes to the queue. A worker claims a job by moving it
+    with BLMOVE into its own processing list, then holds a lease on it which it
+    renews while the job runs. When a worker dies, its leases expire, and the
+    reaper moves its jobs back to the queue. A job requeued more than
+    JOB_MAX_RETRIES times goes to the dead letter list instead.
+    """
+
+    def __init__(self, worker_id=None):
+        self.worker_id = worker_id or settings.WORKER_ID or default_worker_id()
+        self.processing_key = PROCESSING_KEY.format(worker_id=self.worker_id)
+        self.lease_ms = int(settings.JOB_LEASE_SECONDS * 1000)
+        # Jobs seen without a lease on the previous pass of the reaper, see reap
+        self._suspects = set()
+
+    async def enqueue(self, job_code):
+        """Add a job to the tail of the queue."""
+        async with get_redis() as redis_client:
+            await redis_client.lpush(QUEUE_KEY, job_code)
+
+    async def claim(self, timeout=None) -> Optional[str]:
+        """
+        Wait for a job, move it to the processing list of this worker and take its lease
+
+        Args:
+            timeout (float, optional): Seconds to wait, defaults to JOB_CLAIM_TIMEOUT_SECONDS
+
+        Returns:
+            str: Code of the claimed job, None if the queue stayed empty
+        """
+        timeout = settings.JOB_CLAIM_TIMEOUT_SECONDS if timeout is None else timeout
+        async with get_redis() as redis_client:
+            job_code = await redis_client.blmove(QUEUE_KEY, self.processing_key, timeout, "RIGHT", "LEFT")
+            if job_code:
+                await redis_client.set(LEASE_KEY.format(job_code=job_code), self.worker_id, px=self.lease_ms)
+        return job_code
+
+    async def is_tracked(self, job_code) -> bool:
+        """Whether a job is in the queue or in the processing list of a worker."""
+        async with get_redis() as redis_client:
+            if await redis_client.lpos(QUEUE_KEY, job_code) is not None:
+                return True
+            async for processing_key in redis_client.scan_iter(match=PROCESSING_KEY.format(worker_id="*")):
+                if await redis_client.lpos(processing_key, job_code) is not None:
+                    return True
+        return False
+
+    async def heartbeat(self, job_codes=()) -> List[str]:
+        """
+        Mark this worker alive and renew the leases of its running jobs
+
+        Args:
+            job_codes (list): Codes of the jobs this worker is running
+
+        Returns:
+            list: Codes of the jobs whose lease was lost, they may run again elsewhere
+        """
+        lost = []
+        async with get_redis() as redis_client:
+            await redis_client.set(WORKER_KEY.format(worker_id=self.worker_id), int(time.time()), px=self.lease_ms)
+            for job_code in job_codes:
+                renewed = await redis_client.eval(RENEW_SCRIPT, 1, LEASE_KEY.format(job_code=job_code),
+                                                  self.worker_id, self.lease_ms)
+                if not renewed:
+                    lost.append(job_code)
+        for job_code in lost:
+            logger.warning(f"Lost the lease of job {job_code}, it may be processed again")
+        return lost
+
+    async def ack(self, job_code, processed=True):
+        """
+        Remove a job from the processing list of this worker and release its lease
+
+        Args:
+            job_code (str): Code of the job
+            processed (bool): False for a queue entry that was dropped without running the job, e.g. a
+                duplicate of a job another worker runs, which keeps the retry count of the job
+        """
+        async with get_redis() as redis_client:
+            pipeline = redis_client.pipeline()
+            pipeline.lrem(self.processing_key, 1, job_code)
+            pipeline.delete(LEASE_KEY.format(job_code=job_code))
+            if processed:
+                pipeline.hdel(RETRIES_KEY, job_code)
+            await pipeline.execute()
+
+    async def reap(self, before_requeue) -> List[Tuple[str, int]]:
+        """
+        Requeue the jobs of every worker whose lease expired
+
+        The jobs of a dead worker are requeued right away. A job of a live worker
+        without a lease may have just been claimed, so it is only requeued when it
+        still has no lease on the next pass.
+
+        before_requeue is awaited before a job goes back to the queue, so the job
+        record can be made claimable first; a worker claiming the job as soon as
+        it is pushed must find it pending. When it raises, the job stays where it
+        is until the next pass.
+
+        Args:
+            before_requeue: Coroutine function called with (job_code, worker_id, dead_letter),
+                dead_letter being True when the job used its retries
+
+        Returns:
+            list: (job_code, retries) of the requeued jobs, retries being 0 for the dead-lettered ones
+        """
+        requeued = []
+        suspects = set()
+        async with get_redis() as redis_client:
+            async for processing_key in redis_client.scan_iter(match=PROCESSING_KEY.format(worker_id="*")):
+                worker_id = processing_key[len(PROCESSING_KEY.format(worker_id="")):]
+                worker_alive = await redis_client.exists(WORKER_KEY.format(worker_id=worker_id))
+
+                for job_code in await redis_client.lrange(processing_key, 0, -1):
+                    if await redis_client.exists(LEASE_KEY.format(job_code=job_code)):
+                        continue
+                    if worker_alive and (processing_key, job_code) not in self._suspects:
+                        suspects.add((processing_key, job_code))
+                        continue
+
+                    retries = int(await redis_client.hget(RETRIES_KEY, job_code) or 0)
+                    try:
+                        await before_requeue(job_code, worker_id, retries + 1 > settings.JOB_MAX_RETRIES)
+                    except Exception as e:
+                        logger.error(f"Could not release job {job_code} of worker {worker_id}: {str(e)}")
+                        continue
+
+                    retries = await redis_client.eval(REQUEUE_SCRIPT, 4, processing_key, QUEUE_KEY,
+                                                      DEAD_LETTER_KEY, RETRIES_KEY, job_code,
+                                                      settings.JOB_MAX_RETRIES)
+                    if retries < 0:
+                        continue
+                    if retries:
+                        logger.warning(f"Requeued job {job_code} of worker {worker_id} (retry {retries})")
+                    else:
+                        logger.error(f"Moved job {job_code} of worker {worker_id} to the dead letter list "
+                                     f"after {settings.JOB_MAX_RETRIES} retries")
+                    requeued.append((job_code, retries))
+
+        self._suspects = suspects
+        return requeued
+
+
+_job_queue: Optional[ReliableJobQueue] = None
+
+
+def get_job_queue() -> ReliableJobQueue:
+    """The ReliableJobQueue of this process."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = ReliableJobQueue()
+    return _job_queue
@@ -0,0 +1,48 @@
+import threading
+
+from app.core.config import settings
+from app.services.tts.base import TTSBackend
+from app.services.tts.google import GoogleTTSBackend
+from app.services.tts.local import LocalTTSBackend
+from app.services.tts.synthetic import SyntheticToneBackend
+
+BACKENDS = {
+    GoogleTTSBackend.name: GoogleTTSBackend,
+    LocalTTSBackend.name: LocalTTSBackend,
+    SyntheticToneBackend.name: SyntheticToneBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name) -> TTSBackend:
+    """The instance of a TTS backend in this process."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown TTS backend: {name}")
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
+
+
+def resolve_voice(voice_name) -> tuple:
+    """
+    Find the backend of a voice
+
+    A voice prefixed with a backend name, e.g. 'local:en-us' or 'tone:', uses
+    that backend. Other voices use TTS_BACKEND; a voice meant for Google is
+    dropped when TTS_BACKEND is another backend, which then picks its default.
+
+    Args:
+        voice_name (str): Voice of the job
+
+    Returns:
+        tuple: (TTSBackend, voice name within the backend)
+    """
+    prefix, separator, backend_voice = voice_name.partition(":")
+    if separator and prefix in BACKENDS:
+        return get_backend(prefix), backend_voice
+
+    backend = get_backend(settings.TTS_BACKEND)
+    return backend, voice_name if backend.name == GoogleTTSBackend.name else ""
@@ -0,0 +1,67 @@
+import subprocess
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class TTSBackend(ABC):
+    """A speech synthesis engine. Every backend returns MP3 audio, so they share the TTS cache and its index."""
+
+    name = ""
+
+    @abstractmethod
+    def synthesize(self, text, language_code, voice_name, speaking_rate=1.0, pitch=0.0) -> bytes:
+        """
+        Convert text to speech
+
+        Args:
+            text (str): The text to convert to speech
+            language_code (str): Language code (e.g., 'en-US')
+            voice_name (str): Name of the voice in this backend
+            speaking_rate (float): Speed of speech (1.0 is normal)
+            pitch (float): Voice pitch (-20.0 to 20.0)
+
+        Returns:
+            bytes: MP3 audio
+        """
+
+    def supports_marks(self, voice_name) -> bool:
+        """Whether the backend reads SSML and returns the times of its marks for a voice."""
+        return False
+
+    def synthesize_ssml(self, ssml, language_code, voice_name, speaking_rate=1.0, pitch=0.0) -> tuple:
+        """
+        Convert an SSML document to speech with the times of its marks
+
+        Returns:
+            tuple: (MP3 audio, dict of mark name to time in seconds)
+        """
+        raise NotImplementedError(f"The {self.name} TTS backend does not support SSML marks")
+
+
+def encode_mp3(audio, input_args=None, sample_rate=24000, ffmpeg_binary="ffmpeg") -> bytes:
+    """
+    Encode audio to mono MP3 like the Google voices, piping it through ffmpeg
+
+    Args:
+        audio (bytes): Input audio, a WAV file unless input_args describe a raw format
+        input_args (list, optional): ffmpeg options describing the input
+        sample_rate (int): Sample rate of the MP3
+        ffmpeg_binary (str): ffmpeg executable to use
+
+    Returns:
+        bytes: MP3 audio
+    """
+    cmd = [ffmpeg_binary, "-v", "error"] + (input_args or []) + [
+        "-i", "pipe:0", "-ac", "1", "-ar", str(sample_rate), "-c:a", "libmp3lame", "-b:a", "48k", "-f", "mp3",
+        "pipe:1"]
+    result = subprocess.run(cmd, input=audio, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to encode MP3: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def encode_pcm_mp3(samples: np.ndarray, sample_rate) -> bytes:
+    """Encode mono float32 samples to MP3."""
+    return encode_mp3(np.ascontiguousarray(samples, dtype=np.float32).tobytes(),
+                      input_args=["-f", "f32le", "-ar", str(sample_rate), "-ac", "1"])
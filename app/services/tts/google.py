@@ -0,0 +1,74 @@
+import os
+import threading
+
+from google.cloud import texttospeech, texttospeech_v1beta1
+
+from app.core.config import settings
+from app.services.tts.base import TTSBackend
+
+
+class GoogleTTSBackend(TTSBackend):
+    """Google Cloud TTS with one long-lived client per process, shared by every thread."""
+
+    name = "google"
+
+    def __init__(self, credentials_path=None):
+        self.credentials_path = str(credentials_path or settings.GOOGLE_CLOUD_CREDENTIALS_PATH)
+        self._client = None
+        self._beta_client = None
+        self._client_lock = threading.Lock()
+
+    def _create_client(self, module):
+        if os.path.exists(self.credentials_path):
+            return module.TextToSpeechClient.from_service_account_file(self.credentials_path)
+        # Fall back to the application default credentials
+        return module.TextToSpeechClient()
+
+    @property
+    def client(self) -> texttospeech.TextToSpeechClient:
+        """The TTS client, created on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client(texttospeech)
+        return self._client
+
+    @property
+    def beta_client(self) -> texttospeech_v1beta1.TextToSpeechClient:
+        """The v1beta1 TTS client, which can return the timepoints of SSML marks."""
+        if self._beta_client is None:
+            with self._client_lock:
+                if self._beta_client is None:
+                    self._beta_client = self._create_client(texttospeech_v1beta1)
+        return self._beta_client
+
+    def synthesize(self, text, language_code, voice_name, speaking_rate=1.0, pitch=0.0) -> bytes:
+        response = self.client.synthesize_speech(
+            input=texttospeech.SynthesisInput(text=text),
+            voice=texttospeech.VoiceSelectionParams(language_code=language_code, name=voice_name),
+            audio_config=texttospeech.AudioConfig(
+                audio_encoding=texttospeech.AudioEncoding.MP3,
+                speaking_rate=speaking_rate,
+                pitch=pitch
+            )
+        )
+        return response.audio_content
+
+    def supports_marks(self, voice_name) -> bool:
+        """Chirp and Journey voices, listed in TTS_VOICES_WITHOUT_MARKS, ignore SSML marks."""
+        return not any(marker in voice_name for marker in settings.TTS_VOICES_WITHOUT_MARKS)
+
+    def synthesize_ssml(self, ssml, language_code, voice_name, speaking_rate=1.0, pitch=0.0) -> tuple:
+        beta = texttospeech_v1beta1
+        response = self.beta_client.synthesize_speech(request=beta.SynthesizeSpeechRequest(
+            input=beta.SynthesisInput(ssml=ssml),
+            voice=beta.VoiceSelectionParams(language_code=language_code, name=voice_name),
+            audio_config=beta.AudioConfig(
+                audio_encoding=beta.AudioEncoding.MP3,
+                speaking_rate=speaking_rate,
+                pitch=pitch
+            ),
+            enable_time_pointing=[beta.SynthesizeSpeechRequest.TimepointType.SSML_MARK],
+        ))
+        marks = {timepoint.mark_name: timepoint.time_seconds for timepoint in response.timepoints}
+        return response.audio_content, marks
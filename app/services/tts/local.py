@@ -0,0 +1,62 @@
+import os
+import subprocess
+import tempfile
+
+from app.core.config import settings
+from app.services.tts.base import TTSBackend, encode_mp3
+
+# espeak-ng speaks at 175 words per minute at its default speed
+ESPEAK_DEFAULT_WPM = 175
+
+
+class LocalTTSBackend(TTSBackend):
+    """
+    Offline synthesis with espeak-ng or piper, run as subprocesses
+
+    The voice is an espeak-ng voice (e.g. 'en-us') or, for piper, the path of an
+    .onnx model. Without one, espeak-ng uses the language of the job and piper
+    uses TTS_PIPER_MODEL.
+    """
+
+    name = "local"
+
+    def __init__(self, engine=None, binary=None):
+        self.engine = engine or settings.TTS_LOCAL_ENGINE
+        self.binary = binary or self.engine
+
+    def synthesize(self, text, language_code, voice_name, speaking_rate=1.0, pitch=0.0) -> bytes:
+        if self.engine == "piper":
+            wav = self._synthesize_piper(text, voice_name, speaking_rate)
+        else:
+            wav = self._synthesize_espeak(text, language_code, voice_name, speaking_rate, pitch)
+        return encode_mp3(wav)
+
+    def _synthesize_espeak(self, text, language_code, voice_name, speaking_rate, pitch) -> bytes:
+        cmd = [
+            self.binary, "--stdout",
+            "-v", voice_name or language_code.lower(),
+            "-s", str(int(round(ESPEAK_DEFAULT_WPM * speaking_rate))),
+            # Google pitch is -20..20 semitones, espeak-ng pitch 0..99 with 50 as default
+            "-p", str(int(min(max(50 + pitch * 2.5, 0), 99))),
+            # The text comes from users, on stdin it can never be read as an option
+            "--stdin",
+        ]
+        result = subprocess.run(cmd, input=text.encode(), capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"espeak-ng failed: {result.stderr.decode(errors='replace').strip()}")
+        return result.stdout
+
+    def _synthesize_piper(self, text, voice_name, speaking_rate) -> bytes:
+        model = voice_name or str(settings.TTS_PIPER_MODEL)
+        fd, wav_path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            cmd = [self.binary, "--model", model, "--output_file", wav_path,
+                   "--length_scale", f"{1 / speaking_rate:.3f}"]
+            result = subprocess.run(cmd, input=text.encode(), capture_output=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"piper failed: {result.stderr.decode(errors='replace').strip()}")
+            with open(wav_path, "rb") as wav_file:
+                return wav_file.read()
+        finally:
+            os.remove(wav_path)
@@ -0,0 +1,30 @@
+import hashlib
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.tts.base import TTSBackend, encode_pcm_mp3
+
+SAMPLE_RATE = 24000
+
+
+class SyntheticToneBackend(TTSBackend):
+    """
+    Deterministic tones instead of speech, for benchmarks and load tests
+
+    A text always gives the same tone, lasting as long as it would take to read
+    at TTS_DEFAULT_CHARS_PER_SECOND, so timelines look like real jobs.
+    """
+
+    name = "tone"
+
+    def synthesize(self, text, language_code, voice_name, speaking_rate=1.0, pitch=0.0) -> bytes:
+        duration = max(0.3, len(text) / (settings.TTS_DEFAULT_CHARS_PER_SECOND * speaking_rate))
+        seed = int.from_bytes(hashlib.md5(f"{text}_{voice_name}".encode()).digest()[:4], "big")
+        frequency = (200 + seed % 400) * 2 ** (pitch / 12)
+
+        t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+        # Short fades so the clips do not click
+        envelope = np.minimum(1.0, np.minimum(t, duration - t) / 0.02)
+        samples = 0.3 * envelope * np.sin(2 * np.pi * frequency * t)
+        return encode_pcm_mp3(samples, SAMPLE_RATE)
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services.tts import resolve_voice
+from app.services.tts_shared_cache import get_shared_tts_cache
+from app.utils.cache_manager import get_cache_manager
+from app.utils.duration_predictor import get_duration_predictor
+from app.utils.mp3_info import parse_mp3_info, read_mp3_info
+from app.utils.ssml import build_ssml_chunks, end_mark, start_mark
+
+logger = logging.getLogger(__name__)
+
+
+def get_info_path(audio_path):
+    """Path of the sidecar index of a cached audio file."""
+    return f"{os.path.splitext(audio_path)[0]}.json"
+
+
+class TextToSpeechService:
+    """
+    Text to speech on pluggable backends, with an md5-keyed file cache
+
+    The backend of a voice comes from its prefix or TTS_BACKEND, see resolve_voice.
+    Every backend shares the cache, the duration index and the TTS_CONCURRENCY limit.
+    """
+
+    def __init__(self, output_dir=None, concurrency=None):
+        self.output_dir = output_dir or settings.CACHE_DIR
+        self.concurrency = concurrency or settings.TTS_CONCURRENCY
+        self._executor_lock = threading.Lock()
+        self._executor = None
+
+    def get_cache_path(self, text, language_code="en-US", voice_name="en-US-Standard-D", speaking_rate=1.0,
+                       pitch=0.0, output_dir=None):
+        """Path of the cached audio file of a text and voice, whether it exists or not."""
+        content_hash = hashlib.md5(
+            f"{text}_{language_code}_{voice_name}_{speaking_rate}_{pitch}".encode()
+        ).hexdigest()
+        return os.path.join(output_dir or self.output_dir, f"tts_{content_hash}.mp3")
+
+    def synthesize(self, text, language_code="en-US", voice_name="en-US-Standard-D", speaking_rate=1.0, pitch=0.0,
+                   output_dir=None):
+        """
+        Convert text to speech, reusing the cached file when there is one
+
+        The local cache is checked first, then the shared cache when it is enabled.
+        Clips synthesized here are published to the shared cache.
+
+        Args:
+            text (str): The text to convert to speech
+            language_code (str): Language code (e.g., 'en-US')
+            voice_name (str): Name of the voice to use
+            speaking_rate (float): Speed of speech (1.0 is normal)
+            pitch (float): Voice pitch (-20.0 to 20.0)
+            output_dir (str, optional): Directory of the audio files, defaults to CACHE_DIR
+
+        Returns:
+            str: Path to audio file
+        """
+        output_file = self.get_cache_path(text, language_code, voice_name, speaking_rate, pitch, output_dir)
+        if self._find_cached(output_file):
+            return output_file
+
+        backend, backend_voice = resolve_voice(voice_name)
+        audio_content = backend.synthesize(text, language_code, backend_voice, speaking_rate, pitch)
+
+        info = self._store(output_file, audio_content, language_code=language_code, voice_name=voice_name,
+                           speaking_rate=speaking_rate, chars=len(text), words=len(text.split()))
+        get_duration_predictor().observe(language_code, voice_name, text, info["duration"], speaking_rate)
+        return output_file
+
+    def _find_cached(self, output_file) -> bool:
+        """Look a file up in the local cache, then in the shared cache."""
+        if get_cache_manager(os.path.dirname(output_file)).lookup(output_file):
+            logger.debug(f"Using existing audio file: {output_file}")
+            return True
+
+        # Another worker may have synthesized it already
+        shared_cache = get_shared_tts_cache()
+        if shared_cache and shared_cache.fetch(output_file, get_info_path(output_file)):
+            logger.info(f"Fetched audio file from the shared cache: {output_file}")
+            return True
+        return False
+
+    def _store(self, output_file, audio_content, **info):
+        """Write synthesized audio and its sidecar index to the local cache and publish them."""
+        # The index is written first, so an audio file in the cache always has one
+        info = self._write_info(output_file, parse_mp3_info(audio_content), **info)
+        get_cache_manager(os.path.dirname(output_file)).write(output_file, audio_content)
+        logger.info(f"Audio content written to: {output_file}")
+
+        shared_cache = get_shared_tts_cache()
+        if shared_cache:
+            shared_cache.publish(output_file, get_info_path(output_file))
+        return info
+
+    def supports_marks(self, voice_name) -> bool:
+        """Whether a voice reads SSML and returns mark timepoints, which Chirp, Journey and offline voices do not."""
+        backend, backend_voice = resolve_voice(voice_name)
+        return backend.supports_marks(backend_voice)
+
+    def synthesize_ssml(self, ssml, language_code="en-US", voice_name="en-US-Standard-D", speaking_rate=1.0,
+                        pitch=0.0, output_dir=None):
+        """
+        Convert an SSML document to speech with the times of its marks, reusing the cached file when there is one
+
+        Args:
+            ssml (str): The SSML document
+            language_code (str): Language code (e.g., 'en-US')
+            voice_name (str): Name of the voice to use
+            speaking_rate (float): Speed of speech (1.0 is normal)
+            pitch (float): Voice pitch (-20.0 to 20.0)
+            output_dir (str, optional): Directory of the audio files, defaults to CACHE_DIR
+
+        Returns:
+            tuple: (audio_path, marks), marks mapping each mark name to its time in seconds
+        """
+        output_file = self.get_cache_path(f"ssml:{ssml}", language_code, voice_name, speaking_rate, pitch,
+                                          output_dir)
+        if self._find_cached(output_file):
+            return output_file, self.get_audio_info(output_file).get("marks", {})
+
+        backend, backend_voice = resolve_voice(voice_name)
+        audio_content, marks = backend.synthesize_ssml(ssml, language_code, backend_voice, speaking_rate, pitch)
+        self._store(output_file, audio_content, language_code=language_code, voice_name=voice_name, marks=marks)
+        return output_file, marks
+
+    def synthesize_timeline(self, texts: List[str], language_code="en-US", voice_name="en-US-Standard-D",
+                            pause_time=1.0, speaking_rate=1.0, pitch=0.0, output_dir=None) -> Optional[List[tuple]]:
+        """
+        Convert the texts of a job to speech with one SSML request, or one per TTS_SSML_MAX_BYTES of SSML
+
+        A mark is placed around each text, so the clip of a text is a slice of
+        the job audio whose bounds come from the API, without decoding anything.
+
+        Args:
+            texts (list): The texts to convert to speech, in reading order
+            language_code (str): Language code (e.g., 'en-US')
+            voice_name (str): Name of the voice to use
+            pause_time (float): Pause between two texts in seconds
+            speaking_rate (float): Speed of speech (1.0 is normal)
+            pitch (float): Voice pitch (-20.0 to 20.0)
+            output_dir (str, optional): Directory of the audio files, defaults to CACHE_DIR
+
+        Returns:
+            list: (audio_path, offset, duration) of each text, None if the voice does not return marks
+        """
+        if not texts or not self.supports_marks(voice_name):
+            return None
+
+        chunks = build_ssml_chunks(texts, pause_time, settings.TTS_SSML_MAX_BYTES)
+        futures = [
+            self._get_executor().submit(self.synthesize_ssml, ssml, language_code, voice_name, speaking_rate, pitch,
+                                        output_dir)
+            for ssml, _ in chunks
+        ]
+
+        clips = [None] * len(texts)
+        for (_, indices), future in zip(chunks, futures):
+            audio_path, marks = future.result()
+            for index in indices:
+                start, end = marks.get(start_mark(index)), marks.get(end_mark(index))
+                if start is None or end is None:
+                    logger.warning(f"Voice {voice_name} returned no marks, synthesizing comments one by one")
+                    return None
+                clips[index] = (audio_path, start, end - start)
+        return clips
+
+    def get_audio_info(self, audio_path):
+        """
+        Read the duration, sample rate and size of a cached audio file from its sidecar index
+
+        Entries cached before the index existed get one from their frame headers.
+        Nothing is decoded and no subprocess is started.
+
+        Args:
+            audio_path (str): Path to the cached audio file
+
+        Returns:
+            dict: duration, sample_rate, channels, bytes, language_code and voice_name
+        """
+        info_path = get_info_path(audio_path)
+        try:
+            with open(info_path) as info_file:
+                return json.load(info_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return self._write_info(audio_path, read_mp3_info(audio_path))
+
+    def _write_info(self, audio_path, info, language_code=None, voice_name=None, **extra):
+        info = dict(info, language_code=language_code, voice_name=voice_name, **extra)
+        get_cache_manager(os.path.dirname(audio_path)).write(get_info_path(audio_path), json.dumps(info).encode())
+        return info
+
+    def synthesize_many(self, texts: List[str], language_code="en-US", voice_name="en-US-Standard-D",
+                        speaking_rate=1.0, pitch=0.0, output_dir=None) -> List[str]:
+        """
+        Convert several texts to speech concurrently, at most TTS_CONCURRENCY requests at a time
+
+        Args:
+            texts (list): The texts to convert to speech
+            language_code (str): Language code (e.g., 'en-US')
+            voice_name (str): Name of the voice to use
+            speaking_rate (float): Speed of speech (1.0 is normal)
+            pitch (float): Voice pitch (-20.0 to 20.0)
+            output_dir (str, optional): Directory of the audio files, defaults to CACHE_DIR
+
+        Returns:
+            list: Path to the audio file of each text, in the order of texts
+        """
+        # Synthesize each distinct text once
+        unique_texts = list(dict.fromkeys(texts))
+        futures = {
+            text: self._get_executor().submit(self.synthesize, text, language_code, voice_name, speaking_rate,
+                                              pitch, output_dir)
+            for text in unique_texts
+        }
+        paths = {text: future.result() for text, future in futures.items()}
+        return [paths[text] for text in texts]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="tts")
+        return self._executor
+
+    def close(self):
+        """Stop the synthesis threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_tts_service: Optional[TextToSpeechService] = None
+
+
+def get_tts_service() -> TextToSpeechService:
+    """The TextToSpeechService of this process."""
+    global _tts_service
+    if _tts_service is None:
+        _tts_service = TextToSpeechService()
+    return _tts_service
@@ -0,0 +1,141 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from botocore.config import Config
+
+from app.core.config import settings
+from app.utils.cache_manager import get_cache_manager
+from app.utils.cache_stats import record_cache_stats
+
+logger = logging.getLogger(__name__)
+
+
+def create_r2_client():
+    """Build the CloudflareR2Client of the shared TTS cache from the CLOUDFLARE_* environment variables."""
+    # Imported here, the module configures logging when it is imported
+    from assets_bucket_cloudflare import CloudflareCredentials, CloudflareR2Client
+
+    credentials = CloudflareCredentials.from_env()
+    if settings.TTS_SHARED_CACHE_BUCKET:
+        credentials.bucket_name = settings.TTS_SHARED_CACHE_BUCKET
+    if settings.TTS_SHARED_CACHE_ENDPOINT_URL:
+        credentials.endpoint_url = settings.TTS_SHARED_CACHE_ENDPOINT_URL
+    # A slow or unreachable bucket must cost a cache miss, not a stalled synthesis
+    timeout = settings.TTS_SHARED_CACHE_TIMEOUT_SECONDS
+    config = Config(connect_timeout=timeout, read_timeout=timeout, retries={"total_max_attempts": 2})
+    return CloudflareR2Client(credentials, config=config)
+
+
+class SharedTTSCache:
+    """
+    Second tier of the TTS cache in an R2 or S3-compatible bucket, shared by every worker
+
+    Objects are named after the local cache files, which are already content
+    addressed, so a clip synthesized by one worker is found by all the others.
+    Errors of the bucket never fail a job, they count as misses.
+
+    Fetches run on their own threads and are given up after
+    TTS_SHARED_CACHE_TIMEOUT_SECONDS. After a failed fetch the bucket is skipped
+    for TTS_SHARED_CACHE_BACKOFF_SECONDS, so an unreachable endpoint does not
+    slow every synthesis down.
+    """
+
+    def __init__(self, r2_client=None, prefix=None):
+        self._r2_client = r2_client
+        self.prefix = settings.TTS_SHARED_CACHE_PREFIX if prefix is None else prefix
+        self._publish_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tts-publish")
+        # The clip and its index are fetched together, for each synthesis thread
+        self._fetch_executor = ThreadPoolExecutor(max_workers=2 * settings.TTS_CONCURRENCY,
+                                                  thread_name_prefix="tts-fetch")
+        self._skip_until = 0.0
+
+    @property
+    def r2_client(self):
+        if self._r2_client is None:
+            self._r2_client = create_r2_client()
+        return self._r2_client
+
+    def _object_name(self, path):
+        return f"{self.prefix}{os.path.basename(path)}"
+
+    def fetch(self, audio_path, info_path) -> bool:
+        """
+        Copy a clip and its sidecar index from the bucket into the local cache
+
+        Args:
+            audio_path (str): Local cache path of the clip
+            info_path (str): Local cache path of its sidecar index
+
+        Returns:
+            bool: True if the clip was in the bucket
+        """
+        if time.monotonic() < self._skip_until:
+            record_cache_stats("tts_shared", misses=1)
+            return False
+
+        deadline = time.monotonic() + settings.TTS_SHARED_CACHE_TIMEOUT_SECONDS
+        try:
+            r2_client = self.r2_client
+            audio_future = self._fetch_executor.submit(r2_client.get_object, self._object_name(audio_path))
+            info_future = self._fetch_executor.submit(r2_client.get_object, self._object_name(info_path))
+            audio_content = audio_future.result(timeout=settings.TTS_SHARED_CACHE_TIMEOUT_SECONDS)
+            info_content = info_future.result(timeout=max(0.0, deadline - time.monotonic())) \
+                if audio_content else None
+        except Exception as e:
+            logger.warning(f"Shared TTS cache fetch failed for {audio_path}, skipping it for "
+                           f"{settings.TTS_SHARED_CACHE_BACKOFF_SECONDS:g} s: {str(e) or type(e).__name__}")
+            self._skip_until = time.monotonic() + settings.TTS_SHARED_CACHE_BACKOFF_SECONDS
+            audio_content = None
+
+        if not audio_content:
+            record_cache_stats("tts_shared", misses=1)
+            return False
+
+        cache = get_cache_manager(os.path.dirname(audio_path))
+        # The sidecar goes first, so the clip is never in the local cache without it
+        if info_content:
+            cache.write(info_path, info_content)
+        cache.write(audio_path, audio_content)
+        record_cache_stats("tts_shared", hits=1, bytes_fetched=len(audio_content))
+        return True
+
+    def publish(self, audio_path, info_path):
+        """
+        Upload a clip synthesized by this worker and its sidecar index in the background
+
+        Args:
+            audio_path (str): Local cache path of the clip
+            info_path (str): Local cache path of its sidecar index
+        """
+        self._publish_executor.submit(self._publish, audio_path, info_path)
+
+    def _publish(self, audio_path, info_path):
+        try:
+            for path in (info_path, audio_path):
+                result = self.r2_client.upload_file(path, self._object_name(path))
+                if not result["success"] and not result.get("skipped"):
+                    raise RuntimeError(result["error"])
+            record_cache_stats("tts_shared", publishes=1)
+        except Exception as e:
+            logger.warning(f"Shared TTS cache publish failed for {audio_path}: {str(e)}")
+
+    def close(self):
+        """Wait for the pending uploads."""
+        self._fetch_executor.shutdown(wait=False, cancel_futures=True)
+        self._publish_executor.shutdown(wait=True)
+
+
+_shared_tts_cache: Optional[SharedTTSCache] = None
+
+
+def get_shared_tts_cache() -> Optional[SharedTTSCache]:
+    """The SharedTTSCache of this process, None when TTS_SHARED_CACHE_ENABLED is off."""
+    global _shared_tts_cache
+    if not settings.TTS_SHARED_CACHE_ENABLED:
+        return None
+    if _shared_tts_cache is None:
+        _shared_tts_cache = SharedTTSCache()
+    return _shared_tts_cache
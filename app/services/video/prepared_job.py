@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from app.api.dto.reddit_dto import Comment
+from app.utils.video_geometry import OutputGeometry
+
+
+@dataclass
+class PreparedJob:
+    """A job whose network-bound work is done, translation and speech included, ready to be encoded."""
+    job_code: str
+    video_path: str
+    comments: List[Comment]
+    lang: str
+    voice: str
+    theme: Optional[str]
+    start_offset: float
+    geometry: OutputGeometry
+    has_audio: bool
+    render_engine: str
+    encoding_profile: Optional[str] = None
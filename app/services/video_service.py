@@ -8,19 +8,31 @@ from typing import List, Tuple, Dict, Any, Optional
 
 import yt_dlp as youtube_dl
 from fastapi import HTTPException
-from moviepy.editor import VideoFileClip
 from sqlalchemy import text
 
 from app.api.dto.video_dto import Comment, ResponseMessage, JobStatusResponse
 from app.core.config import settings
-from app.db.redis import get_redis
+from app.core.executor import run_blocking, run_cpu_bound
 from app.db.session import get_db
+from app.enum.render import RenderEngine
 from app.enum.voice import Gender, Language
+from app.services.job_queue import get_job_queue
+from app.services.video.prepared_job import PreparedJob
 from app.services.video.video_proglog import VideoProgLog
+from app.utils.audio_mix import mix_comments_audio
+from app.utils.cache_manager import flush_cache_stats, maintain_cache
+from app.utils.cache_stats import record_cache_stats
+from app.utils.card_renderer import render_cards
 from app.utils.comment_audio_generator import generate_comments_with_duration
-from app.utils.reddit_comment_overlay import add_comments_to_video, write_videofile
-from app.utils.translate import translate_comments, translate_text
+from app.utils.encoding_profile import get_encoding_profile
+from app.utils.ffmpeg_render import render_comments_with_ffmpeg
+from app.utils.reddit_comment_overlay import add_cards_to_video, write_videofile
+from app.utils.render_hash import compute_render_hash
+from app.utils.segment_render import get_segment_count, render_video_in_segments
+from app.utils.template_ingest import get_video_info, pick_start_offset, resolve_template
+from app.utils.translate import translate_comments
 from app.utils.trim_video import trim_video_to_fit_comments
+from app.utils.video_geometry import compute_output_geometry, open_video_clip
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -41,7 +53,9 @@ class VideoService:
             vid_len: Optional[int] = None,
             ratio: Optional[str] = None,
             theme: Optional[str] = None,
-            title: Optional[str] = None
+            title: Optional[str] = None,
+            render_engine: Optional[RenderEngine] = None,
+            encoding_profile: Optional[str] = None
     ) -> ResponseMessage:
         """
         Create a job to add comments to a video and process it in the background.
@@ -55,6 +69,8 @@ class VideoService:
             ratio: Aspect ratio of the video
             theme: Theme for the video overlay
             title: Title of the video
+            render_engine: Engine used to render the video, None to use the server default
+            encoding_profile: Name of the encoding profile, None to use the server default
 
         Returns:
             ResponseMessage indicating success/failure
@@ -66,14 +82,7 @@ class VideoService:
             # Extract video name from path
             video_name = os.path.basename(video_path)
 
-            # Serialize comments to JSON
-            if lang != Language.English:
-                title = translate_text(title, lang)
-                logger.info(f"Translated title to {lang}")
-
-                comments = translate_comments(comments, lang)
-                logger.info(f"Translated {len(comments)} comments to {lang}")
-
+            # Serialize comments to JSON, they are translated by the worker
             comments_json = [comment.model_dump() for comment in comments]
 
             voice_id_dict = {
@@ -96,28 +105,38 @@ class VideoService:
                 "vid_len": vid_len,
                 "ratio": ratio,
                 "theme": theme,
-                "title": title
+                "title": title,
+                "render_engine": render_engine.value if render_engine else None,
+                "encoding_profile": encoding_profile
             }
 
-            # Get database session
-            async with get_db() as db_session:
-                # Create job record
-                query = """
-                INSERT INTO job_add_reddit_comment_overlay
-                (job_code, status, video_name, comments, voice_id, language, video_length, ratio, theme, post_title)
-                VALUES (:job_code, :status, :video_name, :comments, :voice_id, :lang, :vid_len, :ratio, :theme, :title)
-                """
-
-                await db_session.execute(
-                    text(query), video_info_dict
+            # Identical submissions share one job, see compute_render_hash
+            video_info_dict["render_hash"] = compute_render_hash(
+                video_name, comments, title, voice_id, lang, vid_len=vid_len, ratio=ratio, theme=theme,
+                render_engine=render_engine, encoding_profile=encoding_profile)
+
+            existing_job = await self._insert_job(video_info_dict)
+            await run_blocking(record_cache_stats, "renders", hits=int(existing_job is not None),
+                               misses=int(existing_job is None))
+            if existing_job:
+                existing_code, existing_status = existing_job
+                logger.info(f"Attached submission to {existing_status} job {existing_code} with the same inputs")
+                if existing_status == "pending":
+                    await self._requeue_if_lost(existing_code)
+                return ResponseMessage(
+                    success=True,
+                    message=f"Job with the same inputs already exists with code: {existing_code}",
+                    data={"job_code": existing_code, "deduplicated": True}
                 )
 
-                await db_session.commit()
-
             # Instead of starting a background task, publish to Redis
-            async with get_redis() as redis_client:
-                await redis_client.lpush("video_processing_queue", job_code)
-                logger.info(f"Added job {job_code} to Redis processing queue")
+            try:
+                await get_job_queue().enqueue(job_code)
+            except Exception as e:
+                # A pending job nobody runs would keep its render hash and absorb every identical submission
+                await self._fail_job(job_code, e)
+                raise
+            logger.info(f"Added job {job_code} to Redis processing queue")
 
             return ResponseMessage(
                 success=True,
@@ -132,70 +151,160 @@ class VideoService:
                 detail=f"Error creating video comment job: {str(e)}"
             )
 
-    async def process_video_job(self, video_info_dict: dict):
+    async def _requeue_if_lost(self, job_code: str):
+        """Enqueue a pending job again when Redis holds it nowhere, e.g. when the API stopped before enqueueing it."""
+        job_queue = get_job_queue()
+        try:
+            if not await job_queue.is_tracked(job_code):
+                await job_queue.enqueue(job_code)
+                logger.warning(f"Pending job {job_code} was in no queue, enqueued it again")
+        except Exception as e:
+            # The worker also claims pending jobs from Postgres while Redis is down
+            logger.warning(f"Could not check the queue of pending job {job_code}: {str(e)}")
+
+    async def _insert_job(self, video_info_dict: dict) -> Optional[Tuple[str, str]]:
         """
-        Process a video job in the background.
+        Create the record of a job unless a job with the same render hash has not failed
+
+        The partial unique index on render_hash makes the check and the insert
+        atomic, so concurrent identical submissions still create a single job.
+        A completed job whose output file is gone is detached from its hash and
+        rendered again.
+
+        Args:
+            video_info_dict: Values of the job record, render_hash included
+
+        Returns:
+            (job_code, status) of the existing job, None if the job was created
         """
-        try:
-            job_code = video_info_dict["job_code"]
-            # Get job details from database
+        insert_query = """
+        INSERT INTO job_add_reddit_comment_overlay
+        (job_code, status, video_name, comments, voice_id, language, video_length, ratio, theme, post_title,
+         render_engine, encoding_profile, render_hash)
+        VALUES (:job_code, :status, :video_name, :comments, :voice_id, :lang, :vid_len, :ratio, :theme, :title,
+                :render_engine, :encoding_profile, :render_hash)
+        ON CONFLICT (render_hash) WHERE status <> 'failed' DO NOTHING
+        RETURNING job_code
+        """
+        existing_query = """
+        SELECT job_code, status, output_path
+        FROM job_add_reddit_comment_overlay
+        WHERE render_hash = :render_hash AND status <> 'failed'
+        """
+
+        # Try again when the conflicting job failed or was detached in between
+        for _ in range(3):
             async with get_db() as db_session:
-                query = """
-                SELECT video_name, comments, post_title
-                FROM job_add_reddit_comment_overlay
-                WHERE job_code = :job_code AND status = 'pending'
-                """
+                result = await db_session.execute(text(insert_query), video_info_dict)
+                if result.fetchone():
+                    await db_session.commit()
+                    return None
 
-                result = await db_session.execute(text(query), {"job_code": job_code})
-                job = result.fetchone()
+                result = await db_session.execute(text(existing_query),
+                                                  {"render_hash": video_info_dict["render_hash"]})
+                existing = result.fetchone()
+                if not existing:
+                    continue
 
-                if not job:
-                    logger.error(f"Job {job_code} not found or not pending")
-                    return
+                existing_code, existing_status, output_path = existing
+                if existing_status == "completed" and not (
+                        output_path and await run_blocking(os.path.exists, output_path)):
+                    await db_session.execute(
+                        text("UPDATE job_add_reddit_comment_overlay SET render_hash = NULL WHERE job_code = :job_code"),
+                        {"job_code": existing_code}
+                    )
+                    await db_session.commit()
+                    logger.info(f"Output of job {existing_code} is gone, rendering the inputs again")
+                    continue
+                return existing_code, existing_status
 
-                video_name, comments_data, post_title = job
+        raise RuntimeError(f"Could not create or find the job of render hash {video_info_dict['render_hash']}")
 
-                # Update status to processing
-                await db_session.execute(
-                    text("UPDATE job_add_reddit_comment_overlay SET status = 'processing' WHERE job_code = :job_code"),
-                    {"job_code": job_code}
-                )
-                await db_session.commit()
-                logger.info(f"Updated job {job_code} to processing status")
-
-            # Get the video path and process
-            video_path = os.path.join(self.video_templates_dir, video_name)
-            comments = [Comment(**comment) for comment in comments_data]
-
-            if post_title:
-                # Create a title comment object
-                title_comment = Comment(
-                    username="OP",
-                    text=post_title,
-                    start_time=0.0,
-                    duration=0.0,
-                    avatar=settings.DEFAULT_AVATAR.__str__(),
-                    is_title=True  # Add a flag to indicate this is a title
-                )
-                comments.insert(0, title_comment)
-
-            # Process the video
-            video = VideoFileClip(video_path)
-            target_duration = video_info_dict["video_length"]
-            if target_duration is not None and target_duration > 90:
-                target_duration = 90
-            processed_comments, _ = generate_comments_with_duration(comments, target_duration,
-                                                                    allow_exceed_duration=True,
-                                                                    lang=video_info_dict["language"],
-                                                                    voice=video_info_dict["voice_id"])
-            video = add_comments_to_video(video, processed_comments, lang=video_info_dict["language"],
-                                          voice=video_info_dict["voice_id"])
-            video = trim_video_to_fit_comments(video, processed_comments)
-
-            progress_logger = VideoProgLog(job_code=job_code)
-            output_path = write_videofile(video, progress_callback=progress_logger)
-            video.close()
+    async def process_video_job(self, video_info_dict: dict, worker_id: Optional[str] = None):
+        """
+        Process a video job in the background.
+        """
+        job = await self.claim_job(video_info_dict["job_code"], worker_id)
+        if not job:
+            logger.error(f"Job {video_info_dict['job_code']} not found or not pending")
+            return
+
+        prepared_job = await self.prepare_video_job(job)
+        if prepared_job:
+            await self.render_prepared_job(prepared_job)
+
+    async def claim_job(self, job_code: Optional[str], worker_id: Optional[str] = None,
+                        claimed_from: str = "postgres") -> Optional[dict]:
+        """
+        Atomically move a pending job to processing and return its row, in a single statement
+
+        The row is locked with SKIP LOCKED, so when several workers race for a
+        job exactly one of them gets it. Without a job code the oldest pending job
+        is claimed, which makes the table itself a queue when Redis is unavailable.
+
+        Args:
+            job_code: Code of the job to claim, None for the oldest pending job
+            worker_id: Id of the claiming worker, recorded on the job
+            claimed_from: 'redis' when the job came from the Redis queue, whose reaper then recovers it,
+                'postgres' otherwise
 
+        Returns:
+            Every column of the claimed job, None if no matching job was pending
+        """
+        query = f"""
+        UPDATE job_add_reddit_comment_overlay
+        SET status = 'processing', worker_id = :worker_id, started_at = NOW(), claimed_from = :claimed_from
+        WHERE id = (
+            SELECT id FROM job_add_reddit_comment_overlay
+            WHERE status = 'pending' {"AND job_code = :job_code" if job_code else ""}
+            ORDER BY created_at
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+        """
+        async with get_db() as db_session:
+            result = await db_session.execute(text(query), {"job_code": job_code, "worker_id": worker_id,
+                                                            "claimed_from": claimed_from})
+            job = result.fetchone()
+            await db_session.commit()
+
+        if not job:
+            return None
+        logger.info(f"Worker {worker_id} claimed job {job.job_code}")
+        return dict(job._mapping)
+
+    async def prepare_video_job(self, job: dict) -> Optional[PreparedJob]:
+        """
+        Do the network-bound work of a claimed job: translation, speech and template probing
+
+        Args:
+            job: Row of the job returned by claim_job
+
+        Returns:
+            The job ready to render, None if it failed
+        """
+        job_code = job["job_code"]
+        try:
+            # Waits on Google APIs, so it runs in the blocking executor
+            return await run_blocking(self._prepare_job, job_code, job, job["video_name"], job["comments"],
+                                      job["post_title"])
+
+        except Exception as e:
+            await self._fail_job(job_code, e)
+            return None
+
+    async def render_prepared_job(self, prepared_job: PreparedJob):
+        """
+        Encode a prepared job and record its output
+
+        Args:
+            prepared_job: The job returned by prepare_video_job
+        """
+        job_code = prepared_job.job_code
+        try:
+            # Rendering is CPU-bound, it runs in a render process so the loop keeps serving Redis and the database
+            output_path = await run_cpu_bound(self._render_prepared_job, prepared_job)
             logger.info(f"Video processing completed, output path: {output_path}")
 
             # Update job status to completed - wrap this in its own try block
@@ -218,21 +327,161 @@ class VideoService:
             logger.info(f"Job {job_code} processed successfully")
 
         except Exception as e:
-            logger.error(f"Error processing job {job_code}: {str(e)}", exc_info=True)
-            # Update job status to failed
-            try:
-                async with get_db() as db_session:
-                    await db_session.execute(
-                        text("""
-                        UPDATE job_add_reddit_comment_overlay
-                        SET status = 'failed', error_message = :error
-                        WHERE job_code = :job_code
-                        """),
-                        {"job_code": job_code, "error": str(e)}
-                    )
-                    await db_session.commit()
-            except Exception as update_error:
-                logger.error(f"Failed to update job status to failed: {str(update_error)}", exc_info=True)
+            await self._fail_job(job_code, e)
+        finally:
+            # Keep the TTS and working cache under its byte budget
+            await run_blocking(maintain_cache)
+
+    async def _fail_job(self, job_code, error: Exception):
+        """Record the error of a job and mark it failed."""
+        logger.error(f"Error processing job {job_code}: {str(error)}", exc_info=error)
+        # Update job status to failed
+        try:
+            async with get_db() as db_session:
+                await db_session.execute(
+                    text("""
+                    UPDATE job_add_reddit_comment_overlay
+                    SET status = 'failed', error_message = :error
+                    WHERE job_code = :job_code
+                    """),
+                    {"job_code": job_code, "error": str(error)}
+                )
+                await db_session.commit()
+        except Exception as update_error:
+            logger.error(f"Failed to update job status to failed: {str(update_error)}", exc_info=True)
+
+    def _prepare_job(self, job_code, video_info_dict, video_name, comments_data, post_title) -> PreparedJob:
+        """
+        Translate and synthesize the comments of a job and lay out its timeline, blocking until done
+
+        Args:
+            job_code: Code of the job
+            video_info_dict: Row of the job
+            video_name: File name of the video template
+            comments_data: Comments of the job, as stored
+            post_title: Title of the post, None for no title card
+
+        Returns:
+            The job ready to render
+        """
+        # Get the video path and process, from the template mezzanine when it has been ingested
+        video_path = resolve_template(video_name, self.video_templates_dir)
+        comments = [Comment(**comment) for comment in comments_data]
+
+        if post_title:
+            # Create a title comment object
+            title_comment = Comment(
+                username="OP",
+                text=post_title,
+                start_time=0.0,
+                duration=0.0,
+                avatar=settings.DEFAULT_AVATAR.__str__(),
+                is_title=True  # Add a flag to indicate this is a title
+            )
+            comments.insert(0, title_comment)
+
+        # The title and the comments are translated together, in one batched request
+        if video_info_dict["language"] != Language.English:
+            comments = translate_comments(comments, video_info_dict["language"])
+            logger.info(f"Translated {len(comments)} texts of job {job_code} to {video_info_dict['language']}")
+
+        # Process the video
+        target_duration = video_info_dict["video_length"]
+        if target_duration is not None and target_duration > 90:
+            target_duration = 90
+        processed_comments, _ = generate_comments_with_duration(comments, target_duration,
+                                                                allow_exceed_duration=True,
+                                                                lang=video_info_dict["language"],
+                                                                voice=video_info_dict["voice_id"])
+
+        start_offset = 0.0
+        if settings.TEMPLATE_RANDOM_START and processed_comments:
+            timeline_duration = max(c.start_time + c.duration for c in processed_comments)
+            start_offset = pick_start_offset(video_path, timeline_duration)
+            logger.info(f"Starting job {job_code} at {start_offset:.2f} s of {video_path}")
+
+        # Crop and scale to the requested ratio when the template is decoded
+        template_info = get_video_info(video_path)
+        geometry = compute_output_geometry(template_info["width"], template_info["height"],
+                                           ratio=video_info_dict["ratio"])
+        logger.info(f"Job {job_code} renders at {geometry.width}x{geometry.height}")
+
+        # Draw the cards while the job waits for a render slot, the render loads them from the card cache
+        if settings.CARD_CACHE_ENABLED:
+            render_cards(processed_comments, geometry.width, video_info_dict["theme"])
+
+        return PreparedJob(
+            job_code=job_code,
+            video_path=str(video_path),
+            comments=processed_comments,
+            lang=video_info_dict["language"],
+            voice=video_info_dict["voice_id"],
+            theme=video_info_dict["theme"],
+            start_offset=start_offset,
+            geometry=geometry,
+            has_audio=bool(template_info.get("has_audio")),
+            render_engine=video_info_dict.get("render_engine") or settings.RENDER_ENGINE,
+            encoding_profile=video_info_dict.get("encoding_profile"),
+        )
+
+    def _render_prepared_job(self, job: PreparedJob) -> str:
+        """
+        Compose and encode the video of a prepared job, blocking until it is written
+
+        Args:
+            job: The job returned by _prepare_job
+
+        Returns:
+            Path of the output video
+        """
+        try:
+            return self._render_with_engine(job)
+        finally:
+            # The cache counters of a render process are not seen by the worker process
+            flush_cache_stats()
+
+    def _render_with_engine(self, job: PreparedJob) -> str:
+        """Render a prepared job with its render engine, see _render_prepared_job."""
+        render_engine = RenderEngine(job.render_engine)
+        progress_logger = VideoProgLog(job_code=job.job_code)
+        encoding_profile = get_encoding_profile(job.encoding_profile)
+        logger.info(f"Rendering job {job.job_code} with the {render_engine.value} engine "
+                    f"and the {encoding_profile.name} encoding profile")
+
+        if render_engine == RenderEngine.FFMPEG:
+            output_path = render_comments_with_ffmpeg(job.video_path, job.comments,
+                                                      lang=job.lang,
+                                                      voice=job.voice,
+                                                      theme=job.theme,
+                                                      start_offset=job.start_offset,
+                                                      geometry=job.geometry,
+                                                      encoding_profile=encoding_profile,
+                                                      progress_callback=progress_logger.update)
+        elif get_segment_count() > 1:
+            output_path = render_video_in_segments(job.video_path, job.comments,
+                                                   lang=job.lang,
+                                                   voice=job.voice,
+                                                   theme=job.theme,
+                                                   start_offset=job.start_offset,
+                                                   geometry=job.geometry,
+                                                   encoding_profile=encoding_profile,
+                                                   progress_callback=progress_logger.update)
+        else:
+            source_video = open_video_clip(job.video_path, job.geometry, audio=False)
+            video = source_video.subclip(job.start_offset) if job.start_offset else source_video
+            video = add_cards_to_video(video, job.comments, theme=job.theme)
+            video = trim_video_to_fit_comments(video, job.comments)
+
+            audio_samples = mix_comments_audio(job.comments, lang=job.lang,
+                                               voice=job.voice, duration=video.duration,
+                                               video_path=job.video_path if job.has_audio else None,
+                                               start_offset=job.start_offset)
+            output_path = write_videofile(video, encoding_profile=encoding_profile,
+                                          progress_callback=progress_logger, audio_samples=audio_samples)
+            video.close()
+            source_video.close()
+
+        return output_path
 
     async def get_job_status(self, job_code: str) -> JobStatusResponse:
         """Get the status of a video processing job."""
@@ -284,6 +533,12 @@ class VideoService:
                 message=f"Error getting job status: {str(e)}",
             )
 
+    @staticmethod
+    def _download_with_ydl(url, ydl_opts) -> Tuple[str, Dict[str, Any]]:
+        with youtube_dl.YoutubeDL(ydl_opts) as ydl:
+            info_dict = ydl.extract_info(url, download=True)
+            return ydl.prepare_filename(info_dict), info_dict
+
     async def download_youtube_video(self, url: str, height=720, output_path=None, max_retries=3) -> Tuple[
         str, Dict[str, Any]]:
         if not output_path:
@@ -307,10 +562,7 @@ class VideoService:
 
         while retry_count <= max_retries:
             try:
-                with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-                    info_dict = ydl.extract_info(url, download=True)
-                    video_title = ydl.prepare_filename(info_dict)
-                    return video_title, info_dict
+                return await run_blocking(self._download_with_ydl, url, ydl_opts)
 
             except youtube_dl.utils.HTTPError as e:
                 if '403' in str(e):
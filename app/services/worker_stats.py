@@ -0,0 +1,80 @@
+import logging
+import time
+from typing import List
+
+from app.core.config import settings
+from app.db.redis import get_redis
+from app.db.session import pool_metrics
+
+logger = logging.getLogger(__name__)
+
+WORKER_STATS_KEY = "worker_stats:{worker_id}"
+
+
+class SlotUtilization:
+    """Busy time of the job slots of a worker since it started."""
+
+    def __init__(self, slots, ffmpeg_threads):
+        self.slots = slots
+        self.ffmpeg_threads = ffmpeg_threads
+        self.started_at = time.monotonic()
+        self.busy_slots = 0
+        self.jobs_completed = 0
+        self._busy_seconds = 0.0
+        self._changed_at = self.started_at
+
+    def _accumulate(self):
+        now = time.monotonic()
+        self._busy_seconds += self.busy_slots * (now - self._changed_at)
+        self._changed_at = now
+
+    def job_started(self):
+        self._accumulate()
+        self.busy_slots += 1
+
+    def job_finished(self):
+        self._accumulate()
+        self.busy_slots -= 1
+        self.jobs_completed += 1
+
+    def utilization(self) -> float:
+        """Share of the slot time spent on jobs since the worker started."""
+        self._accumulate()
+        elapsed = self._changed_at - self.started_at
+        return self._busy_seconds / (self.slots * elapsed) if elapsed > 0 else 0.0
+
+    async def publish(self, worker_id):
+        """Record the utilization of the worker in Redis, it expires with the lease of the worker."""
+        db_pool = pool_metrics.snapshot()
+        try:
+            async with get_redis() as redis_client:
+                key = WORKER_STATS_KEY.format(worker_id=worker_id)
+                await redis_client.hset(key, mapping={
+                    "slots": self.slots,
+                    "busy_slots": self.busy_slots,
+                    "ffmpeg_threads": self.ffmpeg_threads,
+                    "jobs_completed": self.jobs_completed,
+                    "utilization": f"{self.utilization():.4f}",
+                    "uptime_seconds": int(time.monotonic() - self.started_at),
+                    "db_checked_out": db_pool["checked_out"],
+                    "db_mean_wait_ms": f"{db_pool['mean_wait_ms']:.2f}",
+                })
+                await redis_client.pexpire(key, int(settings.JOB_LEASE_SECONDS * 1000))
+        except Exception as e:
+            logger.warning(f"Failed to record the utilization of worker {worker_id}: {str(e)}")
+
+
+async def get_worker_stats() -> List[dict]:
+    """
+    Get the slot utilization of every running worker
+
+    Returns:
+        list: Stats of each worker, with its worker_id
+    """
+    workers = []
+    async with get_redis() as redis_client:
+        async for key in redis_client.scan_iter(match=WORKER_STATS_KEY.format(worker_id="*")):
+            stats = await redis_client.hgetall(key)
+            if stats:
+                workers.append(dict(stats, worker_id=key[len(WORKER_STATS_KEY.format(worker_id="")):]))
+    return sorted(workers, key=lambda worker: worker["worker_id"])
@@ -0,0 +1,162 @@
+import subprocess
+from typing import List
+
+import numpy as np
+
+from app.api.dto.reddit_dto import Comment
+from app.core.config import settings
+from app.utils.text_to_speech import generate_audio_from_text
+
+
+def decode_audio(audio_path, sample_rate=None, channels=2, start=0.0, duration=None, ffmpeg_binary="ffmpeg"):
+    """
+    Decode an audio file (or the audio of a video) to float32 PCM
+
+    Args:
+        audio_path (str): Path to the media file
+        sample_rate (int, optional): Output sample rate, defaults to AUDIO_SAMPLE_RATE
+        channels (int): Output channel count
+        start (float): Time to start decoding at, in seconds
+        duration (float, optional): Seconds to decode, everything if None
+        ffmpeg_binary (str): ffmpeg executable to use
+
+    Returns:
+        np.ndarray: Samples of shape (n_samples, channels)
+    """
+    if sample_rate is None:
+        sample_rate = settings.AUDIO_SAMPLE_RATE
+
+    cmd = [ffmpeg_binary, "-v", "error"]
+    if start > 0:
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", str(audio_path), "-vn"]
+    if duration is not None:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += ["-f", "f32le", "-acodec", "pcm_f32le", "-ac", str(channels), "-ar", str(sample_rate), "-"]
+
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to decode {audio_path}: {result.stderr.decode(errors='replace').strip()}")
+
+    # frombuffer is read-only, copy once so the samples can be scaled in place
+    return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, channels).copy()
+
+
+def mix_audio_tracks(tracks, duration, sample_rate=None, channels=2, gain=1.0, peak_limit=None):
+    """
+    Place decoded tracks into one preallocated buffer at their sample offsets
+
+    Args:
+        tracks (list): List of (samples, start_time) tuples
+        duration (float): Duration of the mix in seconds
+        sample_rate (int, optional): Sample rate of the tracks, defaults to AUDIO_SAMPLE_RATE
+        channels (int): Channel count of the tracks
+        gain (float): Gain applied to the mix
+        peak_limit (float, optional): Scale the mix down when its peak is above this, defaults to AUDIO_PEAK_LIMIT
+
+    Returns:
+        np.ndarray: Mixed samples of shape (n_samples, channels)
+    """
+    if sample_rate is None:
+        sample_rate = settings.AUDIO_SAMPLE_RATE
+    if peak_limit is None:
+        peak_limit = settings.AUDIO_PEAK_LIMIT
+
+    mix = np.zeros((int(round(duration * sample_rate)), channels), dtype=np.float32)
+
+    for samples, start_time in tracks:
+        offset = max(0, int(round(start_time * sample_rate)))
+        length = min(len(samples), len(mix) - offset)
+        if length > 0:
+            mix[offset:offset + length] += samples[:length]
+
+    if gain != 1.0:
+        mix *= gain
+
+    peak = float(np.abs(mix).max()) if len(mix) else 0.0
+    if peak_limit and peak > peak_limit:
+        mix *= peak_limit / peak
+
+    return mix
+
+
+def mix_comments_audio(comments_data: List[Comment], lang, voice, duration, video_path=None, start_offset=0.0):
+    """
+    Mix the TTS audio of every comment, and the template audio if any, into one PCM buffer
+
+    Each audio file is decoded once, even if several comments share it, such
+    as the comments of one SSML request which are slices of the same file.
+
+    Args:
+        comments_data (list): List of Comment with start_time set
+        lang (str): language code (e.g., 'en-US')
+        voice (str): voice name (e.g., 'en-US-Standard-D')
+        duration (float): Duration of the mix in seconds
+        video_path (str, optional): Template whose audio is mixed under the comments
+        start_offset (float): Time of the template the mix starts at
+
+    Returns:
+        np.ndarray: Mixed samples of shape (n_samples, 2), None if there is no audio
+    """
+    tracks = []
+
+    if video_path:
+        tracks.append((decode_audio(video_path, start=start_offset, duration=duration), 0.0))
+
+    decoded = {}
+    for comment in comments_data:
+        audio_path = comment.audio_path or generate_audio_from_text(text=comment.text, speaking_rate=1.0,
+                                                                    language_code=lang, voice_name=voice)
+        if audio_path not in decoded:
+            decoded[audio_path] = decode_audio(audio_path)
+
+        samples = decoded[audio_path]
+        if comment.audio_offset is not None:
+            # Views into the decoded file, nothing is copied
+            start = int(round(comment.audio_offset * settings.AUDIO_SAMPLE_RATE))
+            samples = samples[start:start + int(round(comment.duration * settings.AUDIO_SAMPLE_RATE))]
+        tracks.append((samples, comment.start_time))
+
+    if not tracks:
+        return None
+
+    return mix_audio_tracks(tracks, duration, gain=settings.AUDIO_GAIN)
+
+
+def mux_audio(video_path, samples, output_path, sample_rate=None, concat=False, faststart=True,
+              ffmpeg_binary="ffmpeg"):
+    """
+    Encode the PCM mix to AAC once and mux it with the video stream, which is copied
+
+    The samples are piped to ffmpeg, no temporary audio file is written.
+
+    Args:
+        video_path (str): Video file, or concat list when concat is True
+        samples (np.ndarray): float32 samples of shape (n_samples, channels)
+        output_path (str): Path of the muxed video
+        sample_rate (int, optional): Sample rate of the samples, defaults to AUDIO_SAMPLE_RATE
+        concat (bool): Read the video with the concat demuxer
+        faststart (bool): Move the moov atom to the front of the file
+        ffmpeg_binary (str): ffmpeg executable to use
+    """
+    if sample_rate is None:
+        sample_rate = settings.AUDIO_SAMPLE_RATE
+
+    samples = np.ascontiguousarray(samples, dtype=np.float32)
+    cmd = [ffmpeg_binary, "-y", "-loglevel", "error"]
+    if concat:
+        cmd += ["-f", "concat", "-safe", "0"]
+    cmd += ["-i", str(video_path),
+            "-f", "f32le", "-ar", str(sample_rate), "-ac", str(samples.shape[1]), "-i", "pipe:0",
+            "-map", "0:v", "-map", "1:a",
+            "-c:v", "copy", "-c:a", "aac", "-b:a", settings.AUDIO_BITRATE,
+            "-shortest"]
+    if faststart:
+        cmd += ["-movflags", "+faststart"]
+    cmd.append(str(output_path))
+
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, stderr = process.communicate(input=memoryview(samples).cast('B'))
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg mux failed with exit code {process.returncode}: "
+                           f"{stderr.decode(errors='replace').strip()}")
@@ -0,0 +1,288 @@
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing, contextmanager
+from typing import Optional
+
+from app.core.config import settings
+from app.utils.cache_stats import record_cache_stats, set_cache_gauges
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = ".cache_index.sqlite"
+
+# Files the working directory leaves behind when a job dies before cleaning up
+TEMP_MARKERS = (".part", "_TEMP_", "segments_", "cards_", "benchmark_")
+
+
+def _entry_name(path):
+    """An entry is a file and its sidecars, i.e. every file with the same stem."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class CacheManager:
+    """
+    Byte-bounded LRU/TTL cache over a directory, with a persistent SQLite index
+
+    The index stores the size of every cached file and the last access time of
+    every entry, so eviction never scans the directory. Only a missing index is
+    rebuilt from a scan. Files are written to a temporary name and renamed, so a
+    concurrent job never reads a partial file.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None, ttl_seconds=None, name="tts", prefix="tts_"):
+        self.cache_dir = str(cache_dir or settings.CACHE_DIR)
+        self.max_bytes = settings.CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.ttl_seconds = settings.CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.name = name
+        self.prefix = prefix
+        self.index_path = os.path.join(self.cache_dir, INDEX_FILENAME)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_written = 0
+        self.bytes_evicted = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._open_index()
+
+    @contextmanager
+    def _connect(self):
+        with closing(sqlite3.connect(self.index_path, timeout=30)) as connection:
+            with connection:
+                yield connection
+
+    def _open_index(self):
+        rebuild = not os.path.exists(self.index_path)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS entries (entry TEXT PRIMARY KEY, last_access REAL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, entry TEXT, size INTEGER)")
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            connection.execute("CREATE INDEX IF NOT EXISTS files_entry ON files (entry)")
+        if rebuild:
+            self.rebuild_index()
+
+    def rebuild_index(self):
+        """Index the files already in the directory, only needed when the index is missing."""
+        rows = []
+        with os.scandir(self.cache_dir) as it:
+            for dir_entry in it:
+                if dir_entry.is_file() and dir_entry.name.startswith(self.prefix) \
+                        and not dir_entry.name.endswith(".part"):
+                    stat = dir_entry.stat()
+                    rows.append((dir_entry.name, _entry_name(dir_entry.name), stat.st_size, stat.st_mtime))
+
+        with self._connect() as connection:
+            connection.executemany("INSERT OR REPLACE INTO files (name, entry, size) VALUES (?, ?, ?)",
+                                   [row[:3] for row in rows])
+            connection.executemany("INSERT INTO entries (entry, last_access) VALUES (?, ?) "
+                                   "ON CONFLICT (entry) DO UPDATE SET last_access = MAX(last_access, excluded.last_access)",
+                                   [(row[1], row[3]) for row in rows])
+        logger.info(f"Indexed {len(rows)} files of {self.cache_dir}")
+
+    def _touch(self, connection, entry):
+        connection.execute("INSERT INTO entries (entry, last_access) VALUES (?, ?) "
+                           "ON CONFLICT (entry) DO UPDATE SET last_access = excluded.last_access",
+                           (entry, time.time()))
+
+    def lookup(self, path) -> bool:
+        """
+        Check whether a file is cached, marking its entry as recently used
+
+        Args:
+            path (str): Path of the file in the cache directory
+
+        Returns:
+            bool: True if the file exists
+        """
+        if not os.path.exists(path):
+            with self._lock:
+                self.misses += 1
+            return False
+
+        with self._connect() as connection:
+            self._touch(connection, _entry_name(path))
+            # Files written by an older version are indexed on their first hit
+            connection.execute("INSERT OR IGNORE INTO files (name, entry, size) VALUES (?, ?, ?)",
+                               (os.path.basename(path), _entry_name(path), os.path.getsize(path)))
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def write(self, path, content: bytes):
+        """
+        Write a file of the cache, to a temporary name first then renamed in place
+
+        Args:
+            path (str): Path of the file in the cache directory
+            content (bytes): Content of the file
+        """
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        with self._connect() as connection:
+            connection.execute("INSERT OR REPLACE INTO files (name, entry, size) VALUES (?, ?, ?)",
+                               (os.path.basename(path), _entry_name(path), len(content)))
+            self._touch(connection, _entry_name(path))
+        with self._lock:
+            self.bytes_written += len(content)
+
+    def total_bytes(self) -> int:
+        """Size of the cached files according to the index."""
+        with self._connect() as connection:
+            return connection.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+
+    def _remove_entry(self, connection, entry) -> int:
+        files = connection.execute("SELECT name, size FROM files WHERE entry = ?", (entry,)).fetchall()
+        removed_bytes = 0
+        for name, size in files:
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                removed_bytes += size
+            except FileNotFoundError:
+                pass
+        connection.execute("DELETE FROM files WHERE entry = ?", (entry,))
+        connection.execute("DELETE FROM entries WHERE entry = ?", (entry,))
+        return removed_bytes
+
+    def evict(self):
+        """Remove the entries not used within the TTL, then the least recently used until under the byte budget."""
+        evictions = 0
+        evicted_bytes = 0
+        with self._connect() as connection:
+            if self.ttl_seconds:
+                expired = connection.execute("SELECT entry FROM entries WHERE last_access < ?",
+                                             (time.time() - self.ttl_seconds,)).fetchall()
+                for (entry,) in expired:
+                    evicted_bytes += self._remove_entry(connection, entry)
+                    evictions += 1
+
+            total_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+            if total_bytes > self.max_bytes:
+                oldest = connection.execute("SELECT entry FROM entries ORDER BY last_access").fetchall()
+                for (entry,) in oldest:
+                    if total_bytes <= self.max_bytes:
+                        break
+                    removed_bytes = self._remove_entry(connection, entry)
+                    total_bytes -= removed_bytes
+                    evicted_bytes += removed_bytes
+                    evictions += 1
+
+        with self._lock:
+            self.evictions += evictions
+            self.bytes_evicted += evicted_bytes
+        if evictions:
+            logger.info(f"{self.name} cache evicted {evictions} entries ({evicted_bytes} bytes), "
+                        f"{total_bytes} bytes left")
+        return total_bytes
+
+    def sweep_temp_files(self, max_age_seconds=None):
+        """
+        Remove the temporary files and directories left in the cache directory by jobs that died
+
+        This scans the directory, so it is meant for worker startup.
+
+        Args:
+            max_age_seconds (float, optional): Only remove what is older than this, defaults to
+                CACHE_TEMP_MAX_AGE_SECONDS
+        """
+        if max_age_seconds is None:
+            max_age_seconds = settings.CACHE_TEMP_MAX_AGE_SECONDS
+        cutoff = time.time() - max_age_seconds
+
+        removed = 0
+        with os.scandir(self.cache_dir) as it:
+            for dir_entry in it:
+                if not any(marker in dir_entry.name for marker in TEMP_MARKERS):
+                    continue
+                try:
+                    if dir_entry.stat().st_mtime > cutoff:
+                        continue
+                    if dir_entry.is_dir():
+                        shutil.rmtree(dir_entry.path, ignore_errors=True)
+                    else:
+                        os.remove(dir_entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    continue
+        if removed:
+            logger.info(f"Removed {removed} leftover temporary files from {self.cache_dir}")
+
+    def flush_stats(self):
+        """Add the counters since the last flush to the totals in Redis and record the cache size."""
+        with self._lock:
+            counters = self.stats()
+            self.hits = self.misses = self.evictions = self.bytes_written = self.bytes_evicted = 0
+        record_cache_stats(self.name, **counters)
+        set_cache_gauges(self.name, size_bytes=self.total_bytes(), max_bytes=self.max_bytes)
+
+    def stats(self) -> dict:
+        """Counters of this cache instance since the last flush."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes_written": self.bytes_written,
+            "bytes_evicted": self.bytes_evicted,
+        }
+
+
+_cache_managers = {}
+_cache_managers_lock = threading.Lock()
+
+
+def get_cache_manager(cache_dir=None) -> CacheManager:
+    """The CacheManager of a cache directory in this process, CACHE_DIR by default."""
+    cache_dir = str(cache_dir or settings.CACHE_DIR)
+    with _cache_managers_lock:
+        if cache_dir not in _cache_managers:
+            _cache_managers[cache_dir] = CacheManager(cache_dir)
+        return _cache_managers[cache_dir]
+
+
+def flush_cache_stats():
+    """
+    Publish the counters of every cache of this process
+
+    Render processes call it at the end of each task, since only the worker
+    process runs maintain_cache.
+    """
+    with _cache_managers_lock:
+        caches = list(_cache_managers.values())
+    for cache in caches:
+        try:
+            cache.flush_stats()
+        except Exception as e:
+            logger.warning(f"Failed to flush the stats of cache {cache.cache_dir}: {str(e)}")
+
+
+def maintain_cache(cache_dir=None) -> Optional[int]:
+    """
+    Evict the cache down to its budget and publish its stats, logging instead of raising
+
+    Args:
+        cache_dir (str, optional): Cache directory, defaults to CACHE_DIR
+
+    Returns:
+        int: Bytes left in the cache, None if eviction failed
+    """
+    try:
+        cache = get_cache_manager(cache_dir)
+        total_bytes = cache.evict()
+        cache.flush_stats()
+        return total_bytes
+    except Exception as e:
+        logger.error(f"Failed to maintain cache {cache_dir or settings.CACHE_DIR}: {str(e)}")
+        return None
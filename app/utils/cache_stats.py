@@ -0,0 +1,62 @@
+import logging
+
+from app.db.redis import get_redis, get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+CACHE_STATS_KEY = "cache_stats:{name}"
+
+
+def record_cache_stats(cache_name, **counters):
+    """
+    Add counters of a cache to the totals shared by every process in Redis
+
+    Args:
+        cache_name (str): Name of the cache (e.g., 'cards')
+        **counters: Counter increments, e.g. hits=3, misses=1
+    """
+    counters = {name: value for name, value in counters.items() if value}
+    if not counters:
+        return
+
+    try:
+        redis_client = get_sync_redis()
+        pipeline = redis_client.pipeline()
+        for name, value in counters.items():
+            pipeline.hincrby(CACHE_STATS_KEY.format(name=cache_name), name, int(value))
+        pipeline.execute()
+        redis_client.close()
+    except Exception as e:
+        logger.warning(f"Failed to record {cache_name} cache stats: {str(e)}")
+
+
+def set_cache_gauges(cache_name, **gauges):
+    """
+    Set gauges of a cache, such as its current size, next to its counters in Redis
+
+    Args:
+        cache_name (str): Name of the cache (e.g., 'tts')
+        **gauges: Gauge values, e.g. size_bytes=1024
+    """
+    try:
+        redis_client = get_sync_redis()
+        redis_client.hset(CACHE_STATS_KEY.format(name=cache_name),
+                          mapping={name: int(value) for name, value in gauges.items()})
+        redis_client.close()
+    except Exception as e:
+        logger.warning(f"Failed to record {cache_name} cache gauges: {str(e)}")
+
+
+async def get_cache_stats(cache_name) -> dict:
+    """
+    Get the counters of a cache recorded by every process
+
+    Args:
+        cache_name (str): Name of the cache (e.g., 'cards')
+
+    Returns:
+        dict: Counter name to total value
+    """
+    async with get_redis() as redis_client:
+        stats = await redis_client.hgetall(CACHE_STATS_KEY.format(name=cache_name))
+    return {name: int(value) for name, value in stats.items()}
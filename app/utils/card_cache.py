@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from functools import lru_cache
+from typing import Optional
+
+from PIL import Image
+
+from app.api.dto.reddit_dto import Comment
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when the card layout changes so old cards are not reused
+CARD_CACHE_VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def _font_set_signature(font_dir):
+    """Names and sizes of the fonts cards are drawn with."""
+    fonts = []
+    for name in ("arial.ttf", "arial_bold.ttf"):
+        path = os.path.join(font_dir, name)
+        fonts.append((name, os.path.getsize(path) if os.path.exists(path) else None))
+    return fonts
+
+
+def _file_signature(path):
+    """Path, size and modification time of a file, so a changed avatar gets a new key."""
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [str(path), stat.st_size, int(stat.st_mtime)]
+
+
+class CardCache:
+    """
+    Content-addressed on-disk cache of rendered card PNGs
+
+    Cards are keyed by a hash of everything that changes their pixels. Hits
+    refresh the file modification time, and the least recently used cards are
+    evicted once the directory is over its byte budget.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = str(cache_dir or settings.CARD_CACHE_DIR)
+        self.max_bytes = settings.CARD_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(comment: Comment, video_width, theme) -> str:
+        """
+        Build the cache key of a card
+
+        Args:
+            comment (Comment): The comment or title the card is drawn for
+            video_width (int): Width of the video the card is placed on
+            theme (str): Theme of the card
+
+        Returns:
+            str: Hex digest identifying the card
+        """
+        payload = {
+            "version": CARD_CACHE_VERSION,
+            "username": comment.username,
+            "text": comment.text,
+            "is_title": bool(comment.is_title),
+            "avatar": _file_signature(comment.avatar) or comment.avatar,
+            "default_avatar": _file_signature(settings.DEFAULT_AVATAR),
+            "width": int(video_width),
+            "theme": theme,
+            "fonts": _font_set_signature(str(settings.FONTS_DIR)),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"card_{key}.png")
+
+    def get(self, key) -> Optional[Image.Image]:
+        """
+        Load a cached card
+
+        Args:
+            key (str): Cache key from CardCache.key
+
+        Returns:
+            PIL.Image: The card, or None if it is not cached
+        """
+        path = self._path(key)
+        try:
+            image = Image.open(path)
+            image.load()
+        except (FileNotFoundError, OSError):
+            self.misses += 1
+            return None
+
+        # Mark the card as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return image
+
+    def put(self, key, image: Image.Image):
+        """
+        Store a card, written to a temporary file first so readers never see a partial PNG
+
+        Args:
+            key (str): Cache key from CardCache.key
+            image (PIL.Image): The rendered card
+        """
+        fd, temp_path = tempfile.mkstemp(prefix=".card_", suffix=".png", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                image.save(temp_file, format="PNG")
+            os.replace(temp_path, self._path(key))
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def evict(self):
+        """Remove the least recently used cards until the cache fits in its byte budget."""
+        entries = []
+        total_bytes = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not (entry.name.startswith("card_") and entry.name.endswith(".png")):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_bytes += stat.st_size
+
+        if total_bytes <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total_bytes -= size
+            self.evictions += 1
+
+        logger.info(f"Card cache evicted down to {total_bytes} bytes ({self.evictions} evictions)")
+
+    def stats(self) -> dict:
+        """Counters of this cache instance."""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,337 @@
+import logging
+import multiprocessing
+import os
+import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.api.dto.reddit_dto import Comment
+from app.core.config import settings
+from app.utils.cache_stats import record_cache_stats
+from app.utils.card_cache import CardCache
+
+logger = logging.getLogger(__name__)
+
+# Colors of the cards for each theme
+THEMES = {
+    "dark": {
+        "comment_background": (26, 26, 27, 220),
+        "username": (58, 160, 255),
+        "comment_text": (215, 218, 220),
+        "title_background": (36, 36, 38, 230),
+        "title_indicator": (255, 69, 0),  # Reddit orange
+        "title_text": (240, 240, 245),
+    },
+    "light": {
+        "comment_background": (255, 255, 255, 230),
+        "username": (0, 121, 211),
+        "comment_text": (28, 28, 28),
+        "title_background": (246, 247, 248, 240),
+        "title_indicator": (255, 69, 0),  # Reddit orange
+        "title_text": (26, 26, 27),
+    },
+}
+DEFAULT_THEME = "dark"
+
+_card_pool = None
+_card_cache = None
+
+
+@dataclass
+class RenderedCard:
+    """A rendered card image and the time it took to draw or load it."""
+    image: Image.Image
+    render_time: float
+    cached: bool = False
+
+
+@lru_cache(maxsize=None)
+def _load_font(font_path, size):
+    """Load a TrueType font once per process, falling back to the default font."""
+    try:
+        return ImageFont.truetype(str(font_path), size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=None)
+def _circle_mask(size):
+    """Circular alpha mask used to crop avatars."""
+    mask = Image.new('L', (size, size), 0)
+    draw = ImageDraw.Draw(mask)
+    draw.ellipse((0, 0, size, size), fill=255)
+    return mask
+
+
+@lru_cache(maxsize=256)
+def _load_avatar(avatar_path, default_avatar, size):
+    """Load, resize and crop an avatar once per process. The returned image must not be modified."""
+    if avatar_path and os.path.exists(avatar_path):
+        avatar = Image.open(avatar_path)
+    else:
+        # Create a default avatar if none is provided
+        avatar = Image.new('RGB', (size, size), color=(200, 200, 200))
+        if default_avatar and os.path.exists(default_avatar):
+            avatar = Image.open(default_avatar)
+
+    avatar = avatar.resize((size, size))
+    avatar.putalpha(_circle_mask(size))
+    return avatar
+
+
+def _get_palette(theme):
+    return THEMES.get(theme or DEFAULT_THEME, THEMES[DEFAULT_THEME])
+
+
+def _create_reddit_comment(username, comment_text, avatar_path=None, width=500, font_dir=None, default_avatar=None,
+                           theme=DEFAULT_THEME):
+    """
+    Create a Reddit-style comment image
+
+    Args:
+        username (str): Username to display
+        comment_text (str): The comment content
+        avatar_path (str, optional): Path to avatar image. Uses default if None.
+        width (int): Width of the comment image
+        theme (str): Theme of the card, dark or light
+
+    Returns:
+        PIL.Image: The generated comment image
+    """
+    if font_dir is None:
+        font_dir = settings.FONTS_DIR
+
+    if default_avatar is None:
+        default_avatar = settings.DEFAULT_AVATAR
+
+    palette = _get_palette(theme)
+    username_font = _load_font(os.path.join(font_dir, "arial_bold.ttf"), 16)
+    comment_font = _load_font(os.path.join(font_dir, "arial.ttf"), 14)
+
+    # Load avatar image
+    avatar_size = 40
+    avatar = _load_avatar(avatar_path, str(default_avatar), avatar_size)
+
+    # Wrap comment text to fit width
+    padding = 20
+    text_width = width - avatar_size - 3 * padding
+    wrapped_text = textwrap.fill(comment_text, width=int(text_width / 7))
+
+    # Calculate the height based on wrapped text
+    lines = wrapped_text.count('\n') + 1
+    line_height = comment_font.getbbox("Ay")[3] * 1.5
+    text_height = int(lines * line_height)
+
+    # Create the image with the theme background
+    height = max(avatar_size + 2 * padding, text_height + padding * 2) + 20
+    comment_img = Image.new('RGBA', (width, height), color=palette["comment_background"])
+    draw = ImageDraw.Draw(comment_img)
+
+    # Add avatar
+    comment_img.paste(avatar, (padding, padding), avatar)
+
+    # Add username
+    username_position = (avatar_size + padding * 2, padding)
+    draw.text(username_position, username, font=username_font, fill=palette["username"])
+
+    # Add comment text
+    comment_position = (avatar_size + padding * 2, padding + 25)
+    draw.text(comment_position, wrapped_text, font=comment_font, fill=palette["comment_text"])
+
+    return comment_img
+
+
+def _create_reddit_title(title_text, width=800, avatar_path=None, default_avatar=None, theme=DEFAULT_THEME):
+    """
+    Create a Reddit post title card that looks similar to but distinct from comments
+
+    Args:
+        title_text (str): The title of the Reddit post
+        width (int): Width of the comment image
+        avatar_path (str, optional): Path to avatar image
+        default_avatar (str, optional): Path to default avatar if none provided
+        theme (str): Theme of the card, dark or light
+
+    Returns:
+        PIL.Image: Image containing the rendered title card
+    """
+
+    font_dir = settings.FONTS_DIR
+    palette = _get_palette(theme)
+    # Set up fonts - make title font larger than comment font
+    title_font = _load_font(os.path.join(font_dir, "arial_bold.ttf"), 22)
+    font = _load_font(os.path.join(font_dir, "arial.ttf"), 14)
+
+    # Avatar setup (same as comment function)
+    avatar_size = 40
+    avatar = _load_avatar(avatar_path, str(default_avatar) if default_avatar else None, avatar_size)
+
+    # Wrap title text to fit width
+    padding = 20
+    text_width = width - avatar_size - 3 * padding
+    wrapped_text = textwrap.fill(title_text, width=int(text_width / 7))
+
+    # Calculate the height based on wrapped text
+    lines = wrapped_text.count('\n') + 1
+    line_height = title_font.getbbox("Ay")[3] * 1.5
+    text_height = int(lines * line_height)
+
+    # Create the image with a slightly different background than comments
+    height = max(avatar_size + 2 * padding, text_height + padding * 2) + 30  # Make title card slightly taller
+    title_img = Image.new('RGBA', (width, height), color=palette["title_background"])
+    draw = ImageDraw.Draw(title_img)
+
+    # Add a reddit post indicator bar on the left
+    draw.rectangle([(0, 0), (6, height)], fill=palette["title_indicator"])
+
+    # Add avatar
+    title_img.paste(avatar, (padding, padding), avatar)
+
+    # Add "POST TITLE" indicator
+    indicator_position = (avatar_size + padding * 2, padding)
+    draw.text(indicator_position, "POST TITLE", font=font, fill=palette["title_indicator"])
+
+    # Add title text
+    title_position = (avatar_size + padding * 2, padding + 25)
+    draw.text(title_position, wrapped_text, font=title_font, fill=palette["title_text"])
+
+    return title_img
+
+
+def create_comment_image(comment: Comment, video_width, theme=DEFAULT_THEME):
+    """
+    Create the card image for a comment or a post title
+
+    Args:
+        comment (Comment): The comment to render
+        video_width (int): Width of the video the card will be placed on
+        theme (str): Theme of the card, dark or light
+
+    Returns:
+        PIL.Image: The generated card image
+    """
+    # Check if this is a title or regular comment
+    if hasattr(comment, 'is_title') and comment.is_title:
+        # Create title card
+        return _create_reddit_title(
+            title_text=comment.text,
+            avatar_path=comment.avatar,
+            width=int(video_width * 0.8),  # Make title 80% of video width
+            theme=theme
+        )
+
+    # Create regular comment image
+    return _create_reddit_comment(
+        username=comment.username,
+        comment_text=comment.text,
+        avatar_path=comment.avatar,
+        width=int(video_width * 0.8),  # Make comment 80% of video width
+        theme=theme
+    )
+
+
+def _render_card(comment: Comment, video_width, theme):
+    """Pool task: render one card and time it."""
+    started = time.perf_counter()
+    image = create_comment_image(comment, video_width, theme)
+    return RenderedCard(image=image, render_time=time.perf_counter() - started)
+
+
+def _get_card_pool():
+    """Process pool shared by every job of this process, created on first use."""
+    global _card_pool
+    if _card_pool is None:
+        _card_pool = ProcessPoolExecutor(
+            max_workers=get_card_render_workers(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _card_pool
+
+
+def get_card_render_workers():
+    """Number of card render processes, CARD_RENDER_WORKERS or the CPU count capped at 4."""
+    if settings.CARD_RENDER_WORKERS > 0:
+        return settings.CARD_RENDER_WORKERS
+    return min(os.cpu_count() or 1, 4)
+
+
+def get_card_cache():
+    """On-disk card cache shared by every job of this process."""
+    global _card_cache
+    if _card_cache is None:
+        _card_cache = CardCache()
+    return _card_cache
+
+
+def render_cards(comments_data: List[Comment], video_width, theme=DEFAULT_THEME, use_cache=None) -> List[RenderedCard]:
+    """
+    Render the cards of a job concurrently on the card process pool
+
+    Cards found in the on-disk card cache are loaded instead of being drawn again.
+
+    Args:
+        comments_data (list): List of Comment
+        video_width (int): Width of the video the cards will be placed on
+        theme (str): Theme of the cards, dark or light
+        use_cache (bool, optional): Use the card cache, defaults to CARD_CACHE_ENABLED
+
+    Returns:
+        list: RenderedCard for each comment, in the same order
+    """
+    started = time.perf_counter()
+    if use_cache is None:
+        use_cache = settings.CARD_CACHE_ENABLED
+
+    cards: List[RenderedCard] = [None] * len(comments_data)
+    missing = list(range(len(comments_data)))
+
+    cache = get_card_cache() if use_cache else None
+    cache_keys = {}
+    if cache:
+        missing = []
+        for index, comment in enumerate(comments_data):
+            load_started = time.perf_counter()
+            cache_keys[index] = cache.key(comment, video_width, theme)
+            image = cache.get(cache_keys[index])
+            if image is None:
+                missing.append(index)
+            else:
+                cards[index] = RenderedCard(image=image, render_time=time.perf_counter() - load_started, cached=True)
+
+    if len(missing) <= 1 or get_card_render_workers() <= 1:
+        for index in missing:
+            cards[index] = _render_card(comments_data[index], video_width, theme)
+    else:
+        pool = _get_card_pool()
+        futures = {index: pool.submit(_render_card, comments_data[index], video_width, theme) for index in missing}
+        for index, future in futures.items():
+            cards[index] = future.result()
+
+    if cache:
+        evictions_before = cache.evictions
+        for index in missing:
+            cache.put(cache_keys[index], cards[index].image)
+        if missing:
+            cache.evict()
+        record_cache_stats("cards", hits=len(comments_data) - len(missing), misses=len(missing),
+                           evictions=cache.evictions - evictions_before)
+
+    for index, card in enumerate(cards):
+        source = "Loaded cached" if card.cached else "Rendered"
+        logger.info(f"{source} card {index} ({card.image.width}x{card.image.height}) in {card.render_time * 1000:.1f} ms")
+    logger.info(f"Rendered {len(missing)} of {len(cards)} cards in {time.perf_counter() - started:.3f} s")
+
+    return cards
+
+
+def shutdown_card_pool():
+    """Stop the card process pool if it was started."""
+    global _card_pool
+    if _card_pool is not None:
+        _card_pool.shutdown(wait=False, cancel_futures=True)
+        _card_pool = None
@@ -1,73 +1,126 @@
-import os
-import tempfile
 from typing import List
 
-from moviepy.editor import AudioFileClip
-
 from app.api.dto.reddit_dto import Comment
-from app.utils.text_to_speech import generate_audio_from_text
+from app.core.config import settings
+from app.services.tts_service import get_tts_service
+from app.utils.comment_packing import comment_weight, pack_comments
+from app.utils.duration_predictor import get_duration_predictor
+
+
+def _timeline_duration(durations, pause_time):
+    return sum(durations) + pause_time * max(len(durations) - 1, 0)
+
+
+def _pick_comments(comments: List[Comment], candidates, predicted, capacity, pause_time, allow_exceed_duration):
+    """
+    Pick the candidates that best fill the capacity according to their predicted durations
+
+    Titles are always picked. With allow_exceed_duration, a gap larger than
+    COMMENT_PACKING_SLACK is closed with the shortest comment that fills it,
+    overshooting the capacity like the greedy selection used to.
+
+    Returns:
+        list: Picked indices of comments
+    """
+    picked = [i for i in candidates if comments[i].is_title]
+    others = [i for i in candidates if not comments[i].is_title]
+    if picked:
+        capacity -= _timeline_duration([predicted[i] for i in picked], pause_time) + pause_time
+
+    packed = pack_comments([predicted[i] for i in others], [comment_weight(comments[i].upvote) for i in others],
+                           capacity, pause_time)
+    picked += [others[position] for position in packed]
+
+    leftovers = [i for i in others if i not in picked]
+    gap = capacity - _timeline_duration([predicted[i] for i in picked if not comments[i].is_title], pause_time)
+    if allow_exceed_duration and leftovers and gap > settings.COMMENT_PACKING_SLACK:
+        filling = [i for i in leftovers if predicted[i] + pause_time >= gap]
+        picked.append(min(filling, key=lambda i: predicted[i]) if filling
+                      else max(leftovers, key=lambda i: predicted[i]))
+
+    return sorted(picked)
+
+
+def _synthesize(comments: List[Comment], lang, voice, pause_time) -> List[tuple]:
+    """Synthesize comments in parallel, returning (audio_path, audio_offset, duration) for each."""
+    if not comments:
+        return []
+
+    tts_service = get_tts_service()
+
+    # One SSML request when the voice returns marks, each comment being a slice of its audio
+    if settings.TTS_SSML_BATCH:
+        clips = tts_service.synthesize_timeline([c.text for c in comments], language_code=lang, voice_name=voice,
+                                                pause_time=pause_time)
+        if clips:
+            return clips
+
+    audio_files = tts_service.synthesize_many([c.text for c in comments], speaking_rate=1.0,
+                                              language_code=lang, voice_name=voice)
+    # Durations come from the cache index, without probing the files
+    return [(audio_file, None, tts_service.get_audio_info(audio_file)["duration"]) for audio_file in audio_files]
 
 
 def generate_comments_with_duration(comments: List[Comment], target_duration, pause_time=1, allow_exceed_duration=True, lang="en-US", voice="en-US-Standard-D"):
     """
-    Generate audio for comments that fit within the target duration using a fixed pause time.
-    Comments that would cause the total duration to exceed the target are not used.
+    Generate audio for the comments that best fill the target duration using a fixed pause time.
+
+    The duration of every comment is predicted from its text first, the comments
+    that best fill the target (weighted by upvote) are picked as a knapsack and
+    only those are synthesized, in parallel. A correction pass then drops or adds
+    comments if the actual durations missed the prediction. Comments keep their
+    input order.
 
     Args:
         comments (list): List of Comment
-        target_duration (float): Target total duration in seconds
+        target_duration (float): Target total duration in seconds, None to keep every comment
         pause_time (float): Fixed pause time between comments in seconds
-        allow_exceed_duration (bool): If True, include all comments even if they exceed target duration
+        allow_exceed_duration (bool): If True, the last comment may run past the target duration
         lang (str): Language code (e.g., 'en-US')
         voice (str): Voice name (e.g., 'en-US-Standard-D')
 
     Returns:
         tuple: (processed_comments, cumulative_duration) - processed comments and their total duration
     """
-    # Create a new list to hold comments that fit within the duration
-    processed_comments = []
-
-    # Create temp directory for audio files
-    temp_audio_dir = os.path.join(tempfile.gettempdir(), "comment_audio")
-    os.makedirs(temp_audio_dir, exist_ok=True)
+    if target_duration is None:
+        selected = list(range(len(comments)))
+    else:
+        predictor = get_duration_predictor()
+        predicted = [predictor.predict(lang, voice, comment.text) for comment in comments]
+        selected = _pick_comments(comments, range(len(comments)), predicted, target_duration, pause_time,
+                                  allow_exceed_duration)
+
+    clips = dict(zip(selected, _synthesize([comments[i] for i in selected], lang, voice, pause_time)))
+
+    # Correction pass, when the actual durations missed the prediction
+    if target_duration is not None:
+        total = _timeline_duration([clip[2] for clip in clips.values()], pause_time)
+        if total > target_duration and not allow_exceed_duration:
+            # Drop the comments worth the least per second until the timeline fits
+            for i in sorted((i for i in clips if not comments[i].is_title),
+                            key=lambda i: comment_weight(comments[i].upvote)):
+                if total <= target_duration:
+                    break
+                total -= clips.pop(i)[2] + pause_time
+        elif total < target_duration - settings.COMMENT_PACKING_SLACK:
+            remaining = [i for i in range(len(comments)) if i not in clips and not comments[i].is_title]
+            extra = _pick_comments(comments, remaining, predicted, target_duration - total - pause_time, pause_time,
+                                   allow_exceed_duration)
+            clips.update(zip(extra, _synthesize([comments[i] for i in extra], lang, voice, pause_time)))
 
-    # Track cumulative duration including pauses
+    processed_comments = []
     cumulative_duration = 0
-
-    # Process comments one by one until we hit the duration limit
-    for comment in comments:
-        # Generate audio with default speaking rate
-        audio_file = generate_audio_from_text(text=comment.text, speaking_rate=1.0,
-                                              language_code=lang,
-                                              voice_name=voice)
-
-        # Get audio duration
-        audio_clip = AudioFileClip(audio_file)
-        comment_duration = audio_clip.duration
-        audio_clip.close()
-
-        # Calculate total duration if we include this comment
-        # Add pause time if this isn't the first comment
-        new_total = cumulative_duration + comment_duration
-        if processed_comments:
-            new_total += pause_time
-
-        if new_total > target_duration and not allow_exceed_duration:
-            break
+    for i in sorted(clips):
+        audio_file, audio_offset, comment_duration = clips[i]
 
         # Add comment to the processed list with duration and audio info
-        comment_copy = comment.model_copy()
+        comment_copy = comments[i].model_copy()
         comment_copy.duration = comment_duration
-        # comment_copy.audio_path = audio_file
-        comment_copy.start_time = cumulative_duration if len(
-            processed_comments) == 0 else cumulative_duration + pause_time
+        comment_copy.audio_path = audio_file
+        comment_copy.audio_offset = audio_offset
+        comment_copy.start_time = cumulative_duration + pause_time if processed_comments else 0
 
         processed_comments.append(comment_copy)
-
-        # Update the cumulative duration
-        cumulative_duration = new_total
-
-        if cumulative_duration > target_duration:
-            break
+        cumulative_duration = comment_copy.start_time + comment_duration
 
     return processed_comments, cumulative_duration
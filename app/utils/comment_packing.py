@@ -0,0 +1,56 @@
+import math
+from typing import List, Sequence
+
+import numpy as np
+
+
+def comment_weight(upvote):
+    """Value of one second of a comment, growing with the log of its upvotes."""
+    return 1.0 + math.log1p(max(upvote or 0, 0))
+
+
+def pack_comments(durations: Sequence[float], weights: Sequence[float], capacity, pause_time=1.0,
+                  resolution=0.1) -> List[int]:
+    """
+    Pick the comments that best fill the capacity, as a 0/1 knapsack
+
+    The value of a comment is its duration times its weight, so the packing
+    fills the video with as much speech as fits, preferring upvoted comments.
+    Each comment costs its duration plus one pause, and the capacity gets one
+    pause back since the last comment is not followed by one.
+
+    Args:
+        durations (list): Predicted duration of each comment in seconds
+        weights (list): Weight of each comment, e.g. from comment_weight
+        capacity (float): Seconds to fill
+        pause_time (float): Pause between two comments in seconds
+        resolution (float): Time step of the knapsack in seconds
+
+    Returns:
+        list: Indices of the picked comments, in increasing order
+    """
+    slots = int(math.floor((capacity + pause_time) / resolution))
+    if slots <= 0 or not durations:
+        return []
+
+    costs = [max(1, int(math.ceil((duration + pause_time) / resolution))) for duration in durations]
+    values = [duration * weight for duration, weight in zip(durations, weights)]
+
+    # best[c] is the best value within c slots, keep[i, c] whether comment i is in that solution
+    best = np.zeros(slots + 1)
+    keep = np.zeros((len(durations), slots + 1), dtype=bool)
+    for index, (cost, value) in enumerate(zip(costs, values)):
+        if cost > slots:
+            continue
+        candidate = best[:slots + 1 - cost] + value
+        improved = candidate > best[cost:]
+        keep[index, cost:] = improved
+        best[cost:] = np.where(improved, candidate, best[cost:])
+
+    picked = []
+    remaining = slots
+    for index in range(len(durations) - 1, -1, -1):
+        if keep[index, remaining]:
+            picked.append(index)
+            remaining -= costs[index]
+    return sorted(picked)
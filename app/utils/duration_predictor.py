@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def text_features(text):
+    """Characters, words and a constant, the inputs of the duration model."""
+    return np.array([len(text), len(text.split()), 1.0])
+
+
+class _VoiceModel:
+    """Least squares fit of duration on characters and words, kept as running normal equations."""
+
+    def __init__(self):
+        self.xtx = np.zeros((3, 3))
+        self.xty = np.zeros(3)
+        self.samples = 0
+        self._coefficients = None
+
+    def add(self, features, duration):
+        self.xtx += np.outer(features, features)
+        self.xty += features * duration
+        self.samples += 1
+        self._coefficients = None
+
+    def coefficients(self):
+        if self._coefficients is None:
+            # A small ridge keeps the system solvable when every sample has the same word count
+            ridge = 1e-6 * max(np.trace(self.xtx), 1.0) * np.eye(3)
+            self._coefficients = np.linalg.solve(self.xtx + ridge, self.xty)
+        return self._coefficients
+
+
+class DurationPredictor:
+    """
+    Predict the TTS duration of a text per language and voice, before synthesizing it
+
+    The models are calibrated from the sidecar indexes of the TTS cache, read
+    once per process, then updated with every clip synthesized. A voice with
+    too few samples uses TTS_DEFAULT_CHARS_PER_SECOND.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = str(cache_dir or settings.CACHE_DIR)
+        self._models = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        """Calibrate from the clips already in the cache."""
+        loaded = 0
+        if os.path.isdir(self.cache_dir):
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not (entry.name.startswith("tts_") and entry.name.endswith(".json")):
+                        continue
+                    try:
+                        with open(entry.path) as info_file:
+                            info = json.load(info_file)
+                    except (OSError, json.JSONDecodeError):
+                        continue
+                    # Only single-text clips recorded with their text statistics
+                    if "chars" not in info or "marks" in info:
+                        continue
+                    self._add(info["language_code"], info["voice_name"], info.get("speaking_rate", 1.0),
+                              np.array([info["chars"], info["words"], 1.0]), info["duration"])
+                    loaded += 1
+        self._loaded = True
+        logger.info(f"Duration predictor calibrated from {loaded} cached clips")
+
+    def _add(self, language_code, voice_name, speaking_rate, features, duration):
+        key = (language_code, voice_name, float(speaking_rate))
+        self._models.setdefault(key, _VoiceModel()).add(features, duration)
+
+    def observe(self, language_code, voice_name, text, duration, speaking_rate=1.0):
+        """
+        Add the actual duration of a synthesized text to the model of its voice
+
+        Args:
+            language_code (str): Language code (e.g., 'en-US')
+            voice_name (str): Name of the voice
+            text (str): The synthesized text
+            duration (float): Duration of its audio in seconds
+            speaking_rate (float): Speaking rate it was synthesized at
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._add(language_code, voice_name, speaking_rate, text_features(text), duration)
+
+    def predict(self, language_code, voice_name, text, speaking_rate=1.0) -> float:
+        """
+        Predict the duration of the audio of a text
+
+        Args:
+            language_code (str): Language code (e.g., 'en-US')
+            voice_name (str): Name of the voice
+            text (str): The text to synthesize
+            speaking_rate (float): Speaking rate it will be synthesized at
+
+        Returns:
+            float: Predicted duration in seconds
+        """
+        features = text_features(text)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            model = self._models.get((language_code, voice_name, float(speaking_rate)))
+            if model is not None and model.samples >= settings.DURATION_PREDICTOR_MIN_SAMPLES:
+                return max(0.1, float(features @ model.coefficients()))
+
+        return max(0.1, len(text) / (settings.TTS_DEFAULT_CHARS_PER_SECOND * speaking_rate))
+
+    def samples(self, language_code, voice_name, speaking_rate=1.0) -> int:
+        """Number of clips the model of a voice is calibrated from."""
+        model = self._models.get((language_code, voice_name, float(speaking_rate)))
+        return model.samples if model else 0
+
+
+_duration_predictor: Optional[DurationPredictor] = None
+
+
+def get_duration_predictor() -> DurationPredictor:
+    """The DurationPredictor of this process."""
+    global _duration_predictor
+    if _duration_predictor is None:
+        _duration_predictor = DurationPredictor()
+    return _duration_predictor
@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    """Encoder settings of a named profile from ENCODING_PROFILES."""
+    name: str
+    codec: str = "libx264"
+    preset: str = "medium"
+    crf: int = 23
+    threads: int = 0  # 0 lets ffmpeg pick
+    pix_fmt: str = "yuv420p"
+    fps: Optional[float] = None  # None keeps the template frame rate
+    faststart: bool = True
+
+    def moviepy_kwargs(self):
+        """
+        Keyword arguments for VideoClip.write_videofile
+
+        moviepy appends '-pix_fmt yuv420p' after ffmpeg_params for libx264, so
+        other pixel formats only apply to the other codecs.
+        """
+        ffmpeg_params = ["-crf", str(self.crf), "-pix_fmt", self.pix_fmt]
+        if self.faststart:
+            ffmpeg_params += ["-movflags", "+faststart"]
+        return {
+            "codec": self.codec,
+            "preset": self.preset,
+            "threads": self.threads or None,
+            "fps": self.fps,
+            "ffmpeg_params": ffmpeg_params,
+        }
+
+    def ffmpeg_args(self):
+        """Output options of the profile for an ffmpeg command line."""
+        args = ["-c:v", self.codec, "-preset", self.preset, "-crf", str(self.crf), "-pix_fmt", self.pix_fmt]
+        if self.threads:
+            args += ["-threads", str(self.threads)]
+        if self.fps:
+            args += ["-r", f"{self.fps:g}"]
+        if self.faststart:
+            args += ["-movflags", "+faststart"]
+        return args
+
+
+def get_encoding_profile(name=None) -> EncodingProfile:
+    """
+    Get an encoding profile by name
+
+    Args:
+        name (str, optional): Name of the profile, defaults to DEFAULT_ENCODING_PROFILE
+
+    Returns:
+        EncodingProfile: The profile
+    """
+    name = name or settings.DEFAULT_ENCODING_PROFILE
+    if name not in settings.ENCODING_PROFILES:
+        raise ValueError(f"Unknown encoding profile: {name}")
+    options = dict(settings.ENCODING_PROFILES[name])
+    # Profiles without a thread count share the CPUs with the other slots of the worker
+    if not options.get("threads") and settings.FFMPEG_THREADS:
+        options["threads"] = settings.FFMPEG_THREADS
+    return EncodingProfile(name=name, **options)
@@ -0,0 +1,194 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import List
+
+from app.api.dto.reddit_dto import Comment
+from app.core.config import settings
+from app.utils.card_renderer import render_cards
+from app.utils.encoding_profile import get_encoding_profile
+from app.utils.reddit_comment_overlay import generate_output_path
+from app.utils.template_ingest import get_video_info
+from app.utils.text_to_speech import generate_audio_from_text
+
+
+def build_ffmpeg_command(video_path, cards, audio_tracks, output_path, duration, include_video_audio=False,
+                         encoding_profile=None, start_offset=0.0, video_filter=None, ffmpeg_binary="ffmpeg"):
+    """
+    Build a single ffmpeg invocation that overlays the comment cards and mixes the TTS tracks
+
+    Args:
+        video_path (str): Path to the template video
+        cards (list): List of (png_path, start_time, end_time) tuples
+        audio_tracks (list): List of (audio_path, start_time, offset, duration) tuples, offset being None
+            when the whole file is played
+        output_path (str): Path of the rendered video
+        duration (float): Duration of the output video in seconds
+        include_video_audio (bool): Mix the template audio track into the output
+        encoding_profile (EncodingProfile, optional): Encoder settings, defaults to DEFAULT_ENCODING_PROFILE
+        start_offset (float): Time of the template the output starts at
+        video_filter (str, optional): Filter applied to the template before the overlays (crop, scale)
+        ffmpeg_binary (str): ffmpeg executable to use
+
+    Returns:
+        list: The ffmpeg command line
+    """
+    if encoding_profile is None:
+        encoding_profile = get_encoding_profile()
+
+    cmd = [ffmpeg_binary, "-y", "-loglevel", "error", "-nostats", "-progress", "pipe:1"]
+    if start_offset > 0:
+        # Input seeking, the template timestamps then start at 0 in the filtergraph
+        cmd += ["-ss", f"{start_offset:.3f}"]
+    cmd += ["-i", str(video_path)]
+
+    for png_path, _, _ in cards:
+        cmd += ["-i", str(png_path)]
+    for audio_path, _, _, _ in audio_tracks:
+        cmd += ["-i", str(audio_path)]
+
+    filters = []
+
+    # Crop and scale the template first so the overlays run on the output frame
+    video_label = "[0:v]"
+    if video_filter:
+        filters.append(f"[0:v]{video_filter}[base]")
+        video_label = "[base]"
+
+    # Chain one overlay per card, each only enabled while its comment is on screen
+    for index, (_, start_time, end_time) in enumerate(cards, start=1):
+        out_label = f"[v{index}]"
+        filters.append(
+            f"{video_label}[{index}:v]overlay=x=(W-w)/2:y=(H-h)/2"
+            f":enable='between(t,{start_time:.3f},{end_time:.3f})'{out_label}"
+        )
+        video_label = out_label
+
+    # Delay every TTS track to its comment start and mix them together
+    audio_labels = ["[0:a]"] if include_video_audio else []
+    first_audio_input = len(cards) + 1
+    for index, (_, start_time, offset, clip_duration) in enumerate(audio_tracks):
+        delay_ms = int(round(start_time * 1000))
+        out_label = f"[a{index}]"
+        trim = ""
+        if offset is not None:
+            # The clip is a slice of a longer file, e.g. one SSML request for the whole job
+            trim = f"atrim=start={offset:.3f}:duration={clip_duration:.3f},asetpts=PTS-STARTPTS,"
+        filters.append(f"[{first_audio_input + index}:a]{trim}adelay=delays={delay_ms}:all=1{out_label}")
+        audio_labels.append(out_label)
+
+    audio_label = None
+    if len(audio_labels) > 1:
+        filters.append(f"{''.join(audio_labels)}amix=inputs={len(audio_labels)}:duration=longest:normalize=0[aout]")
+        audio_label = "[aout]"
+    elif audio_labels:
+        audio_label = audio_labels[0]
+
+    if filters:
+        cmd += ["-filter_complex", ";".join(filters)]
+
+    cmd += ["-map", "0:v" if video_label == "[0:v]" else video_label]
+    if audio_label:
+        cmd += ["-map", audio_label.strip("[]") if audio_label == "[0:a]" else audio_label, "-c:a", "aac",
+                "-b:a", settings.AUDIO_BITRATE]
+
+    cmd += encoding_profile.ffmpeg_args()
+    cmd += ["-t", f"{duration:.3f}", str(output_path)]
+    return cmd
+
+
+def render_comments_with_ffmpeg(video_path, comments_data: List[Comment], lang, voice, theme=None, output_dir=None,
+                                cache_dir=None, encoding_profile=None, start_offset=0.0, geometry=None,
+                                progress_callback=None):
+    """
+    Render the comment timeline over the template video with a single ffmpeg process
+
+    No frame passes through Python: the cards are written once as PNG files and
+    ffmpeg composites and encodes them together with the TTS tracks.
+
+    Args:
+        video_path (str): Path to the template video
+        comments_data (list): List of Comment with start_time and duration set
+        lang (str): language code (e.g., 'en-US')
+        voice (str): voice name (e.g., 'en-US-Standard-D')
+        theme (str, optional): Theme of the cards, dark or light
+        output_dir (str): Directory where to save the output video
+        cache_dir (str, optional): Directory for temporary card images
+        encoding_profile (EncodingProfile, optional): Encoder settings, defaults to DEFAULT_ENCODING_PROFILE
+        start_offset (float): Time of the template the output starts at
+        geometry (OutputGeometry, optional): Crop and scale applied to the template
+        progress_callback (callable, optional): Function to receive progress updates (0-100)
+
+    Returns:
+        str: Path to the output video
+    """
+    if cache_dir is None:
+        cache_dir = settings.CACHE_DIR
+
+    if output_dir is None:
+        output_dir = settings.OUTPUT_DIR
+
+    os.makedirs(cache_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    video_info = get_video_info(video_path)
+
+    # Trim the output to the comments, like trim_video_to_fit_comments does
+    duration = video_info["duration"] - start_offset
+    if comments_data:
+        duration = min(duration, max(c.start_time + c.duration for c in comments_data))
+
+    output_path = generate_output_path(output_dir)
+    card_dir = tempfile.mkdtemp(prefix="cards_", dir=cache_dir)
+
+    try:
+        cards = []
+        audio_tracks = []
+        # Lay the cards out against the output frame
+        frame_width = geometry.width if geometry else video_info["width"]
+        rendered_cards = render_cards(comments_data, frame_width, theme)
+        for index, (comment, rendered_card) in enumerate(zip(comments_data, rendered_cards)):
+            card_path = os.path.join(card_dir, f"card_{index}.png")
+            rendered_card.image.save(card_path)
+            cards.append((card_path, comment.start_time, comment.start_time + comment.duration))
+
+            audio_path = comment.audio_path or generate_audio_from_text(text=comment.text, speaking_rate=1.0,
+                                                                        language_code=lang, voice_name=voice)
+            audio_tracks.append((audio_path, comment.start_time, comment.audio_offset, comment.duration))
+
+        cmd = build_ffmpeg_command(video_path, cards, audio_tracks, output_path, duration,
+                                   include_video_audio=video_info["has_audio"],
+                                   encoding_profile=encoding_profile,
+                                   start_offset=start_offset,
+                                   video_filter=geometry.video_filter() if geometry else None)
+        _run_ffmpeg(cmd, duration, progress_callback)
+    finally:
+        shutil.rmtree(card_dir, ignore_errors=True)
+
+    return output_path
+
+
+def _run_ffmpeg(cmd, duration, progress_callback=None):
+    """Run ffmpeg, forwarding its -progress output as a percentage of the duration."""
+    # stderr goes to a file, a full stderr pipe would block ffmpeg while stdout is read
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file, text=True)
+
+        last_percentage = 0
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            if key != "out_time_us" or not progress_callback or duration <= 0:
+                continue
+            try:
+                percentage = min(int(value) / 1_000_000 / duration * 100, 100)
+            except ValueError:
+                continue
+            if percentage - last_percentage >= 1:
+                last_percentage = percentage
+                progress_callback(percentage)
+
+        if process.wait() != 0:
+            stderr_file.seek(0)
+            stderr = stderr_file.read().decode(errors="replace")
+            raise RuntimeError(f"ffmpeg failed with exit code {process.returncode}: {stderr.strip()[-2000:]}")
@@ -0,0 +1,70 @@
+import json
+import subprocess
+
+
+def probe_video(video_path, ffprobe_binary="ffprobe"):
+    """
+    Read basic stream information from a media file using ffprobe
+
+    Args:
+        video_path (str): Path to the media file
+        ffprobe_binary (str): ffprobe executable to use
+
+    Returns:
+        dict: width, height, fps, duration and has_audio of the file
+    """
+    cmd = [
+        ffprobe_binary, "-v", "error",
+        "-show_entries", "stream=codec_type,width,height,avg_frame_rate:format=duration",
+        "-of", "json",
+        str(video_path),
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    info = json.loads(result.stdout)
+
+    streams = info.get("streams", [])
+    video_stream = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video_stream is None:
+        raise ValueError(f"No video stream found in {video_path}")
+
+    num, _, den = video_stream.get("avg_frame_rate", "0/1").partition("/")
+    fps = float(num) / float(den) if den and float(den) else 0.0
+
+    return {
+        "width": int(video_stream["width"]),
+        "height": int(video_stream["height"]),
+        "fps": fps,
+        "duration": float(info.get("format", {}).get("duration", 0.0)),
+        "has_audio": any(s.get("codec_type") == "audio" for s in streams),
+    }
+
+
+def probe_keyframes(video_path, ffprobe_binary="ffprobe"):
+    """
+    List the keyframe timestamps of the first video stream
+
+    Args:
+        video_path (str): Path to the media file
+        ffprobe_binary (str): ffprobe executable to use
+
+    Returns:
+        list: Sorted keyframe times in seconds
+    """
+    cmd = [
+        ffprobe_binary, "-v", "error",
+        "-select_streams", "v:0",
+        "-skip_frame", "nokey",
+        "-show_entries", "frame=best_effort_timestamp_time",
+        "-of", "csv=p=0",
+        str(video_path),
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+
+    keyframes = []
+    for line in result.stdout.splitlines():
+        value = line.strip().rstrip(",")
+        try:
+            keyframes.append(float(value))
+        except ValueError:
+            continue
+    return sorted(keyframes)
@@ -0,0 +1,139 @@
+# Layer III bitrates in kbit/s by bitrate index, for MPEG-1 and for MPEG-2/2.5
+_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Sample rates by version bits (0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1) and sample rate index
+_SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+
+
+def _id3v2_size(data):
+    """Size of the ID3v2 tag at the start of data, 0 if there is none."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_header(data, offset):
+    """
+    Parse the Layer III frame header at offset
+
+    Returns:
+        tuple: (frame_length, samples, sample_rate, channels), or None if there is no valid header
+    """
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+
+    version = (data[offset + 1] >> 3) & 0x03
+    layer = (data[offset + 1] >> 1) & 0x03
+    bitrate_index = data[offset + 2] >> 4
+    sample_rate_index = (data[offset + 2] >> 2) & 0x03
+    padding = (data[offset + 2] >> 1) & 0x01
+    channel_mode = data[offset + 3] >> 6
+
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES[1 if mpeg1 else 2][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    samples = 1152 if mpeg1 else 576
+    frame_length = (samples // 8) * bitrate // sample_rate + padding
+
+    return frame_length, samples, sample_rate, 1 if channel_mode == 3 else 2
+
+
+def _parse_info_frame(data, offset, frame_length):
+    """
+    Parse the Xing/Info header frame, which decoders drop instead of playing
+
+    Returns:
+        int: Encoder delay plus padding in samples from the LAME tag, None if the frame is not an Info frame
+    """
+    frame = data[offset:offset + frame_length]
+    tag_offset = max(frame.find(b"Xing", 0, 64), frame.find(b"Info", 0, 64))
+    if tag_offset < 0:
+        return None
+
+    # Skip the optional fields announced by the flags to reach the LAME tag
+    flags = int.from_bytes(frame[tag_offset + 4:tag_offset + 8], "big")
+    lame_offset = tag_offset + 8
+    lame_offset += 4 if flags & 0x01 else 0  # frame count
+    lame_offset += 4 if flags & 0x02 else 0  # byte count
+    lame_offset += 100 if flags & 0x04 else 0  # seek table
+    lame_offset += 4 if flags & 0x08 else 0  # quality
+
+    gap = frame[lame_offset + 21:lame_offset + 24]
+    if len(gap) < 3 or frame[lame_offset:lame_offset + 4] not in (b"LAME", b"Lavc", b"Lavf"):
+        return 0
+    delay = (gap[0] << 4) | (gap[1] >> 4)
+    padding = ((gap[1] & 0x0F) << 8) | gap[2]
+    return delay + padding
+
+
+def read_mp3_info(path):
+    """
+    Read the duration of an MP3 file by walking its frame headers, without decoding it
+
+    Args:
+        path (str): Path to the MP3 file
+
+    Returns:
+        dict: duration (seconds), sample_rate, channels and bytes of the file
+    """
+    with open(path, "rb") as mp3_file:
+        return parse_mp3_info(mp3_file.read())
+
+
+def parse_mp3_info(data: bytes):
+    """
+    Read the duration of MP3 data by walking its frame headers, without decoding it
+
+    Args:
+        data (bytes): Content of an MP3 file
+
+    Returns:
+        dict: duration (seconds), sample_rate, channels and bytes of the data
+    """
+    offset = _id3v2_size(data)
+    total_samples = 0
+    sample_rate = None
+    channels = None
+    first_frame = True
+
+    while offset < len(data):
+        header = _parse_header(data, offset)
+        if header is None:
+            if sample_rate is not None and data[offset:offset + 3] == b"TAG":
+                break  # ID3v1 tag at the end of the file
+            offset += 1  # Resync on the next frame header
+            continue
+
+        frame_length, samples, frame_sample_rate, frame_channels = header
+        if first_frame:
+            first_frame = False
+            sample_rate, channels = frame_sample_rate, frame_channels
+            gap = _parse_info_frame(data, offset, frame_length)
+            if gap is not None:
+                total_samples -= gap
+                offset += frame_length
+                continue
+
+        total_samples += samples
+        offset += frame_length
+
+    if sample_rate is None:
+        raise ValueError("No MPEG layer III frame found")
+
+    return {
+        "duration": max(0, total_samples) / sample_rate,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "bytes": len(data),
+    }
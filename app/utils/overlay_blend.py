@@ -0,0 +1,60 @@
+import numpy as np
+
+
+class CardLayer:
+    """
+    A card image placed on the timeline, ready to be alpha blended on frames
+
+    The card alpha is premultiplied once when the layer is created. Blending
+    only touches the card's bounding box, in place, with integer math and a
+    scratch buffer owned by the layer, so no array is allocated per frame.
+    """
+
+    def __init__(self, image, position, start, duration):
+        """
+        Args:
+            image (PIL.Image | np.ndarray): RGBA card image
+            position (tuple): (x, y) of the top left corner of the card on the frame
+            start (float): Time in seconds the card appears
+            duration (float): How long the card stays on screen
+        """
+        rgba = np.asarray(image, dtype=np.uint8)
+        if rgba.ndim != 3 or rgba.shape[2] != 4:
+            raise ValueError(f"Card image must be RGBA, got shape {rgba.shape}")
+
+        alpha = rgba[:, :, 3:4].astype(np.uint16)
+
+        # color * alpha + 127 so that the final // 255 rounds instead of truncating
+        self.premultiplied = rgba[:, :, :3].astype(np.uint16) * alpha + 127
+        self.inverse_alpha = np.repeat(255 - alpha, 3, axis=2)
+        self._scratch = np.empty_like(self.premultiplied)
+
+        self.h, self.w = rgba.shape[:2]
+        self.x, self.y = int(position[0]), int(position[1])
+        self.start = start
+        self.end = start + duration
+
+    def blend_into(self, frame):
+        """
+        Blend the card into an RGB uint8 frame in place
+
+        Args:
+            frame (np.ndarray): Frame of shape (height, width, 3), modified in place
+        """
+        frame_h, frame_w = frame.shape[:2]
+
+        # Clip the card's bounding box to the frame
+        x0, y0 = max(self.x, 0), max(self.y, 0)
+        x1, y1 = min(self.x + self.w, frame_w), min(self.y + self.h, frame_h)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        card_region = (slice(y0 - self.y, y1 - self.y), slice(x0 - self.x, x1 - self.x))
+        roi = frame[y0:y1, x0:x1]
+        scratch = self._scratch[card_region]
+
+        # out = (frame * (255 - alpha) + color * alpha + 127) // 255
+        np.multiply(roi, self.inverse_alpha[card_region], out=scratch)
+        scratch += self.premultiplied[card_region]
+        scratch //= 255
+        np.copyto(roi, scratch, casting='unsafe')
@@ -0,0 +1,87 @@
+from bisect import bisect_right
+
+import numpy as np
+from moviepy.editor import VideoClip
+
+
+class OverlayIndex:
+    """
+    Sorted interval index over overlays
+
+    The timeline is cut at every overlay start and end. For each resulting
+    segment the overlays playing in it are precomputed, so finding the overlays
+    active at time t is a single bisect, whatever the number of overlays.
+    """
+
+    def __init__(self, overlays):
+        """
+        Args:
+            overlays (list): Overlays with start and end set, in layer order (bottom first)
+        """
+        self.boundaries = sorted({o.start for o in overlays} | {o.end for o in overlays})
+        self.active = [
+            tuple(o for o in overlays if o.start <= boundary < o.end)
+            for boundary in self.boundaries[:-1]
+        ]
+
+    def active_at(self, t):
+        """
+        Get the overlays playing at time t
+
+        Args:
+            t (float): Time in seconds
+
+        Returns:
+            tuple: The playing overlays, in layer order
+        """
+        segment = bisect_right(self.boundaries, t) - 1
+        if segment < 0 or segment >= len(self.active):
+            return ()
+        return self.active[segment]
+
+
+class IndexedCompositeVideoClip(VideoClip):
+    """
+    Video clip that blends card layers over a background clip
+
+    Only the layers active at t are found through an OverlayIndex, and they are
+    blended into a preallocated output buffer. The returned frame is that
+    buffer, so it is only valid until the next frame is requested.
+    """
+
+    def __init__(self, background, layers):
+        """
+        Args:
+            background (VideoClip): The clip every layer is blended on
+            layers (list): CardLayer objects
+        """
+        super().__init__()
+
+        self.bg = background
+        self.layers = list(layers)
+        self.size = background.size
+        self.fps = background.fps
+
+        # Keep the duration of the background like a CompositeVideoClip would
+        ends = [background.end] + [layer.end for layer in self.layers]
+        if None not in ends:
+            self.duration = max(ends)
+            self.end = self.duration
+
+        self.index = OverlayIndex(self.layers)
+        self._buffer = np.empty((self.h, self.w, 3), dtype=np.uint8)
+
+        def make_frame(t):
+            frame = self.bg.get_frame(t)
+            active_layers = self.index.active_at(t)
+            if not active_layers:
+                return frame
+
+            # Never blend into the background frame, the reader may hand it out again.
+            # Generated clips such as ColorClip make int64 frames, video readers uint8 ones.
+            np.copyto(self._buffer, frame, casting='unsafe')
+            for layer in active_layers:
+                layer.blend_into(self._buffer)
+            return self._buffer
+
+        self.make_frame = make_frame
@@ -1,244 +1,81 @@
 import os
-import textwrap
+import subprocess
+import tempfile
+import threading
 import uuid
 from datetime import datetime
 from typing import List
 
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
-from moviepy.editor import VideoFileClip, ImageClip, CompositeVideoClip
 
 from app.api.dto.reddit_dto import Comment
 from app.core.config import settings
-from app.utils.text_to_speech import generate_comment_audio
+from app.utils.card_renderer import render_cards
+from app.utils.encoding_profile import get_encoding_profile
+from app.utils.overlay_blend import CardLayer
+from app.utils.overlay_index import IndexedCompositeVideoClip
 
 
-def _create_reddit_comment(username, comment_text, avatar_path=None, width=500, font_dir=None, default_avatar=None):
+def add_cards_to_video(video, comments_data: List[Comment], theme=None):
     """
-    Create a Reddit-style comment image
+    Blend the comment cards on the video, without touching its audio
 
     Args:
-        username (str): Username to display
-        comment_text (str): The comment content
-        avatar_path (str, optional): Path to avatar image. Uses default if None.
-        width (int): Width of the comment image
-
-    Returns:
-        PIL.Image: The generated comment image
-    """
-    if font_dir is None:
-        font_dir = settings.FONTS_DIR
-
-    if default_avatar is None:
-        default_avatar = settings.DEFAULT_AVATAR
-
-    try:
-        username_font = ImageFont.truetype(os.path.join(font_dir, "arial_bold.ttf"), 16)
-        comment_font = ImageFont.truetype(os.path.join(font_dir, "arial.ttf"), 14)
-    except IOError:
-        username_font = ImageFont.load_default()
-        comment_font = ImageFont.load_default()
-
-    # Load avatar image
-    avatar_size = 40
-    if avatar_path and os.path.exists(avatar_path):
-        avatar = Image.open(avatar_path)
-    else:
-        # Create a default avatar if none is provided
-        avatar = Image.new('RGB', (avatar_size, avatar_size), color=(200, 200, 200))
-        if os.path.exists(default_avatar):
-            avatar = Image.open(default_avatar)
-
-    avatar = avatar.resize((avatar_size, avatar_size))
-
-    # Create circular mask for avatar
-    mask = Image.new('L', avatar.size, 0)
-    draw = ImageDraw.Draw(mask)
-    draw.ellipse((0, 0, avatar_size, avatar_size), fill=255)
-    avatar.putalpha(mask)
-
-    # Wrap comment text to fit width
-    padding = 20
-    text_width = width - avatar_size - 3 * padding
-    wrapped_text = textwrap.fill(comment_text, width=int(text_width / 7))
-
-    # Calculate the height based on wrapped text
-    lines = wrapped_text.count('\n') + 1
-    line_height = comment_font.getbbox("Ay")[3] * 1.5
-    text_height = int(lines * line_height)
-
-    # Create the image with dark gray background
-    height = max(avatar_size + 2 * padding, text_height + padding * 2) + 20
-    comment_img = Image.new('RGBA', (width, height), color=(26, 26, 27, 220))
-    draw = ImageDraw.Draw(comment_img)
-
-    # Add avatar
-    comment_img.paste(avatar, (padding, padding), avatar)
-
-    # Add username
-    username_position = (avatar_size + padding * 2, padding)
-    draw.text(username_position, username, font=username_font, fill=(58, 160, 255))
-
-    # Add comment text
-    comment_position = (avatar_size + padding * 2, padding + 25)
-    draw.text(comment_position, wrapped_text, font=comment_font, fill=(215, 218, 220))
-
-    return comment_img
-
-
-def _create_reddit_title(title_text, width=800, avatar_path=None, default_avatar=None):
-    """
-    Create a Reddit post title card that looks similar to but distinct from comments
-
-    Args:
-        title_text (str): The title of the Reddit post
-        width (int): Width of the comment image
-        avatar_path (str, optional): Path to avatar image
-        default_avatar (str, optional): Path to default avatar if none provided
+        video (VideoFileClip): The original video
+        comments_data (list): List of Comment
+        theme (str, optional): Theme of the cards, dark or light
 
     Returns:
-        PIL.Image: Image containing the rendered title card
+        IndexedCompositeVideoClip: The video with the cards added
     """
+    card_layers = []
 
-    font_dir = settings.FONTS_DIR
-    # Set up fonts - make title font larger than comment font
-    title_font = ImageFont.truetype(os.path.join(font_dir, "arial_bold.ttf"), 22)
-    font = ImageFont.truetype(os.path.join(font_dir, "arial.ttf"), 14)
-
-
-    # Avatar setup (same as comment function)
-    avatar_size = 40
-    if avatar_path and os.path.exists(avatar_path):
-        avatar = Image.open(avatar_path)
-    else:
-        # Create a default avatar if none is provided
-        avatar = Image.new('RGB', (avatar_size, avatar_size), color=(200, 200, 200))
-        if default_avatar and os.path.exists(default_avatar):
-            avatar = Image.open(default_avatar)
-
-    avatar = avatar.resize((avatar_size, avatar_size))
-
-    # Create circular mask for avatar
-    mask = Image.new('L', avatar.size, 0)
-    draw = ImageDraw.Draw(mask)
-    draw.ellipse((0, 0, avatar_size, avatar_size), fill=255)
-    avatar.putalpha(mask)
-
-    # Wrap title text to fit width
-    padding = 20
-    text_width = width - avatar_size - 3 * padding
-    wrapped_text = textwrap.fill(title_text, width=int(text_width / 7))
-
-    # Calculate the height based on wrapped text
-    lines = wrapped_text.count('\n') + 1
-    line_height = title_font.getbbox("Ay")[3] * 1.5
-    text_height = int(lines * line_height)
-
-    # Create the image with slightly different background (orangish-red for Reddit title)
-    height = max(avatar_size + 2 * padding, text_height + padding * 2) + 30  # Make title card slightly taller
-    title_img = Image.new('RGBA', (width, height), color=(36, 36, 38, 230))  # Darker background for title
-    draw = ImageDraw.Draw(title_img)
-
-    # Add a reddit post indicator bar on the left
-    draw.rectangle([(0, 0), (6, height)], fill=(255, 69, 0))  # Reddit orange
+    # Render every card up front on the card pool
+    rendered_cards = render_cards(comments_data, video.w, theme)
 
-    # Add avatar
-    title_img.paste(avatar, (padding, padding), avatar)
+    for comment, rendered_card in zip(comments_data, rendered_cards):
+        comment_img = rendered_card.image
 
-    # Add "POST TITLE" indicator
-    indicator_position = (avatar_size + padding * 2, padding)
-    draw.text(indicator_position, "POST TITLE", font=font, fill=(255, 69, 0))
+        # Position comment at the center of the video
+        position_x = (video.w - comment_img.width) // 2  # Center horizontally
+        position_y = (video.h - comment_img.height) // 2  # Center vertically
 
-    # Add title text
-    title_position = (avatar_size + padding * 2, padding + 25)
-    draw.text(title_position, wrapped_text, font=title_font, fill=(240, 240, 245))
+        # Premultiply the card once, it is then blended in place on every frame
+        card_layers.append(CardLayer(comment_img, (position_x, position_y),
+                                     start=comment.start_time, duration=comment.duration))
 
-    return title_img
+    # Create composite video, only the cards active at t are blended on each frame
+    return IndexedCompositeVideoClip(video, card_layers)
 
 
-def add_comments_to_video(video, comments_data: List[Comment], lang, voice):
+def generate_output_path(output_dir):
     """
-    Add multiple comments with audio to the video
+    Build a unique output video path with timestamp and UUID
 
     Args:
-        video (VideoFileClip): The original video
-        comments_data (list): List of Comment
-        lang (str): language code (e.g., 'en-US')
-        voice (str): voice name (e.g., 'en-US-Standard-D')
+        output_dir (str): Directory where the video will be saved
 
     Returns:
-        CompositeVideoClip: The final video with comments added
+        str: Path to the output video
     """
-    video_clips = [video]
-    audio_clips = []
-
-    # Get original audio if it exists
-    if video.audio:
-        audio_clips.append(video.audio)
-
-    for comment in comments_data:
-        # Check if this is a title or regular comment
-        if hasattr(comment, 'is_title') and comment.is_title:
-            # Create title card
-            comment_img = _create_reddit_title(
-                title_text=comment.text,
-                avatar_path=comment.avatar,
-                width=int(video.w * 0.8)  # Make title 80% of video width
-            )
-        else:
-            # Create regular comment image
-            comment_img = _create_reddit_comment(
-                username=comment.username,
-                comment_text=comment.text,
-                avatar_path=comment.avatar,
-                width=int(video.w * 0.8)  # Make comment 80% of video width
-            )
-
-        # Convert PIL image to numpy array
-        comment_array = np.array(comment_img)
-
-        # Create image clip
-        img_clip = ImageClip(comment_array)
-
-        # Position comment at the bottom of the video
-        position_x = (video.w - img_clip.w) // 2  # Center horizontally
-        position_y = (video.h - img_clip.h) // 2  # Center vertically
-
-        # Set duration and position
-        img_clip = (img_clip
-                    .set_position((position_x, position_y))
-                    .set_start(comment.start_time)
-                    .set_duration(comment.duration))
-
-        video_clips.append(img_clip)
-
-        # Generate and add audio for this comment
-        audio_clip, _ = generate_comment_audio(comment, lang, voice)
-        audio_clip = audio_clip.set_start(comment.start_time)
-        audio_clips.append(audio_clip)
-
-    # Create composite video
-    final_video = CompositeVideoClip(video_clips)
-
-    # Combine all audio clips
-    if audio_clips:
-        from moviepy.editor import CompositeAudioClip
-        final_audio = CompositeAudioClip(audio_clips)
-        final_video = final_video.set_audio(final_audio)
-
-    return final_video
-
-
-def write_videofile(video, output_dir=None, codec='libx264', cache_dir=None, progress_callback=None):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    unique_id = str(uuid.uuid4())[:8]
+    return os.path.join(output_dir, f"video_{timestamp}_{unique_id}.mp4")
+
+
+def write_videofile(video, output_dir=None, encoding_profile=None, cache_dir=None, progress_callback=None,
+                    audio_samples=None):
     """
     Write the video to a file with a unique filename in the specified directory
 
     Args:
-        video (CompositeVideoClip): The video to write
+        video (VideoClip): The video to write
         output_dir (str): Directory where to save the output video
-        codec (str): Video codec to use
+        encoding_profile (EncodingProfile, optional): Encoder settings, defaults to DEFAULT_ENCODING_PROFILE
         cache_dir (str, optional): Directory for temporary cache files
         progress_callback (callable, optional): Function to receive progress updates (0-100)
+        audio_samples (np.ndarray, optional): Mixed PCM audio from mix_comments_audio, encoded together
+            with the frames instead of the clip's own audio
 
     Returns:
         str: Path to the output video
@@ -249,15 +86,20 @@ def write_videofile(video, output_dir=None, codec='libx264', cache_dir=None, pro
     if output_dir is None:
         output_dir = settings.OUTPUT_DIR
 
+    if encoding_profile is None:
+        encoding_profile = get_encoding_profile()
+
     # Create directories if they don't exist
     os.makedirs(cache_dir, exist_ok=True)
     os.makedirs(output_dir, exist_ok=True)
 
-    # Generate unique filename with timestamp and UUID
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = str(uuid.uuid4())[:8]
-    filename = f"video_{timestamp}_{unique_id}.mp4"
-    output_path = os.path.join(output_dir, filename)
+    output_path = generate_output_path(output_dir)
+    filename = os.path.basename(output_path)
+
+    if audio_samples is not None:
+        # Frames and audio buffer go to the same ffmpeg, the output is the only file written
+        _write_with_audio(video, output_path, audio_samples, encoding_profile, progress_callback)
+        return output_path
 
     # Create path for temporary audio file in cache directory
     temp_audio_path = os.path.join(cache_dir, f"{filename}_TEMP_MPY_wvf_snd.mp3")
@@ -265,13 +107,75 @@ def write_videofile(video, output_dir=None, codec='libx264', cache_dir=None, pro
     # Use the progress_logger with write_videofile
     video.write_videofile(
         output_path,
-        codec=codec,
         temp_audiofile=temp_audio_path,
-        logger=progress_callback
+        logger=progress_callback,
+        **encoding_profile.moviepy_kwargs()
     )
 
     # Clean up temporary audio file
     if os.path.exists(temp_audio_path):
         os.remove(temp_audio_path)
 
-    return output_path
\ No newline at end of file
+    return output_path
+
+
+def _write_with_audio(video, output_path, audio_samples, encoding_profile, progress_callback=None,
+                      ffmpeg_binary="ffmpeg"):
+    """
+    Encode the frames of a clip and a PCM buffer with one ffmpeg process
+
+    The frames are piped to stdin and the samples to a second pipe, read by
+    ffmpeg as its audio input, so nothing but the output file is written.
+    """
+    fps = encoding_profile.fps or video.fps
+    samples = np.ascontiguousarray(audio_samples, dtype=np.float32)
+    audio_read, audio_write = os.pipe()
+
+    cmd = [ffmpeg_binary, "-y", "-loglevel", "error",
+           "-f", "rawvideo", "-vcodec", "rawvideo", "-s", f"{video.w}x{video.h}", "-pix_fmt", "rgb24",
+           "-r", f"{fps:g}", "-i", "pipe:0",
+           "-f", "f32le", "-ar", str(settings.AUDIO_SAMPLE_RATE), "-ac", str(samples.shape[1]),
+           "-i", f"pipe:{audio_read}",
+           "-map", "0:v", "-map", "1:a"]
+    cmd += encoding_profile.ffmpeg_args()
+    cmd += ["-c:a", "aac", "-b:a", settings.AUDIO_BITRATE, "-shortest", str(output_path)]
+
+    # stderr goes to a file, a full pipe would block ffmpeg while the frames are written
+    with tempfile.TemporaryFile() as stderr_file:
+        try:
+            process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr_file,
+                                       pass_fds=(audio_read,))
+        except BaseException:
+            os.close(audio_write)
+            raise
+        finally:
+            os.close(audio_read)
+
+        def feed_audio():
+            with open(audio_write, "wb") as audio_pipe:
+                try:
+                    audio_pipe.write(memoryview(samples).cast('B'))
+                except BrokenPipeError:
+                    # ffmpeg stopped, its exit code tells why
+                    pass
+
+        audio_thread = threading.Thread(target=feed_audio, name="audio-pipe", daemon=True)
+        audio_thread.start()
+        try:
+            for frame in video.iter_frames(fps=fps, dtype="uint8", logger=progress_callback):
+                process.stdin.write(frame[:, :, :3].tobytes())
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        except BaseException:
+            # Do not leave a half written output behind a frame that failed
+            process.kill()
+            raise
+        finally:
+            returncode = process.wait()
+            audio_thread.join()
+
+        if returncode != 0:
+            stderr_file.seek(0)
+            raise RuntimeError(f"ffmpeg failed with exit code {returncode}: "
+                               f"{stderr_file.read().decode(errors='replace').strip()[-2000:]}")
@@ -0,0 +1,50 @@
+import hashlib
+import json
+from typing import List, Optional
+
+from app.api.dto.reddit_dto import Comment
+from app.core.config import settings
+
+
+def _value(option):
+    """The plain value of an enum member, so it hashes like the string it stands for."""
+    return getattr(option, "value", option)
+
+
+def compute_render_hash(video_name, comments: List[Comment], title: Optional[str], voice_id, language,
+                        vid_len=None, ratio=None, theme=None, render_engine=None, encoding_profile=None) -> str:
+    """
+    Canonical hash of everything a render depends on, so identical submissions share one job
+
+    Server defaults are resolved before hashing, so leaving an option unset and
+    asking for its default value give the same hash.
+
+    Args:
+        video_name: File name of the video template
+        comments: Comments of the job, in order
+        title: Title of the post
+        voice_id: Name of the TTS voice
+        language: Language code (e.g., 'en-US')
+        vid_len: Target video length in seconds
+        ratio: Aspect ratio of the video
+        theme: Theme of the comment overlay
+        render_engine: Render engine, None for the server default
+        encoding_profile: Encoding profile name, None for the server default
+
+    Returns:
+        str: Hex SHA-256 of the canonical JSON of the inputs
+    """
+    inputs = {
+        "video_name": video_name,
+        "comments": [comment.model_dump(mode="json") for comment in comments],
+        "title": title or None,
+        "voice_id": voice_id,
+        "language": _value(language),
+        "vid_len": vid_len,
+        "ratio": ratio,
+        "theme": theme,
+        "render_engine": _value(render_engine or settings.RENDER_ENGINE),
+        "encoding_profile": encoding_profile or settings.DEFAULT_ENCODING_PROFILE,
+    }
+    canonical = json.dumps(inputs, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
@@ -0,0 +1,210 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+from typing import List
+
+from app.api.dto.reddit_dto import Comment
+from app.core.config import settings
+from app.utils.audio_mix import mix_comments_audio, mux_audio
+from app.utils.card_renderer import render_cards
+from app.utils.encoding_profile import get_encoding_profile
+from app.utils.reddit_comment_overlay import add_cards_to_video, generate_output_path
+from app.utils.template_ingest import get_keyframes, get_video_info
+from app.utils.video_geometry import open_video_clip
+from app.utils.worker_sizing import get_ffmpeg_threads, get_worker_slots
+
+logger = logging.getLogger(__name__)
+
+
+def get_slot_cpus():
+    """CPUs of the job slot this render runs in, the encoder threads it was given."""
+    return get_ffmpeg_threads(get_worker_slots())
+
+
+def get_segment_count():
+    """
+    Number of segments a job is split into, RENDER_SEGMENTS or one per CPU of its slot
+
+    The segments of a job share the CPUs of its slot, so they are never more
+    than the slot has CPUs, whatever RENDER_SEGMENTS asks for.
+    """
+    slot_cpus = get_slot_cpus()
+    if settings.RENDER_SEGMENTS > 0:
+        return min(settings.RENDER_SEGMENTS, slot_cpus)
+    return slot_cpus
+
+
+def plan_segments(duration, keyframes, segment_count, min_segment_duration=0.0):
+    """
+    Split the timeline into segments whose boundaries fall on keyframes
+
+    Args:
+        duration (float): Duration of the timeline in seconds
+        keyframes (list): Sorted keyframe times of the template
+        segment_count (int): Wanted number of segments
+        min_segment_duration (float): Segments are never shorter than this
+
+    Returns:
+        list: (start, end) tuples covering [0, duration]
+    """
+    if min_segment_duration > 0:
+        segment_count = min(segment_count, max(1, int(duration // min_segment_duration)))
+
+    candidates = [k for k in keyframes if min_segment_duration <= k <= duration - min_segment_duration]
+
+    boundaries = set()
+    for i in range(1, segment_count):
+        target = duration * i / segment_count
+        if candidates:
+            boundaries.add(min(candidates, key=lambda k: abs(k - target)))
+
+    points = [0.0] + sorted(boundaries) + [duration]
+    return [(start, end) for start, end in zip(points[:-1], points[1:]) if end > start]
+
+
+def _shift_comments(comments_data: List[Comment], start, end) -> List[Comment]:
+    """Comments visible in [start, end), with their start times relative to start."""
+    shifted = []
+    for comment in comments_data:
+        if comment.start_time < end and comment.start_time + comment.duration > start:
+            comment_copy = comment.model_copy()
+            comment_copy.start_time = comment.start_time - start
+            shifted.append(comment_copy)
+    return shifted
+
+
+def _render_segment(video_path, comments_data: List[Comment], start, end, theme, output_path, encoding_profile,
+                    start_offset, geometry):
+    """Worker process task: render the video of one segment without audio."""
+    video = open_video_clip(video_path, geometry, audio=False)
+    try:
+        segment = video.subclip(start_offset + start, start_offset + end)
+        segment = add_cards_to_video(segment, _shift_comments(comments_data, start, end), theme)
+        segment = segment.set_duration(end - start)
+        segment.write_videofile(output_path, audio=False, logger=None, **encoding_profile.moviepy_kwargs())
+    finally:
+        video.close()
+    return output_path
+
+
+def _concat_segments(segment_paths, audio_samples, output_path, faststart=True, ffmpeg_binary="ffmpeg"):
+    """Join the segments with the concat demuxer and mux the audio, without re-encoding the video."""
+    list_path = f"{output_path}.segments.txt"
+    with open(list_path, "w") as list_file:
+        for segment_path in segment_paths:
+            list_file.write(f"file '{os.path.abspath(segment_path)}'\n")
+
+    try:
+        if audio_samples is not None:
+            mux_audio(list_path, audio_samples, output_path, concat=True, faststart=faststart,
+                      ffmpeg_binary=ffmpeg_binary)
+            return
+
+        cmd = [ffmpeg_binary, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+               "-c:v", "copy"]
+        if faststart:
+            cmd += ["-movflags", "+faststart"]
+        cmd.append(output_path)
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg concat failed with exit code {result.returncode}: {result.stderr.strip()}")
+    finally:
+        os.remove(list_path)
+
+
+def render_video_in_segments(video_path, comments_data: List[Comment], lang, voice, theme=None, segment_count=None,
+                             output_dir=None, cache_dir=None, encoding_profile=None, start_offset=0.0, geometry=None,
+                             progress_callback=None):
+    """
+    Render the comment timeline in keyframe-aligned segments on several processes
+
+    Each segment is composited and encoded by its own process with only the
+    cards that appear in it. The audio is mixed and encoded once for the whole
+    timeline, then ffmpeg joins the segments with the concat demuxer.
+
+    Args:
+        video_path (str): Path to the template video
+        comments_data (list): List of Comment with start_time and duration set
+        lang (str): language code (e.g., 'en-US')
+        voice (str): voice name (e.g., 'en-US-Standard-D')
+        theme (str, optional): Theme of the cards, dark or light
+        segment_count (int, optional): Number of segments, defaults to get_segment_count(), at most the CPUs
+            of the slot
+        output_dir (str): Directory where to save the output video
+        cache_dir (str, optional): Directory for the segment files
+        encoding_profile (EncodingProfile, optional): Encoder settings, defaults to DEFAULT_ENCODING_PROFILE
+        start_offset (float): Time of the template the output starts at
+        geometry (OutputGeometry, optional): Crop and scale applied to the template
+        progress_callback (callable, optional): Function to receive progress updates (0-100)
+
+    Returns:
+        str: Path to the output video
+    """
+    if cache_dir is None:
+        cache_dir = settings.CACHE_DIR
+
+    if output_dir is None:
+        output_dir = settings.OUTPUT_DIR
+
+    slot_cpus = get_slot_cpus()
+    if segment_count is None:
+        segment_count = get_segment_count()
+    segment_count = max(1, min(segment_count, slot_cpus))
+
+    if encoding_profile is None:
+        encoding_profile = get_encoding_profile()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    video_info = get_video_info(video_path)
+
+    # Trim the output to the comments, like trim_video_to_fit_comments does
+    duration = video_info["duration"] - start_offset
+    if comments_data:
+        duration = min(duration, max(c.start_time + c.duration for c in comments_data))
+
+    keyframes = [k - start_offset for k in get_keyframes(video_path) if k >= start_offset]
+    segments = plan_segments(duration, keyframes, segment_count, settings.RENDER_MIN_SEGMENT_SECONDS)
+    logger.info(f"Rendering {duration:.2f} s of video in {len(segments)} segments")
+
+    # The segment encoders split the threads of the slot between them
+    segment_profile = replace(encoding_profile, threads=max(1, slot_cpus // len(segments)))
+
+    # Warm the card cache so the segment processes load the cards instead of drawing them
+    render_cards(comments_data, geometry.width if geometry else video_info["width"], theme)
+
+    output_path = generate_output_path(output_dir)
+    work_dir = tempfile.mkdtemp(prefix="segments_", dir=cache_dir)
+
+    try:
+        segment_paths = [os.path.join(work_dir, f"segment_{index:03d}.mp4") for index in range(len(segments))]
+
+        with ProcessPoolExecutor(max_workers=len(segments),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [
+                pool.submit(_render_segment, str(video_path), comments_data, start, end, theme, segment_path,
+                            segment_profile, start_offset, geometry)
+                for (start, end), segment_path in zip(segments, segment_paths)
+            ]
+
+            # Mix the audio of the whole timeline once while the segments render
+            audio_samples = mix_comments_audio(comments_data, lang, voice, duration,
+                                               video_path=video_path if video_info.get("has_audio") else None,
+                                               start_offset=start_offset)
+
+            for completed, future in enumerate(as_completed(futures), start=1):
+                future.result()
+                if progress_callback:
+                    progress_callback(completed / len(futures) * 100)
+
+        _concat_segments(segment_paths, audio_samples, output_path, faststart=encoding_profile.faststart)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return output_path
@@ -0,0 +1,55 @@
+from typing import List
+from xml.sax.saxutils import escape
+
+SSML_OPEN = "<speak>"
+SSML_CLOSE = "</speak>"
+
+
+def start_mark(index):
+    return f"s{index}"
+
+
+def end_mark(index):
+    return f"e{index}"
+
+
+def _ssml_piece(index, text):
+    return f'<mark name="{start_mark(index)}"/>{escape(text)}<mark name="{end_mark(index)}"/>'
+
+
+def build_ssml_chunks(texts: List[str], pause_time=1.0, max_bytes=5000) -> List[tuple]:
+    """
+    Build SSML documents reading the texts in order, with a mark around each text and a break between them
+
+    Texts are packed into as few documents as fit in max_bytes, the request
+    limit of the API. A text too long for a document of its own gets one anyway.
+
+    Args:
+        texts (list): The texts to read
+        pause_time (float): Pause between two texts in seconds
+        max_bytes (int): Maximum size of a document in bytes
+
+    Returns:
+        list: (ssml, indices) tuples, indices being the positions in texts read by the document
+    """
+    pause = f'<break time="{int(round(pause_time * 1000))}ms"/>'
+    chunks = []
+    pieces = []
+    indices = []
+    size = len(SSML_OPEN) + len(SSML_CLOSE)
+
+    for index, text in enumerate(texts):
+        piece = _ssml_piece(index, text)
+        piece_size = len(piece.encode()) + (len(pause) if pieces else 0)
+        if pieces and size + piece_size > max_bytes:
+            chunks.append((SSML_OPEN + pause.join(pieces) + SSML_CLOSE, indices))
+            pieces, indices = [], []
+            size = len(SSML_OPEN) + len(SSML_CLOSE)
+            piece_size = len(piece.encode())
+        pieces.append(piece)
+        indices.append(index)
+        size += piece_size
+
+    if pieces:
+        chunks.append((SSML_OPEN + pause.join(pieces) + SSML_CLOSE, indices))
+    return chunks
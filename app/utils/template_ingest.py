@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import random
+import subprocess
+from pathlib import Path
+
+from app.core.config import settings
+from app.utils.media_probe import probe_keyframes, probe_video
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv', '.webm']
+
+
+def get_mezzanine_paths(template_name, mezzanine_dir=None):
+    """
+    Paths of the mezzanine file and keyframe index of a template
+
+    They are named after the whole relative path of the template, extension
+    included, so templates sharing a stem (intro.mp4, intro.mov, a/intro.mp4)
+    get their own mezzanine.
+
+    Args:
+        template_name (str): Path of the template relative to VIDEO_TEMPLATES_DIR
+        mezzanine_dir (str, optional): Directory of the mezzanine files
+
+    Returns:
+        tuple: (mezzanine_path, index_path)
+    """
+    if mezzanine_dir is None:
+        mezzanine_dir = settings.VIDEO_MEZZANINE_DIR
+
+    key = Path(template_name).as_posix()
+    return (os.path.join(mezzanine_dir, f"{key}.mp4"),
+            os.path.join(mezzanine_dir, f"{key}.index.json"))
+
+
+def load_template_index(video_path):
+    """
+    Load the sidecar keyframe index of a mezzanine file
+
+    Args:
+        video_path (str): Path to the mezzanine file
+
+    Returns:
+        dict: The index, or None if the file has no index
+    """
+    index_path = f"{os.path.splitext(video_path)[0]}.index.json"
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path) as index_file:
+        return json.load(index_file)
+
+
+def transcode_template(template_path, mezzanine_dir=None, force=False, templates_dir=None):
+    """
+    Transcode a template into a decode-friendly H.264 mezzanine with a regular GOP
+
+    A keyframe is forced every MEZZANINE_GOP_SECONDS so any start offset can be
+    reached by decoding at most one GOP, and the keyframe times are written to a
+    sidecar index next to the mezzanine file.
+
+    Args:
+        template_path (str): Path to the source template
+        mezzanine_dir (str, optional): Directory of the mezzanine files
+        force (bool): Transcode even if the mezzanine is up to date
+        templates_dir (str, optional): Directory the template path is relative to, defaults to VIDEO_TEMPLATES_DIR
+
+    Returns:
+        str: Path to the mezzanine file
+    """
+    if templates_dir is None:
+        templates_dir = settings.VIDEO_TEMPLATES_DIR
+
+    template_name = os.path.relpath(template_path, templates_dir)
+    if template_name.split(os.sep)[0] == os.pardir:
+        # Outside the templates directory, only its file name identifies it
+        template_name = os.path.basename(template_path)
+    mezzanine_path, index_path = get_mezzanine_paths(template_name, mezzanine_dir)
+    os.makedirs(os.path.dirname(mezzanine_path), exist_ok=True)
+
+    source_mtime = os.path.getmtime(template_path)
+    if not force and os.path.exists(mezzanine_path) and os.path.exists(index_path) \
+            and os.path.getmtime(mezzanine_path) >= source_mtime:
+        logger.info(f"Mezzanine of {template_path} is up to date")
+        return mezzanine_path
+
+    gop_seconds = settings.MEZZANINE_GOP_SECONDS
+    temp_path = f"{mezzanine_path}.part.mp4"
+    cmd = [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-i", str(template_path),
+        "-map", "0:v:0", "-map", "0:a:0?",
+        "-c:v", "libx264", "-preset", settings.MEZZANINE_PRESET, "-crf", str(settings.MEZZANINE_CRF),
+        "-pix_fmt", "yuv420p",
+        "-force_key_frames", f"expr:gte(t,n_forced*{gop_seconds})", "-sc_threshold", "0",
+        "-c:a", "aac",
+        "-movflags", "+faststart",
+        temp_path,
+    ]
+    logger.info(f"Transcoding {template_path} to {mezzanine_path}")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise RuntimeError(f"Failed to transcode {template_path}: {result.stderr.strip()}")
+    os.replace(temp_path, mezzanine_path)
+
+    index = probe_video(mezzanine_path)
+    index.update({
+        "source": Path(template_name).as_posix(),
+        "source_mtime": source_mtime,
+        "gop_seconds": gop_seconds,
+        "keyframes": probe_keyframes(mezzanine_path),
+    })
+    with open(f"{index_path}.part", "w") as index_file:
+        json.dump(index, index_file)
+    os.replace(f"{index_path}.part", index_path)
+
+    return mezzanine_path
+
+
+def ingest_templates(templates_dir=None, mezzanine_dir=None, force=False):
+    """
+    Transcode every template of a directory into its mezzanine
+
+    Args:
+        templates_dir (str, optional): Directory of the templates, defaults to VIDEO_TEMPLATES_DIR
+        mezzanine_dir (str, optional): Directory of the mezzanine files
+        force (bool): Transcode even the templates whose mezzanine is up to date
+
+    Returns:
+        dict: Number of templates ingested and failed
+    """
+    if templates_dir is None:
+        templates_dir = settings.VIDEO_TEMPLATES_DIR
+
+    ingested = 0
+    failed = 0
+    for name in sorted(os.listdir(templates_dir)):
+        path = os.path.join(templates_dir, name)
+        if not os.path.isfile(path) or os.path.splitext(name)[1].lower() not in VIDEO_EXTENSIONS:
+            continue
+        try:
+            transcode_template(path, mezzanine_dir, force=force, templates_dir=templates_dir)
+            ingested += 1
+        except Exception as e:
+            logger.error(f"Failed to ingest template {name}: {str(e)}")
+            failed += 1
+
+    return {"ingested": ingested, "failed": failed}
+
+
+def resolve_template(video_name, templates_dir=None, mezzanine_dir=None):
+    """
+    Get the path to render a template from, its mezzanine if it is up to date
+
+    Args:
+        video_name (str): File name of the template
+        templates_dir (str, optional): Directory of the templates, defaults to VIDEO_TEMPLATES_DIR
+        mezzanine_dir (str, optional): Directory of the mezzanine files
+
+    Returns:
+        str: Path to the mezzanine file, or to the original template
+    """
+    if templates_dir is None:
+        templates_dir = settings.VIDEO_TEMPLATES_DIR
+
+    template_path = os.path.join(templates_dir, video_name)
+    mezzanine_path, index_path = get_mezzanine_paths(video_name, mezzanine_dir)
+
+    if os.path.exists(mezzanine_path) and os.path.exists(index_path) \
+            and os.path.getmtime(mezzanine_path) >= os.path.getmtime(template_path):
+        return mezzanine_path
+
+    return template_path
+
+
+def get_video_info(video_path):
+    """Stream information of a video, read from its index when it has one."""
+    index = load_template_index(video_path)
+    if index:
+        return index
+    return probe_video(video_path)
+
+
+def get_keyframes(video_path):
+    """Keyframe times of a video, read from its index when it has one."""
+    index = load_template_index(video_path)
+    if index:
+        return index["keyframes"]
+    return probe_keyframes(video_path)
+
+
+def pick_start_offset(video_path, needed_duration, rng=None):
+    """
+    Pick a random keyframe to start rendering from, leaving enough video for the comments
+
+    Only indexed templates get an offset, so no decoding is spent to find keyframes.
+
+    Args:
+        video_path (str): Path to the template to render
+        needed_duration (float): Seconds of video the job needs
+        rng (random.Random, optional): Random generator to use
+
+    Returns:
+        float: Start offset in seconds, 0.0 if the template has no index or is too short
+    """
+    index = load_template_index(video_path)
+    if not index:
+        return 0.0
+
+    candidates = [k for k in index["keyframes"] if k + needed_duration <= index["duration"]]
+    if not candidates:
+        return 0.0
+    return (rng or random).choice(candidates)
@@ -1,121 +1,138 @@
+import hashlib
 import html
 import os
+import threading
 from logging import getLogger
 from typing import List
 
-# Import the Comment class from your models
+from google.cloud import translate_v2 as translate
+
 from app.api.dto.video_dto import Comment
 from app.core.config import settings
+from app.db.redis import get_sync_redis
+from app.utils.cache_stats import record_cache_stats
 
 # Set up logger
 logger = getLogger(__name__)
 
-from google.cloud import translate_v2 as translate
+TRANSLATION_KEY = "translation:{digest}"
 
-def translate_comments(comments: List[Comment],
-                       target_language: str,
-                       credentials_path=settings.GOOGLE_CLOUD_CREDENTIALS_PATH.__str__()) -> List[Comment]:
-    """
-    Translate comments from English to target language
+_translate_client = None
+_translate_client_lock = threading.Lock()
 
-    Args:
-        comments: List of Comment objects
-        target_language: Target language code (e.g. 'fr-FR', 'vi-VN')
-        credentials_path: Credentials file path for Google Cloud Translation API
 
-    Returns:
-        List of Comment objects with translated text
-    """
+def get_translate_client() -> translate.Client:
+    """The Translation API client of this process, created on first use."""
+    global _translate_client
+    if _translate_client is None:
+        with _translate_client_lock:
+            if _translate_client is None:
+                credentials_path = str(settings.GOOGLE_CLOUD_CREDENTIALS_PATH)
+                if os.path.exists(credentials_path):
+                    _translate_client = translate.Client.from_service_account_json(credentials_path)
+                else:
+                    # Fall back to the application default credentials
+                    _translate_client = translate.Client()
+    return _translate_client
 
-    if target_language.startswith("en-"):
-        # No translation needed for English
-        return comments
 
+def _cache_key(text, source_language, target_language):
+    digest = hashlib.md5(f"{source_language}_{target_language}_{text}".encode()).hexdigest()
+    return TRANSLATION_KEY.format(digest=digest)
+
+
+def _read_cache(keys) -> list:
     try:
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-
-        # Extract just the language code (e.g. 'fr' from 'fr-FR')
-        target_lang_code = target_language.split('-')[0]
-
-        # Initialize the client
-        translate_client = translate.Client()
-
-        # Get all texts that need translation
-        texts_to_translate = [comment.text for comment in comments]
-
-        # Batch translate all texts
-        translations = translate_client.translate(
-            texts_to_translate,
-            target_language=target_lang_code,
-            source_language='en'
-        )
-
-        # Update comments with translated text
-        translated_comments = []
-        for comment, translation in zip(comments, translations):
-            # Create a copy of the comment with translated text
-            translated_comment = Comment(
-                username=comment.username,
-                text=html.unescape(translation['translatedText']),
-                start_time=comment.start_time,
-                duration=comment.duration,
-                avatar=comment.avatar
-            )
-            # Copy any additional attributes
-            if hasattr(comment, 'is_title'):
-                translated_comment.is_title = comment.is_title
-
-            translated_comments.append(translated_comment)
-
-        return translated_comments
+        redis_client = get_sync_redis()
+        values = redis_client.mget(keys)
+        redis_client.close()
+        return values
+    except Exception as e:
+        logger.warning(f"Failed to read the translation cache: {str(e)}")
+        return [None] * len(keys)
 
+
+def _write_cache(entries: dict):
+    try:
+        redis_client = get_sync_redis()
+        pipeline = redis_client.pipeline()
+        for key, value in entries.items():
+            pipeline.set(key, value, ex=settings.TRANSLATION_CACHE_TTL_SECONDS or None)
+        pipeline.execute()
+        redis_client.close()
     except Exception as e:
-        logger.error(f"Translation failed: {str(e)}", exc_info=True)
-        # Return original comments if translation fails
-        return comments
+        logger.warning(f"Failed to write the translation cache: {str(e)}")
+
 
+def translate_texts(texts: List[str], target_language: str, source_language: str = "en") -> List[str]:
+    """
+    Translate texts with as few requests as possible, reusing the translations cached in Redis
 
-def translate_text(text: str,
-                   target_language: str,
-                   credentials_path=settings.GOOGLE_CLOUD_CREDENTIALS_PATH) -> str:
+    The texts missing from the cache are translated together, in requests of at
+    most TRANSLATION_BATCH_SIZE texts, and cached by (text, source, target).
+
+    Args:
+        texts: Texts to translate
+        target_language: Target language code (e.g. 'fr-FR', 'vi-VN')
+        source_language: Language code of the texts
+
+    Returns:
+        Translated texts, in the order of texts
+    """
+    # Extract just the language codes (e.g. 'fr' from 'fr-FR')
+    target_lang_code = target_language.split('-')[0]
+    source_lang_code = source_language.split('-')[0]
+    if target_lang_code == source_lang_code or not texts:
+        return list(texts)
+
+    unique_texts = list(dict.fromkeys(texts))
+    keys = [_cache_key(text, source_lang_code, target_lang_code) for text in unique_texts]
+    translations = {text: value for text, value in zip(unique_texts, _read_cache(keys)) if value is not None}
+
+    missing = [text for text in unique_texts if text not in translations]
+    record_cache_stats("translation", hits=len(translations), misses=len(missing))
+    if missing:
+        client = get_translate_client()
+        batch_size = settings.TRANSLATION_BATCH_SIZE
+        translated = {}
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            results = client.translate(batch, target_language=target_lang_code, source_language=source_lang_code)
+            for text, result in zip(batch, results):
+                # Decode HTML entities in the translated text
+                translated[text] = html.unescape(result['translatedText'])
+        logger.info(f"Translated {len(missing)} texts to {target_lang_code} in "
+                    f"{(len(missing) + batch_size - 1) // batch_size} requests")
+
+        _write_cache({_cache_key(text, source_lang_code, target_lang_code): value
+                      for text, value in translated.items()})
+        translations.update(translated)
+
+    return [translations[text] for text in texts]
+
+
+def translate_comments(comments: List[Comment], target_language: str) -> List[Comment]:
     """
-    Translate a single text from English to target language
+    Translate comments from English to target language, with one batched request
 
     Args:
-        text: Text to translate
+        comments: List of Comment objects, the post title included
         target_language: Target language code (e.g. 'fr-FR', 'vi-VN')
-        credentials_path: Credentials file path for Google Cloud Translation API
 
     Returns:
-        Translated text
+        List of Comment objects with translated text
     """
 
     if target_language.startswith("en-"):
         # No translation needed for English
-        return text
+        return comments
 
     try:
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-
-        # Extract just the language code (e.g. 'fr' from 'fr-FR')
-        target_lang_code = target_language.split('-')[0]
-
-        # Initialize the client
-        translate_client = translate.Client()
-
-        # Translate the text
-        translation = translate_client.translate(
-            text,
-            target_language=target_lang_code,
-            source_language='en'
-        )
-
-        # Decode HTML entities in the translated text
-        translated_text = html.unescape(translation['translatedText'])
-
-        return translated_text
+        translations = translate_texts([comment.text for comment in comments], target_language)
+        return [comment.model_copy(update={"text": translation})
+                for comment, translation in zip(comments, translations)]
 
     except Exception as e:
         logger.error(f"Translation failed: {str(e)}", exc_info=True)
-        # Return original text if translation fails
-        return text
\ No newline at end of file
+        # Return original comments if translation fails
+        return comments
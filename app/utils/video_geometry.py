@@ -0,0 +1,189 @@
+import os
+import re
+import subprocess as sp
+from dataclasses import dataclass
+from typing import Optional
+
+from moviepy.audio.io.AudioFileClip import AudioFileClip
+from moviepy.config import get_setting
+from moviepy.editor import VideoClip, VideoFileClip
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+
+from app.core.config import settings
+
+RATIO_PATTERN = re.compile(r"^\s*(\d+)\s*:\s*(\d+)\s*$")
+
+
+def _even(value):
+    """Round to the nearest even number, yuv420p needs even dimensions."""
+    return max(2, int(round(value / 2)) * 2)
+
+
+def parse_ratio(ratio) -> Optional[tuple]:
+    """
+    Parse an aspect ratio like '9:16'
+
+    Args:
+        ratio (str): Aspect ratio as 'width:height', or None
+
+    Returns:
+        tuple: (width, height), or None if no ratio is given
+    """
+    if not ratio:
+        return None
+    match = RATIO_PATTERN.match(ratio)
+    if not match or int(match.group(1)) == 0 or int(match.group(2)) == 0:
+        raise ValueError(f"Invalid aspect ratio: {ratio}")
+    return int(match.group(1)), int(match.group(2))
+
+
+@dataclass
+class OutputGeometry:
+    """Center crop and scale applied to the template when it is decoded."""
+    source_width: int
+    source_height: int
+    crop_x: int
+    crop_y: int
+    crop_width: int
+    crop_height: int
+    width: int
+    height: int
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def video_filter(self):
+        """ffmpeg filter chain producing the output frame from a decoded template frame."""
+        filters = []
+        if (self.crop_width, self.crop_height) != (self.source_width, self.source_height):
+            filters.append(f"crop={self.crop_width}:{self.crop_height}:{self.crop_x}:{self.crop_y}")
+        filters.append(f"scale={self.width}:{self.height}")
+        filters.append("setsar=1")
+        return ",".join(filters)
+
+
+def compute_output_geometry(source_width, source_height, ratio=None, short_side=None) -> OutputGeometry:
+    """
+    Compute the crop and output size of a job
+
+    With a ratio, the template is center cropped to it and scaled so its short
+    side is short_side. Without one the template keeps its aspect ratio and is
+    only scaled down when its short side is larger than short_side.
+
+    Args:
+        source_width (int): Width of the template
+        source_height (int): Height of the template
+        ratio (str, optional): Requested aspect ratio, e.g. '9:16'
+        short_side (int, optional): Short side of the output, defaults to OUTPUT_SHORT_SIDE
+
+    Returns:
+        OutputGeometry: The geometry to decode the template with
+    """
+    if short_side is None:
+        short_side = settings.OUTPUT_SHORT_SIDE
+
+    parsed_ratio = parse_ratio(ratio)
+    crop_width, crop_height = source_width, source_height
+
+    if parsed_ratio:
+        aspect = parsed_ratio[0] / parsed_ratio[1]
+        if source_width / source_height > aspect:
+            crop_width = min(source_width, _even(source_height * aspect))
+        else:
+            crop_height = min(source_height, _even(source_width / aspect))
+        if aspect >= 1:
+            width, height = _even(short_side * aspect), _even(short_side)
+        else:
+            width, height = _even(short_side), _even(short_side / aspect)
+    else:
+        scale = min(1.0, short_side / min(source_width, source_height))
+        width, height = _even(source_width * scale), _even(source_height * scale)
+
+    return OutputGeometry(
+        source_width=source_width,
+        source_height=source_height,
+        crop_x=(source_width - crop_width) // 2,
+        crop_y=(source_height - crop_height) // 2,
+        crop_width=crop_width,
+        crop_height=crop_height,
+        width=width,
+        height=height,
+    )
+
+
+class GeometryVideoReader(FFMPEG_VideoReader):
+    """FFMPEG_VideoReader that crops and scales in the ffmpeg decode process."""
+
+    def __init__(self, filename, geometry: OutputGeometry, **kwargs):
+        self.geometry = geometry
+        super().__init__(filename, target_resolution=(geometry.height, geometry.width), **kwargs)
+
+    def initialize(self, starttime=0):
+        """Opens the file, creates the pipe. Same as FFMPEG_VideoReader with the geometry filter."""
+        self.close()  # if any
+
+        if starttime != 0:
+            offset = min(1, starttime)
+            i_arg = ['-ss', "%.06f" % (starttime - offset),
+                     '-i', self.filename,
+                     '-ss', "%.06f" % offset]
+        else:
+            i_arg = ['-i', self.filename]
+
+        cmd = ([get_setting("FFMPEG_BINARY")] + i_arg +
+               ['-loglevel', 'error',
+                '-f', 'image2pipe',
+                '-vf', self.geometry.video_filter(),
+                '-sws_flags', self.resize_algo,
+                "-pix_fmt", self.pix_fmt,
+                '-vcodec', 'rawvideo', '-'])
+        popen_params = {"bufsize": self.bufsize,
+                        "stdout": sp.PIPE,
+                        "stderr": sp.PIPE,
+                        "stdin": sp.DEVNULL}
+
+        if os.name == "nt":
+            popen_params["creationflags"] = 0x08000000
+
+        self.proc = sp.Popen(cmd, **popen_params)
+
+
+class GeometryVideoFileClip(VideoFileClip):
+    """VideoFileClip whose frames come out of ffmpeg already cropped and scaled to the output geometry."""
+
+    def __init__(self, filename, geometry: OutputGeometry, audio=True):
+        VideoClip.__init__(self)
+
+        self.reader = GeometryVideoReader(filename, geometry)
+        self.geometry = geometry
+
+        # Make some of the reader's attributes accessible from the clip
+        self.duration = self.reader.duration
+        self.end = self.reader.duration
+        self.fps = self.reader.fps
+        self.size = self.reader.size
+        self.rotation = self.reader.rotation
+        self.filename = self.reader.filename
+
+        self.make_frame = lambda t: self.reader.get_frame(t)
+
+        if audio and self.reader.infos['audio_found']:
+            self.audio = AudioFileClip(filename)
+
+
+def open_video_clip(video_path, geometry: Optional[OutputGeometry] = None, audio=True):
+    """
+    Open a template for compositing at the output geometry
+
+    Args:
+        video_path (str): Path to the template
+        geometry (OutputGeometry, optional): Geometry to decode at, None to decode as is
+        audio (bool): Load the audio of the template
+
+    Returns:
+        VideoFileClip: The opened clip
+    """
+    if geometry is None or (geometry.source_width, geometry.source_height) == geometry.size:
+        return VideoFileClip(str(video_path), audio=audio)
+    return GeometryVideoFileClip(str(video_path), geometry, audio=audio)
@@ -0,0 +1,54 @@
+import math
+import os
+
+from app.core.config import settings
+
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_MEMORY_MAX = "/sys/fs/cgroup/memory.max"
+
+
+def _read_cgroup(path):
+    try:
+        with open(path) as cgroup_file:
+            return cgroup_file.read().split()
+    except OSError:
+        return None
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, within the CPU quota of its container."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    quota = _read_cgroup(CGROUP_CPU_MAX)
+    if quota and quota[0] != "max":
+        cpus = min(cpus, max(1, math.ceil(int(quota[0]) / int(quota[1]))))
+    return cpus
+
+
+def available_memory_bytes() -> int:
+    """Memory of the machine, or the memory limit of the container when it has one."""
+    memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    limit = _read_cgroup(CGROUP_MEMORY_MAX)
+    if limit and limit[0] != "max":
+        memory = min(memory, int(limit[0]))
+    return memory
+
+
+def get_worker_slots() -> int:
+    """
+    Number of jobs a worker runs at once, WORKER_SLOTS or what the CPUs and memory allow
+
+    Each slot gets WORKER_CORES_PER_SLOT cores, x264 gains little from more
+    threads at our resolutions, and WORKER_MEMORY_PER_SLOT_MB of memory.
+    """
+    if settings.WORKER_SLOTS > 0:
+        return settings.WORKER_SLOTS
+    by_cpu = available_cpus() // settings.WORKER_CORES_PER_SLOT
+    by_memory = available_memory_bytes() // (settings.WORKER_MEMORY_PER_SLOT_MB * 1024 * 1024)
+    return max(1, min(by_cpu, by_memory))
+
+
+def get_ffmpeg_threads(slots) -> int:
+    """Encoder threads of each job, FFMPEG_THREADS or the CPUs shared between the slots."""
+    if settings.FFMPEG_THREADS > 0:
+        return settings.FFMPEG_THREADS
+    return max(1, available_cpus() // slots)
@@ -7,6 +7,7 @@ from pathlib import Path
 from typing import Dict, List, Optional, Union, Any
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 from tqdm import tqdm
@@ -29,6 +30,7 @@ class CloudflareCredentials:
     access_key_id: str
     secret_access_key: str
     bucket_name: str
+    endpoint_url: Optional[str] = None  # Any S3-compatible endpoint instead of R2, e.g. a local stand-in
 
     @classmethod
     def from_env(cls) -> 'CloudflareCredentials':
@@ -37,25 +39,29 @@ class CloudflareCredentials:
             account_id=os.environ.get('CLOUDFLARE_ACCOUNT_ID', ''),
             access_key_id=os.environ.get('CLOUDFLARE_ACCESS_KEY_ID', ''),
             secret_access_key=os.environ.get('CLOUDFLARE_SECRET_ACCESS_KEY', ''),
-            bucket_name=os.environ.get('CLOUDFLARE_BUCKET_NAME', '')
+            bucket_name=os.environ.get('CLOUDFLARE_BUCKET_NAME', ''),
+            endpoint_url=os.environ.get('CLOUDFLARE_ENDPOINT_URL') or None
         )
 
 
 class CloudflareR2Client:
     """Client for interacting with Cloudflare R2 storage."""
 
-    def __init__(self, credentials: CloudflareCredentials):
-        """Initialize with Cloudflare R2 credentials."""
+    def __init__(self, credentials: CloudflareCredentials, config: Optional[Config] = None):
+        """Initialize with Cloudflare R2 credentials, and optionally botocore timeouts and retries."""
         self.credentials = credentials
+        self.config = config
         self.client = self._create_client()
 
     def _create_client(self):
         """Create and return a boto3 S3 client for Cloudflare R2."""
         return boto3.client(
             's3',
-            endpoint_url=f'https://{self.credentials.account_id}.r2.cloudflarestorage.com',
+            endpoint_url=self.credentials.endpoint_url
+            or f'https://{self.credentials.account_id}.r2.cloudflarestorage.com',
             aws_access_key_id=self.credentials.access_key_id,
-            aws_secret_access_key=self.credentials.secret_access_key
+            aws_secret_access_key=self.credentials.secret_access_key,
+            config=self.config
         )
 
     def object_exists(self, object_name: str) -> bool:
@@ -69,6 +75,17 @@ class CloudflareR2Client:
             logger.error(f"Error checking if object exists: {e}")
             raise
 
+    def get_object(self, object_name: str) -> Optional[bytes]:
+        """Read an object from the bucket, None if it does not exist."""
+        try:
+            response = self.client.get_object(Bucket=self.credentials.bucket_name, Key=object_name)
+            return response['Body'].read()
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return None
+            logger.error(f"Error getting object: {e}")
+            raise
+
     def list_objects(self) -> List[Dict[str, Any]]:
         """List all objects in the bucket."""
         objects = []
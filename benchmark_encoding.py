@@ -0,0 +1,127 @@
+import argparse
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from app.api.dto.reddit_dto import Comment
+from app.core.config import settings
+from app.enum.render import RenderEngine
+from app.utils.audio_mix import mix_comments_audio
+from app.utils.card_renderer import render_cards
+from app.utils.encoding_profile import get_encoding_profile
+from app.utils.ffmpeg_render import render_comments_with_ffmpeg
+from app.utils.reddit_comment_overlay import add_cards_to_video, write_videofile
+from app.utils.video_geometry import open_video_clip
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("benchmark_encoding")
+
+COMMENT_SECONDS = 3.0
+
+
+def _run(cmd):
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{cmd[0]} failed: {result.stderr.strip()}")
+
+
+def make_synthetic_job(work_dir, width, height, fps, duration):
+    """
+    Create a synthetic template and comment timeline, with tones standing in for the TTS audio
+
+    Returns:
+        tuple: (template_path, comments)
+    """
+    template_path = os.path.join(work_dir, "template.mp4")
+    _run(["ffmpeg", "-y", "-loglevel", "error",
+          "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={duration}",
+          "-f", "lavfi", "-i", f"sine=frequency=220:duration={duration}",
+          "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest",
+          template_path])
+
+    comments = []
+    for index in range(int(duration // COMMENT_SECONDS)):
+        audio_path = os.path.join(work_dir, f"tone_{index}.mp3")
+        _run(["ffmpeg", "-y", "-loglevel", "error",
+              "-f", "lavfi", "-i", f"sine=frequency={440 + 40 * index}:duration={COMMENT_SECONDS - 0.5}",
+              audio_path])
+        comments.append(Comment(
+            username=f"benchmark_user_{index}",
+            text=f"Synthetic comment number {index} " + "with some words to wrap over a few lines " * (index % 3 + 1),
+            upvote=index * 100,
+            start_time=index * COMMENT_SECONDS,
+            duration=COMMENT_SECONDS,
+            audio_path=audio_path,
+        ))
+
+    return template_path, comments
+
+
+def render(engine, template_path, comments, encoding_profile, output_dir):
+    """Render the synthetic job with one engine and profile, returning the output path."""
+    if engine == RenderEngine.FFMPEG:
+        return render_comments_with_ffmpeg(template_path, comments, lang="en-US", voice="en-US-Standard-D",
+                                           output_dir=output_dir, encoding_profile=encoding_profile)
+
+    source_video = open_video_clip(template_path, audio=False)
+    try:
+        video = add_cards_to_video(source_video, comments)
+        video = video.set_duration(min(source_video.duration, comments[-1].start_time + comments[-1].duration))
+        audio_samples = mix_comments_audio(comments, lang="en-US", voice="en-US-Standard-D",
+                                           duration=video.duration, video_path=template_path)
+        return write_videofile(video, output_dir, encoding_profile=encoding_profile, audio_samples=audio_samples)
+    finally:
+        source_video.close()
+
+
+def main():
+    """Render a synthetic job under each encoding profile and report encode fps, output size and wall time."""
+    parser = argparse.ArgumentParser(description='Benchmark the encoding profiles on a synthetic job.')
+    parser.add_argument('--profiles', nargs='+', help='Profiles to benchmark, defaults to all ENCODING_PROFILES')
+    parser.add_argument('--engines', nargs='+', choices=[engine.value for engine in RenderEngine],
+                        default=[engine.value for engine in RenderEngine], help='Render engines to benchmark')
+    parser.add_argument('--width', type=int, default=720, help='Width of the synthetic template')
+    parser.add_argument('--height', type=int, default=1280, help='Height of the synthetic template')
+    parser.add_argument('--fps', type=int, default=30, help='Frame rate of the synthetic template')
+    parser.add_argument('--duration', type=float, default=30, help='Duration of the synthetic job in seconds')
+    parser.add_argument('--keep', action='store_true', help='Keep the rendered videos')
+    args = parser.parse_args()
+
+    profiles = [get_encoding_profile(name) for name in (args.profiles or settings.ENCODING_PROFILES)]
+    work_dir = tempfile.mkdtemp(prefix="benchmark_", dir=settings.CACHE_DIR)
+    print(f"Work directory: {work_dir}")
+
+    try:
+        template_path, comments = make_synthetic_job(work_dir, args.width, args.height, args.fps, args.duration)
+        duration = comments[-1].start_time + comments[-1].duration
+
+        # Warm the card cache so every run measures the same work
+        render_cards(comments, args.width)
+
+        print(f"{'engine':<8} {'profile':<10} {'preset':<10} {'crf':>4} {'wall s':>8} {'enc fps':>8} "
+              f"{'size MB':>8} {'kbit/s':>8}")
+        for engine in args.engines:
+            for profile in profiles:
+                start = time.perf_counter()
+                output_path = render(RenderEngine(engine), template_path, comments, profile, work_dir)
+                wall_time = time.perf_counter() - start
+
+                frames = duration * (profile.fps or args.fps)
+                size = os.path.getsize(output_path)
+                print(f"{engine:<8} {profile.name:<10} {profile.preset:<10} {profile.crf:>4} {wall_time:>8.2f} "
+                      f"{frames / wall_time:>8.1f} {size / 1024 / 1024:>8.2f} {size * 8 / 1000 / duration:>8.0f}")
+    finally:
+        if args.keep:
+            print(f"Rendered videos kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,9 @@ from moviepy.editor import VideoFileClip
 
 from app.api.dto.reddit_dto import Comment
 from app.core.config import settings
+from app.utils.audio_mix import mix_comments_audio
 from app.utils.comment_audio_generator import generate_comments_with_duration
-from app.utils.reddit_comment_overlay import add_comments_to_video, write_videofile
+from app.utils.reddit_comment_overlay import add_cards_to_video, write_videofile
 from app.utils.trim_video import trim_video_to_fit_comments
 
 
@@ -153,9 +154,11 @@ if __name__ == '__main__':
     # Create the overlay processor
     video = VideoFileClip(INPUT_VIDEO)
     comments = generate_comments()
-    video = add_comments_to_video(video, comments)
+    video = add_cards_to_video(video, comments)
     video = trim_video_to_fit_comments(video, comments)
-    output_path = write_videofile(video, OUTPUT_VIDEO)
+    audio_samples = mix_comments_audio(comments, lang="en-US", voice="en-US-Standard-D", duration=video.duration,
+                                       video_path=INPUT_VIDEO if video.audio else None)
+    output_path = write_videofile(video, OUTPUT_VIDEO, audio_samples=audio_samples)
     print(f"Video successfully created at: {output_path}")
 
     # Clean up resources
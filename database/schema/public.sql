@@ -1,6 +1,10 @@
 /**
  * table: job_add_reddit_comment_overlay
  * columns: id, job_code (unique), status, video_name, output_path, comment_ids (json list), comments (json list), error_message, created_at, updated_at
+ * render_hash: hash of the render inputs, unique among the jobs that have not failed
+ * worker_id, started_at: worker processing the job and when it claimed it
+ * claimed_from: 'redis' or 'postgres', the queue the job was claimed from
+ * retries: times the job was reset after its worker stopped, when claimed from postgres
  */
 CREATE TABLE job_add_reddit_comment_overlay (
     id SERIAL PRIMARY KEY,
@@ -14,9 +18,21 @@ CREATE TABLE job_add_reddit_comment_overlay (
     ratio VARCHAR(255),
     theme VARCHAR(255),
     post_title VARCHAR(255),
+    render_engine VARCHAR(255),
+    encoding_profile VARCHAR(255),
+    render_hash VARCHAR(64),
+    worker_id VARCHAR(255),
+    started_at TIMESTAMP WITH TIME ZONE,
+    claimed_from VARCHAR(16),
+    retries INTEGER NOT NULL DEFAULT 0,
     comments JSONB NOT NULL DEFAULT '[]',
     error_message TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Identical submissions attach to the job already rendering or rendered
+CREATE UNIQUE INDEX job_render_hash_active ON job_add_reddit_comment_overlay (render_hash) WHERE status <> 'failed';
+
+-- Claims of the oldest pending job, when Postgres serves as the queue
+CREATE INDEX job_pending_created_at ON job_add_reddit_comment_overlay (created_at) WHERE status = 'pending';
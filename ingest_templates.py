@@ -0,0 +1,25 @@
+import argparse
+import logging
+
+from app.utils.template_ingest import ingest_templates
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ingest_templates")
+
+
+def main():
+    """Transcode every video template into its mezzanine and keyframe index."""
+    parser = argparse.ArgumentParser(description='Transcode video templates into decode-friendly mezzanine files.')
+    parser.add_argument('--templates-dir', help='Directory of the templates, defaults to VIDEO_TEMPLATES_DIR')
+    parser.add_argument('--force', action='store_true', help='Transcode templates that are already up to date')
+    args = parser.parse_args()
+
+    result = ingest_templates(templates_dir=args.templates_dir, force=args.force)
+    logger.info(f"Ingest complete: {result['ingested']} ingested, {result['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
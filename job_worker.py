@@ -3,13 +3,20 @@ import asyncio
 import logging
 import signal
 import sys
+from typing import Optional
 
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
 from sqlalchemy import text
 
 from app.core.config import settings
-from app.db.redis import get_redis
-from app.db.session import get_db
+from app.core.executor import run_blocking, shutdown_blocking_executor, shutdown_render_pool, start_render_pool
+from app.core.loop_monitor import start_loop_monitor
+from app.db.session import close_db_connections, get_db
+from app.services.job_queue import ReliableJobQueue, get_job_queue
 from app.services.video_service import VideoService
+from app.services.worker_stats import SlotUtilization
+from app.utils.cache_manager import get_cache_manager, maintain_cache
+from app.utils.worker_sizing import get_ffmpeg_threads, get_worker_slots
 
 # Configure logging
 logging.basicConfig(
@@ -23,53 +30,251 @@ logging.basicConfig(
 logger = logging.getLogger('job_worker')
 
 
-async def start_video_worker():
-    """Worker process that processes video jobs from Redis queue"""
-    logger.info("Starting video processing worker...")
+async def heartbeat(job_queue: ReliableJobQueue, running_jobs: dict, utilization: SlotUtilization):
+    """Renew the leases of the running jobs and report slot utilization until cancelled"""
+    while True:
+        try:
+            await job_queue.heartbeat([job_code for job_code, from_redis in running_jobs.items() if from_redis])
+        except Exception as e:
+            logger.error(f"Heartbeat failed: {str(e)}")
+        try:
+            # Also in Postgres, which is the only lease of the jobs claimed while Redis was unavailable
+            if running_jobs:
+                async with get_db() as db_session:
+                    await db_session.execute(
+                        text("""
+                        UPDATE job_add_reddit_comment_overlay SET updated_at = NOW()
+                        WHERE job_code = ANY(:job_codes) AND status = 'processing'
+                        """),
+                        {"job_codes": list(running_jobs)}
+                    )
+                    await db_session.commit()
+        except Exception as e:
+            logger.error(f"Database heartbeat failed: {str(e)}")
+        await utilization.publish(job_queue.worker_id)
+        await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
 
-    video_service = VideoService(
-        output_dir=settings.OUTPUT_DIR,
-        video_templates_dir=settings.VIDEO_TEMPLATES_DIR
-    )
 
+async def release_job(job_code: str, worker_id: str, dead_letter: bool):
+    """Make a job of a lost worker claimable again, or fail it once it used its retries"""
+    async with get_db() as db_session:
+        # Only while the lost worker still owns the job, a row claimed again in between is left alone
+        if dead_letter:
+            await db_session.execute(
+                text("""
+                UPDATE job_add_reddit_comment_overlay
+                SET status = 'failed', error_message = :error
+                WHERE job_code = :job_code AND status = 'processing' AND worker_id = :worker_id
+                """),
+                {"job_code": job_code, "worker_id": worker_id,
+                 "error": f"Worker lost the job {settings.JOB_MAX_RETRIES + 1} times"}
+            )
+        else:
+            # The worker only picks up pending jobs
+            await db_session.execute(
+                text("""
+                UPDATE job_add_reddit_comment_overlay SET status = 'pending', worker_id = NULL
+                WHERE job_code = :job_code AND status = 'processing' AND worker_id = :worker_id
+                """),
+                {"job_code": job_code, "worker_id": worker_id}
+            )
+        await db_session.commit()
+
+
+async def reap_expired_jobs(job_queue: ReliableJobQueue):
+    """Requeue the jobs of crashed workers and reset their status, until cancelled"""
     while True:
         try:
-            # Get Redis connection
-            async with get_redis() as redis_client:
-                # BRPOP blocks until a job is available, timeout=0 means block indefinitely
-                result = await redis_client.brpop("video_processing_queue", timeout=0)
-
-                if result:
-                    # Extract job code from result tuple (key, value)
-                    _, job_code = result
-
-                    logger.info(f"Received job code: {job_code} from queue")
-
-                    # Get job details from database
-                    async with get_db() as db_session:
-                        query = """
-                        SELECT * FROM job_add_reddit_comment_overlay
-                        WHERE job_code = :job_code AND status = 'pending'
-                        """
-                        result = await db_session.execute(text(query), {"job_code": job_code})
-
-                        job = result.fetchone()
-                        if job:
-                            job_dict = dict(zip(result.keys(), job))
-                            # Process the job
-                            await video_service.process_video_job(job_dict)
-                        else:
-                            logger.warning(f"Job {job_code} not found or not in pending status")
+            # The records are released before the jobs go back to the queue
+            await job_queue.reap(release_job)
+        except Exception as e:
+            logger.error(f"Error reaping expired jobs: {str(e)}", exc_info=True)
+
+        try:
+            await reset_stale_jobs(job_queue)
+        except Exception as e:
+            logger.error(f"Error resetting stale jobs: {str(e)}", exc_info=True)
+        await asyncio.sleep(settings.JOB_REAP_INTERVAL_SECONDS)
+
+
+async def reset_stale_jobs(job_queue: ReliableJobQueue):
+    """
+    Put back to pending the jobs claimed from Postgres whose worker stopped its database heartbeat
+
+    Jobs claimed from Redis are left to the Redis reaper. A job reset more than
+    JOB_MAX_RETRIES times is failed instead.
+    """
+    async with get_db() as db_session:
+        result = await db_session.execute(
+            text("""
+            UPDATE job_add_reddit_comment_overlay
+            SET status = CASE WHEN retries >= :max_retries THEN 'failed' ELSE 'pending' END,
+                error_message = CASE WHEN retries >= :max_retries THEN :error ELSE error_message END,
+                retries = retries + 1,
+                worker_id = NULL
+            WHERE status = 'processing' AND claimed_from = 'postgres'
+                AND updated_at < NOW() - make_interval(secs => :lease_seconds)
+            RETURNING job_code, status
+            """),
+            {"lease_seconds": settings.JOB_LEASE_SECONDS, "max_retries": settings.JOB_MAX_RETRIES,
+             "error": f"Worker stopped {settings.JOB_MAX_RETRIES + 1} times"}
+        )
+        stale_jobs = result.fetchall()
+        await db_session.commit()
+
+    for job_code, status in stale_jobs:
+        if status == "failed":
+            logger.error(f"Failed stale job {job_code} after {settings.JOB_MAX_RETRIES} retries")
+            continue
+        logger.warning(f"Reset stale job {job_code} to pending")
+        try:
+            # A job whose entry is still queued would be claimed twice
+            if not await job_queue.is_tracked(job_code):
+                await job_queue.enqueue(job_code)
+        except Exception:
+            # Claimed from Postgres by the next worker polling it
+            pass
+
+
+async def claim_next_job(job_queue: ReliableJobQueue, video_service: VideoService,
+                         running_jobs: dict) -> Optional[dict]:
+    """Claim a job from the Redis queue, or from Postgres while Redis is unavailable"""
+    try:
+        # Moves the job to the processing list of this worker, so it is requeued if the worker dies
+        job_code = await job_queue.claim()
+    except (RedisConnectionError, RedisTimeoutError, OSError) as e:
+        logger.warning(f"Redis unavailable, claiming from Postgres: {str(e)}")
+        job = await video_service.claim_job(None, job_queue.worker_id)
+        if job:
+            running_jobs[job["job_code"]] = False
+        else:
+            await asyncio.sleep(settings.JOB_FALLBACK_POLL_SECONDS)
+        return job
+
+    if not job_code:
+        return None
+
+    # The lease is renewed from the claim until the render stage acknowledges the job
+    running_jobs[job_code] = True
+    try:
+        job = await video_service.claim_job(job_code, job_queue.worker_id, claimed_from="redis")
+    except Exception:
+        # Left unacknowledged, the reaper requeues the job once its lease expires
+        running_jobs.pop(job_code, None)
+        raise
+    if not job:
+        # A duplicate entry, or a job already finished: dropped without touching its retry count
+        logger.warning(f"Job {job_code} not found or not in pending status")
+        await finish_job(job_queue, running_jobs, job_code, processed=False)
+    return job
+
+
+async def finish_job(job_queue: ReliableJobQueue, running_jobs: dict, job_code: str, processed=True):
+    """Stop renewing the lease of a job and acknowledge it when it came from Redis"""
+    if running_jobs.pop(job_code, False):
+        await job_queue.ack(job_code, processed=processed)
+
+
+async def run_prepare_stage(index: int, job_queue: ReliableJobQueue, video_service: VideoService,
+                            prepared_jobs: asyncio.Queue, running_jobs: dict):
+    """Prepare stage: claim a job, translate and synthesize it, hand it to the render stage, repeat until cancelled"""
+    while True:
+        try:
+            job = await claim_next_job(job_queue, video_service, running_jobs)
+            if not job:
+                continue
+
+            logger.info(f"Preparer {index} preparing job {job['job_code']}")
+            # Failures are recorded on the job itself
+            prepared_job = await video_service.prepare_video_job(job)
+            if prepared_job is None:
+                await finish_job(job_queue, running_jobs, job["job_code"])
+                continue
+
+            # Blocks while the render stage is WORKER_PREPARED_JOBS jobs behind, so no job is claimed too early
+            await prepared_jobs.put(prepared_job)
 
         except asyncio.CancelledError:
-            logger.info("Worker shutting down...")
+            logger.info(f"Preparer {index} shutting down...")
             break
         except Exception as e:
-            logger.error(f"Error in video worker: {str(e)}", exc_info=True)
+            logger.error(f"Error in preparer {index}: {str(e)}", exc_info=True)
             # Wait before retrying to avoid tight error loops
             await asyncio.sleep(5)
 
-async def process_pending_jobs():
+
+async def run_render_stage(slot: int, job_queue: ReliableJobQueue, video_service: VideoService,
+                           prepared_jobs: asyncio.Queue, running_jobs: dict, utilization: SlotUtilization):
+    """Render stage: encode the next prepared job in a render process, repeat until cancelled"""
+    while True:
+        try:
+            prepared_job = await prepared_jobs.get()
+            job_code = prepared_job.job_code
+            logger.info(f"Slot {slot} rendering job {job_code}")
+
+            utilization.job_started()
+            try:
+                # Failures are recorded on the job itself
+                await video_service.render_prepared_job(prepared_job)
+            finally:
+                utilization.job_finished()
+                prepared_jobs.task_done()
+
+            await finish_job(job_queue, running_jobs, job_code)
+
+        except asyncio.CancelledError:
+            logger.info(f"Slot {slot} shutting down...")
+            break
+        except Exception as e:
+            logger.error(f"Error in slot {slot}: {str(e)}", exc_info=True)
+            # Wait before retrying to avoid tight error loops
+            await asyncio.sleep(5)
+
+
+async def start_video_worker(job_queue: ReliableJobQueue):
+    """
+    Worker process that processes video jobs from the Redis queue as a two-stage pipeline
+
+    Preparers do the network-bound work of the next jobs (translation, speech, cards)
+    while the render slots encode, so a freed slot starts on a job that is ready.
+    """
+    slots = get_worker_slots()
+    ffmpeg_threads = get_ffmpeg_threads(slots)
+    preparers = settings.WORKER_PREPARE_CONCURRENCY or slots
+    logger.info(f"Starting video processing worker {job_queue.worker_id} with {preparers} preparers and "
+                f"{slots} render slots of {ffmpeg_threads} encoder threads...")
+
+    video_service = VideoService(
+        output_dir=settings.OUTPUT_DIR,
+        video_templates_dir=settings.VIDEO_TEMPLATES_DIR
+    )
+
+    # Each slot renders in a process of its own, the loop only waits on them
+    start_render_pool(slots, ffmpeg_threads)
+    prepared_jobs = asyncio.Queue(maxsize=settings.WORKER_PREPARED_JOBS or slots)
+    # Code of each job between claim and acknowledgement, True when it was claimed from Redis
+    running_jobs = {}
+    utilization = SlotUtilization(slots, ffmpeg_threads)
+    background_tasks = [
+        asyncio.create_task(heartbeat(job_queue, running_jobs, utilization)),
+        asyncio.create_task(reap_expired_jobs(job_queue)),
+    ]
+
+    try:
+        await asyncio.gather(
+            *(run_prepare_stage(index, job_queue, video_service, prepared_jobs, running_jobs)
+              for index in range(preparers)),
+            *(run_render_stage(slot, job_queue, video_service, prepared_jobs, running_jobs, utilization)
+              for slot in range(slots)),
+        )
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        shutdown_render_pool()
+
+
+async def process_pending_jobs(job_queue: ReliableJobQueue):
     """Process any pending jobs that might have been missed"""
     logger.info("Checking for pending jobs...")
 
@@ -89,12 +294,11 @@ async def process_pending_jobs():
 
             if pending_jobs:
                 logger.info(f"Found {len(pending_jobs)} pending jobs to process")
-                async with get_redis() as redis_client:
-                    for job in pending_jobs:
-                        job_code = job[0]
-                        # Add job back to the queue
-                        await redis_client.lpush("video_processing_queue", job_code)
-                        logger.info(f"Re-queued pending job {job_code}")
+                for job in pending_jobs:
+                    job_code = job[0]
+                    # Add job back to the queue
+                    await job_queue.enqueue(job_code)
+                    logger.info(f"Re-queued pending job {job_code}")
             else:
                 logger.info("No pending jobs found")
 
@@ -127,14 +331,27 @@ async def main():
             sig, lambda s=sig: asyncio.create_task(shutdown(s, loop))
         )
 
+    # Stalls of the worker loop delay Redis heartbeats and status updates
+    loop_monitor = start_loop_monitor("worker")
+
+    # Clean up after jobs that died with the previous worker, then bring the cache under its budget
+    await run_blocking(get_cache_manager().sweep_temp_files)
+    await run_blocking(maintain_cache)
+
+    job_queue = get_job_queue()
+
     # Check for existing pending jobs before starting
-    await process_pending_jobs()
+    await process_pending_jobs(job_queue)
 
     # Start the worker process
     try:
         logger.info("Video processing worker starting up...")
-        await start_video_worker()
+        await start_video_worker(job_queue)
     finally:
+        if loop_monitor:
+            await loop_monitor.stop()
+        shutdown_blocking_executor()
+        await close_db_connections()
         logger.info("Worker stopped")
 
 
@@ -0,0 +1,48 @@
+import math
+
+from app.utils.comment_packing import comment_weight, pack_comments
+
+
+def used_time(durations, picked, pause_time=1.0):
+    return sum(durations[i] for i in picked) + pause_time * (len(picked) - 1)
+
+
+def test_everything_is_picked_when_it_fits():
+    assert pack_comments([2.0, 3.0, 1.0], [1.0, 1.0, 1.0], capacity=10.0) == [0, 1, 2]
+
+
+def test_over_budget_set_keeps_the_most_valuable_comments_that_fit():
+    durations = [4.0, 4.0, 4.0]
+
+    picked = pack_comments(durations, [1.0, 3.0, 2.0], capacity=9.0)
+
+    assert picked == [1, 2]
+    assert used_time(durations, picked) <= 9.0
+
+
+def test_over_budget_set_prefers_filling_the_capacity():
+    # The long comment alone is worth less than the two short ones together
+    durations = [6.0, 3.0, 3.0, 8.0]
+
+    picked = pack_comments(durations, [1.0, 1.0, 1.0, 1.0], capacity=8.0)
+
+    assert picked == [3]
+    picked = pack_comments(durations, [1.0, 1.5, 1.5, 1.0], capacity=8.0)
+    assert picked == [1, 2]
+    assert used_time(durations, picked) <= 8.0
+
+
+def test_comment_longer_than_the_capacity_is_never_picked():
+    assert pack_comments([30.0, 2.0], [10.0, 1.0], capacity=5.0) == [1]
+
+
+def test_nothing_is_picked_without_capacity_or_comments():
+    assert pack_comments([1.0], [1.0], capacity=0.0, pause_time=0.0) == []
+    assert pack_comments([], [], capacity=10.0) == []
+
+
+def test_weight_grows_with_the_log_of_upvotes():
+    assert comment_weight(0) == 1.0
+    assert comment_weight(None) == 1.0
+    assert comment_weight(-5) == 1.0
+    assert comment_weight(99) == 1.0 + math.log(100)
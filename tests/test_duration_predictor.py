@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.utils.duration_predictor import DurationPredictor
+
+MIN_SAMPLES = settings.DURATION_PREDICTOR_MIN_SAMPLES
+
+
+def speech_duration(text):
+    """Duration of a voice reading 0.05 s per character and 0.1 s per word, plus 0.3 s."""
+    return 0.05 * len(text) + 0.1 * len(text.split()) + 0.3
+
+
+def training_texts(count):
+    return [" ".join(["word"] * (i + 1)) + "!" * i for i in range(count)]
+
+
+def test_voice_with_too_few_samples_uses_the_default_rate(tmp_path):
+    predictor = DurationPredictor(cache_dir=tmp_path)
+    for text in training_texts(MIN_SAMPLES - 1):
+        predictor.observe("en-US", "voice", text, speech_duration(text))
+
+    text = "a" * 30
+    assert predictor.samples("en-US", "voice") == MIN_SAMPLES - 1
+    assert predictor.predict("en-US", "voice", text) == pytest.approx(30 / settings.TTS_DEFAULT_CHARS_PER_SECOND)
+    assert predictor.predict("en-US", "voice", text, speaking_rate=2.0) == pytest.approx(
+        30 / (settings.TTS_DEFAULT_CHARS_PER_SECOND * 2.0))
+
+
+def test_calibrated_voice_uses_its_model(tmp_path):
+    predictor = DurationPredictor(cache_dir=tmp_path)
+    for text in training_texts(MIN_SAMPLES):
+        predictor.observe("en-US", "voice", text, speech_duration(text))
+
+    text = "a new sentence of seven words here"
+    assert predictor.predict("en-US", "voice", text) == pytest.approx(speech_duration(text), rel=0.01)
+
+
+def test_models_are_kept_per_voice_and_speaking_rate(tmp_path):
+    predictor = DurationPredictor(cache_dir=tmp_path)
+    for text in training_texts(MIN_SAMPLES):
+        predictor.observe("en-US", "voice", text, speech_duration(text))
+
+    assert predictor.samples("en-US", "other-voice") == 0
+    assert predictor.samples("en-US", "voice", speaking_rate=1.5) == 0
+
+
+def test_prediction_is_never_below_a_tenth_of_a_second(tmp_path):
+    assert DurationPredictor(cache_dir=tmp_path).predict("en-US", "voice", "") == 0.1
+
+
+def test_single_text_clips_of_the_cache_calibrate_the_model(tmp_path):
+    for index, text in enumerate(training_texts(MIN_SAMPLES)):
+        info = {"language_code": "en-US", "voice_name": "voice", "chars": len(text), "words": len(text.split()),
+                "duration": speech_duration(text)}
+        (tmp_path / f"tts_{index}.json").write_text(json.dumps(info))
+    # Job-wide SSML clips and other files are ignored
+    (tmp_path / "tts_ssml.json").write_text(json.dumps({"language_code": "en-US", "voice_name": "voice",
+                                                         "chars": 1, "words": 1, "duration": 99, "marks": {}}))
+    (tmp_path / "tts_broken.json").write_text("{")
+    (tmp_path / "other.json").write_text("{}")
+
+    predictor = DurationPredictor(cache_dir=tmp_path)
+
+    text = "a new sentence of seven words here"
+    assert predictor.predict("en-US", "voice", text) == pytest.approx(speech_duration(text), rel=0.01)
+    assert predictor.samples("en-US", "voice") == MIN_SAMPLES
@@ -0,0 +1,87 @@
+import pytest
+
+from app.utils.mp3_info import parse_mp3_info, read_mp3_info
+
+# MPEG-1 Layer III bitrate indexes
+KBPS_INDEX = {64: 5, 128: 9, 320: 14}
+
+
+def mpeg1_frame(kbps=128, mono=False, payload=b""):
+    """An MPEG-1 Layer III frame at 44.1 kHz, its payload zero padded to the frame length."""
+    header = bytes([0xFF, 0xFB, KBPS_INDEX[kbps] << 4, 0xC0 if mono else 0x00])
+    length = 144 * kbps * 1000 // 44100
+    return (header + payload).ljust(length, b"\0")
+
+
+def info_frame(frames, delay, padding, tag=b"Xing"):
+    """A Xing/Info frame with the frame count flag and a LAME tag carrying the encoder gap."""
+    gap = (delay << 12) | padding
+    lame = b"LAME3.100".ljust(21, b"\0") + gap.to_bytes(3, "big")
+    # Side information of a stereo MPEG-1 frame comes before the tag
+    return mpeg1_frame(payload=b"\0" * 32 + tag + (1).to_bytes(4, "big") + frames.to_bytes(4, "big") + lame)
+
+
+def id3v2_tag(body):
+    size = len(body)
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x04\x00\x00" + syncsafe + body
+
+
+def test_constant_bitrate_duration():
+    info = parse_mp3_info(mpeg1_frame() * 100)
+
+    assert info["duration"] == pytest.approx(100 * 1152 / 44100)
+    assert info["sample_rate"] == 44100
+    assert info["channels"] == 2
+
+
+def test_variable_bitrate_frames_are_counted_by_samples():
+    data = (mpeg1_frame(64) + mpeg1_frame(320) + mpeg1_frame(128)) * 10
+
+    assert parse_mp3_info(data)["duration"] == pytest.approx(30 * 1152 / 44100)
+
+
+@pytest.mark.parametrize("tag", [b"Xing", b"Info"])
+def test_info_frame_is_not_played_and_the_encoder_gap_is_removed(tag):
+    data = info_frame(50, delay=576, padding=1000, tag=tag) + mpeg1_frame(320) * 20 + mpeg1_frame(64) * 30
+
+    assert parse_mp3_info(data)["duration"] == pytest.approx((50 * 1152 - 576 - 1000) / 44100)
+
+
+def test_id3_tags_are_skipped():
+    # Sync bytes inside the tags must not be taken for frames
+    id3v2 = id3v2_tag(b"\xff\xfb\x90\x00" * 8)
+    id3v1 = b"TAG" + b"\xff\xfb\x90\x00" * 31 + b"\0"
+    data = id3v2 + mpeg1_frame(mono=True) * 40 + id3v1
+
+    info = parse_mp3_info(data)
+    assert info["duration"] == pytest.approx(40 * 1152 / 44100)
+    assert info["channels"] == 1
+    assert info["bytes"] == len(data)
+
+
+def test_garbage_between_frames_is_skipped():
+    data = mpeg1_frame() * 5 + b"\x00\x12\x34" + mpeg1_frame() * 5
+
+    assert parse_mp3_info(data)["duration"] == pytest.approx(10 * 1152 / 44100)
+
+
+def test_mpeg2_frames():
+    # MPEG-2 Layer III, 64 kbit/s, 24 kHz: 576 samples in 192 bytes
+    frame = bytes([0xFF, 0xF3, 0x84, 0x00]).ljust(192, b"\0")
+
+    info = parse_mp3_info(frame * 25)
+    assert info["sample_rate"] == 24000
+    assert info["duration"] == pytest.approx(25 * 576 / 24000)
+
+
+def test_data_without_frames_is_rejected():
+    with pytest.raises(ValueError):
+        parse_mp3_info(b"\0" * 1000)
+
+
+def test_read_mp3_info_reads_the_file(tmp_path):
+    path = tmp_path / "clip.mp3"
+    path.write_bytes(mpeg1_frame() * 10)
+
+    assert read_mp3_info(str(path))["duration"] == pytest.approx(10 * 1152 / 44100)
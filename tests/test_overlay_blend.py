@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from app.utils.overlay_blend import CardLayer
+
+
+def card(color, alpha, width=4, height=3):
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    rgba[:, :, :3] = color
+    rgba[:, :, 3] = alpha
+    return rgba
+
+
+def frame(color=(100, 150, 200), width=10, height=8):
+    rgb = np.empty((height, width, 3), dtype=np.uint8)
+    rgb[:, :] = color
+    return rgb
+
+
+def test_transparent_card_leaves_the_frame_untouched():
+    target = frame()
+    CardLayer(card((255, 0, 0), 0), (2, 2), start=0, duration=1).blend_into(target)
+
+    assert (target == frame()).all()
+
+
+def test_opaque_card_replaces_the_pixels_it_covers():
+    target = frame()
+    CardLayer(card((255, 0, 0), 255), (2, 1), start=0, duration=1).blend_into(target)
+
+    assert (target[1:4, 2:6] == [255, 0, 0]).all()
+    untouched = np.ones(target.shape[:2], dtype=bool)
+    untouched[1:4, 2:6] = False
+    assert (target[untouched] == [100, 150, 200]).all()
+
+
+def test_half_transparent_card_rounds_the_blend():
+    target = frame((0, 0, 0))
+    CardLayer(card((255, 255, 255), 128), (0, 0), start=0, duration=1).blend_into(target)
+
+    # 255 * 128 / 255 is exactly 128
+    assert (target[:3, :4] == 128).all()
+
+
+@pytest.mark.parametrize("position, covered", [
+    ((-2, -1), (slice(0, 2), slice(0, 2))),  # Top left corner
+    ((8, 6), (slice(6, 8), slice(8, 10))),  # Bottom right corner
+])
+def test_card_is_clipped_at_the_frame_edge(position, covered):
+    target = frame()
+    CardLayer(card((0, 255, 0), 255), position, start=0, duration=1).blend_into(target)
+
+    assert (target[covered] == [0, 255, 0]).all()
+    assert (target == [0, 255, 0]).all(axis=2).sum() == 4
+
+
+def test_card_outside_the_frame_is_skipped():
+    target = frame()
+    CardLayer(card((0, 255, 0), 255), (20, 20), start=0, duration=1).blend_into(target)
+
+    assert (target == frame()).all()
+
+
+def test_card_must_be_rgba():
+    with pytest.raises(ValueError):
+        CardLayer(np.zeros((2, 2, 3), dtype=np.uint8), (0, 0), start=0, duration=1)
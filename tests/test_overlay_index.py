@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import numpy as np
+from moviepy.editor import ColorClip
+
+from app.utils.overlay_blend import CardLayer
+from app.utils.overlay_index import IndexedCompositeVideoClip, OverlayIndex
+
+
+def overlay(name, start, end):
+    return SimpleNamespace(name=name, start=start, end=end)
+
+
+def names(overlays):
+    return [o.name for o in overlays]
+
+
+def test_empty_timeline_has_no_active_overlay():
+    index = OverlayIndex([])
+
+    assert index.boundaries == []
+    assert index.active_at(0.0) == ()
+    assert index.active_at(10.0) == ()
+
+
+def test_overlay_is_active_from_its_start_until_before_its_end():
+    index = OverlayIndex([overlay("a", 1.0, 3.0)])
+
+    assert index.active_at(0.999) == ()
+    assert names(index.active_at(1.0)) == ["a"]
+    assert names(index.active_at(2.999)) == ["a"]
+    assert index.active_at(3.0) == ()
+
+
+def test_cards_touching_at_a_boundary_never_overlap():
+    index = OverlayIndex([overlay("a", 0.0, 2.0), overlay("b", 2.0, 4.0)])
+
+    assert names(index.active_at(1.999)) == ["a"]
+    assert names(index.active_at(2.0)) == ["b"]
+    assert names(index.active_at(4.0)) == []
+
+
+def test_overlapping_overlays_keep_their_layer_order():
+    index = OverlayIndex([overlay("bottom", 0.0, 5.0), overlay("top", 1.0, 2.0)])
+
+    assert names(index.active_at(1.5)) == ["bottom", "top"]
+    assert names(index.active_at(2.5)) == ["bottom"]
+
+
+def test_composite_without_layers_returns_the_background_frame():
+    background = ColorClip((8, 6), color=(10, 20, 30), duration=1.0).set_fps(10)
+    clip = IndexedCompositeVideoClip(background, [])
+
+    assert clip.duration == 1.0
+    assert (clip.get_frame(0.5) == [10, 20, 30]).all()
+
+
+def test_composite_blends_only_the_active_cards():
+    background = ColorClip((8, 6), color=(0, 0, 0), duration=2.0).set_fps(10)
+    card = np.zeros((2, 2, 4), dtype=np.uint8)
+    card[:, :] = (255, 255, 255, 255)
+    clip = IndexedCompositeVideoClip(background, [CardLayer(card, (0, 0), start=1.0, duration=0.5)])
+
+    assert clip.get_frame(0.5).max() == 0
+    frame = clip.get_frame(1.2)
+    assert (frame[:2, :2] == 255).all()
+    assert frame[2:].max() == 0
@@ -0,0 +1,60 @@
+from app.api.dto.reddit_dto import Comment
+from app.core.config import settings
+from app.enum.render import RenderEngine
+from app.enum.voice import Language
+from app.utils.render_hash import compute_render_hash
+
+COMMENTS = [Comment(username="alice", text="First!", upvote=10), Comment(username="bob", text="Second", upvote=3)]
+
+
+def render_hash(**overrides):
+    inputs = dict(video_name="template.mp4", comments=COMMENTS, title="A post", voice_id="en-US-Standard-D",
+                  language="en-US")
+    inputs.update(overrides)
+    return compute_render_hash(**inputs)
+
+
+def test_hash_is_a_stable_sha256():
+    value = render_hash()
+
+    assert len(value) == 64
+    assert value == render_hash()
+    assert value == render_hash(comments=[comment.model_copy() for comment in COMMENTS])
+
+
+def test_unset_options_hash_like_their_server_defaults():
+    assert render_hash() == render_hash(render_engine=settings.RENDER_ENGINE)
+    assert render_hash() == render_hash(encoding_profile=settings.DEFAULT_ENCODING_PROFILE)
+    assert render_hash(title="") == render_hash(title=None)
+
+
+def test_enum_members_hash_like_their_values():
+    assert render_hash(language=Language.English) == render_hash(language="en-US")
+    assert render_hash(render_engine=RenderEngine.FFMPEG) == render_hash(render_engine="ffmpeg")
+
+
+def test_timing_set_during_processing_does_not_change_the_hash():
+    timed = [comment.model_copy(update={"start_time": 4.0, "duration": 2.5, "audio_path": "/tmp/a.mp3"})
+             for comment in COMMENTS]
+
+    assert render_hash(comments=timed) == render_hash()
+
+
+def test_every_render_input_changes_the_hash():
+    baseline = render_hash()
+    changed = [
+        render_hash(video_name="other.mp4"),
+        render_hash(comments=COMMENTS[::-1]),
+        render_hash(comments=[COMMENTS[0].model_copy(update={"text": "Edited"}), COMMENTS[1]]),
+        render_hash(title="Another post"),
+        render_hash(voice_id="en-US-Standard-A"),
+        render_hash(language="fr-FR"),
+        render_hash(vid_len=60),
+        render_hash(ratio="16:9"),
+        render_hash(theme="light"),
+        render_hash(render_engine="ffmpeg" if settings.RENDER_ENGINE == RenderEngine.MOVIEPY else "moviepy"),
+        render_hash(encoding_profile="draft"),
+    ]
+
+    assert baseline not in changed
+    assert len(set(changed)) == len(changed)
@@ -0,0 +1,31 @@
+import pytest
+
+from app.core.config import settings
+from app.utils.segment_render import get_segment_count, plan_segments
+
+
+@pytest.fixture
+def slot_of_4_cpus(monkeypatch):
+    monkeypatch.setattr(settings, "FFMPEG_THREADS", 4)
+
+
+@pytest.mark.parametrize("render_segments, expected", [(0, 4), (1, 1), (3, 3), (16, 4)])
+def test_segment_count_is_capped_at_the_cpus_of_the_slot(monkeypatch, slot_of_4_cpus, render_segments,
+                                                         expected):
+    monkeypatch.setattr(settings, "RENDER_SEGMENTS", render_segments)
+
+    assert get_segment_count() == expected
+
+
+def test_segments_start_on_the_keyframes_closest_to_an_even_split():
+    assert plan_segments(12.0, [0.0, 2.0, 4.5, 6.5, 8.0, 10.0], 3) == [(0.0, 4.5), (4.5, 8.0), (8.0, 12.0)]
+
+
+def test_segments_are_never_shorter_than_the_minimum():
+    segments = plan_segments(10.0, [0.0, 1.0, 2.0, 5.0, 9.0], 4, min_segment_duration=4.0)
+
+    assert segments == [(0.0, 5.0), (5.0, 10.0)]
+
+
+def test_timeline_without_keyframes_is_one_segment():
+    assert plan_segments(10.0, [], 4) == [(0.0, 10.0)]
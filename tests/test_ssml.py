@@ -0,0 +1,59 @@
+from app.utils.ssml import build_ssml_chunks, end_mark, start_mark
+
+
+def document_size(texts, pause_time=1.0):
+    """Size in bytes of the single document reading all the texts."""
+    (ssml, _), = build_ssml_chunks(texts, pause_time, max_bytes=10 ** 6)
+    return len(ssml.encode())
+
+
+def test_marks_surround_each_text_with_breaks_between_them():
+    (ssml, indices), = build_ssml_chunks(["one", "two"], pause_time=0.5)
+
+    assert indices == [0, 1]
+    assert ssml == ('<speak><mark name="s0"/>one<mark name="e0"/><break time="500ms"/>'
+                    '<mark name="s1"/>two<mark name="e1"/></speak>')
+    assert start_mark(1) == "s1" and end_mark(1) == "e1"
+
+
+def test_text_is_escaped():
+    (ssml, _), = build_ssml_chunks(["a < b & c"])
+
+    assert "a &lt; b &amp; c" in ssml
+
+
+def test_document_of_exactly_max_bytes_is_not_split():
+    texts = ["first comment", "second comment", "third comment"]
+    max_bytes = document_size(texts)
+
+    chunks = build_ssml_chunks(texts, max_bytes=max_bytes)
+
+    assert [indices for _, indices in chunks] == [[0, 1, 2]]
+    assert len(chunks[0][0].encode()) == max_bytes
+
+
+def test_one_byte_over_max_bytes_splits_before_the_last_text():
+    texts = ["first comment", "second comment", "third comment"]
+
+    chunks = build_ssml_chunks(texts, max_bytes=document_size(texts) - 1)
+
+    assert [indices for _, indices in chunks] == [[0, 1], [2]]
+    assert all(len(ssml.encode()) < document_size(texts) for ssml, _ in chunks)
+
+
+def test_size_is_counted_in_utf8_bytes():
+    texts = ["héllo wörld", "ça va", "日本語"]
+    max_bytes = document_size(texts)
+
+    assert len(build_ssml_chunks(texts, max_bytes=max_bytes)) == 1
+    assert len(build_ssml_chunks(texts, max_bytes=max_bytes - 1)) == 2
+
+
+def test_text_longer_than_max_bytes_gets_a_document_of_its_own():
+    chunks = build_ssml_chunks(["short", "x" * 200, "short"], max_bytes=100)
+
+    assert [indices for _, indices in chunks] == [[0], [1], [2]]
+
+
+def test_no_texts_make_no_document():
+    assert build_ssml_chunks([]) == []